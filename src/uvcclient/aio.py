@@ -0,0 +1,670 @@
+"""asyncio versions of the NVR and camera clients."""
+
+import asyncio
+import logging
+import pprint
+import ssl as ssl_lib
+import time
+import urllib.parse as urlparse
+from collections import deque
+from collections.abc import Awaitable
+from http import client as httplib
+from typing import Any, Literal, TypeVar
+
+from uvcclient import jsonutil
+from uvcclient.camera import CameraAuthError, CameraConnectError
+from uvcclient.const import LOGGER
+from uvcclient.nvr import (
+    ACCEPT_ENCODING,
+    AmbiguousName,
+    CameraConnectionError,
+    Invalid,
+    NotAuthorized,
+    NvrError,
+    _get_recordmode,
+    _index_entry,
+    _parse_version,
+    _set_recordmode,
+    _update_picture_settings,
+)
+from uvcclient.pool import RESENDABLE_METHODS
+from uvcclient.retry import DEFAULT_TIMEOUTS, Timeouts
+from uvcclient.stream import decode_body
+
+STALE_ERRORS = (
+    httplib.RemoteDisconnected,
+    asyncio.IncompleteReadError,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+T = TypeVar("T")
+
+
+class AsyncResponse:
+    """A fully read HTTP response, shaped like :class:`http.client.HTTPResponse`."""
+
+    def __init__(
+        self,
+        status: int,
+        reason: str,
+        headers: list[tuple[str, str]],
+        body: bytes,
+        will_close: bool,
+    ) -> None:
+        self.status = status
+        self.reason = reason
+        self.will_close = will_close
+        self._headers = headers
+        self._body = body
+
+    def getheaders(self) -> list[tuple[str, str]]:
+        return self._headers
+
+    def getheader(self, name: str, default: str | None = None) -> str | None:
+        name = name.lower()
+        for key, value in self._headers:
+            if key.lower() == name:
+                return value
+        return default
+
+    def read(self) -> bytes:
+        return self._body
+
+
+class AsyncConnection:
+    """
+    A single HTTP/1.1 keep-alive connection on top of asyncio streams.
+
+    :param timeouts: Bounds connecting and sending the request, and each
+                     read of the response, as for the synchronous client;
+                     a timeout raises :class:`TimeoutError` and closes the
+                     connection
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ssl: bool = False,
+        timeouts: Timeouts | None = DEFAULT_TIMEOUTS,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._ssl = ssl
+        self._timeouts = timeouts or Timeouts(None, None)
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def _wait(self, aw: Awaitable[T], timeout: float | None) -> T:
+        try:
+            return await asyncio.wait_for(aw, timeout)
+        except asyncio.TimeoutError as ex:
+            self.close()
+            # Before 3.11 asyncio has its own TimeoutError, which is not
+            # an OSError like the socket timeouts of the other clients
+            raise TimeoutError(f"Timed out talking to {self._host}") from ex
+
+    async def _readline(self) -> bytes:
+        assert self._reader is not None
+        return await self._wait(self._reader.readline(), self._timeouts.read)
+
+    async def _readexactly(self, size: int) -> bytes:
+        assert self._reader is not None
+        return await self._wait(self._reader.readexactly(size), self._timeouts.read)
+
+    async def connect(self) -> None:
+        context = ssl_lib.create_default_context() if self._ssl else None
+        self._reader, self._writer = await self._wait(
+            asyncio.open_connection(self._host, self._port, ssl=context),
+            self._timeouts.connect,
+        )
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | str | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> AsyncResponse:
+        if self._writer is None:
+            await self.connect()
+        assert self._reader is not None and self._writer is not None
+
+        if isinstance(body, str):
+            body = body.encode()
+        lines = [f"{method} {url} HTTP/1.1", f"Host: {self._host}:{self._port}"]
+        lines.extend(f"{key}: {value}" for key, value in (headers or {}).items())
+        if body is not None or method in ("POST", "PUT"):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        self._writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body:
+            self._writer.write(body)
+        await self._wait(self._writer.drain(), self._timeouts.connect)
+
+        status_line = await self._readline()
+        if not status_line:
+            raise httplib.RemoteDisconnected("Remote end closed connection")
+        try:
+            version, status, reason = [
+                *status_line.decode("latin-1").rstrip("\r\n").split(" ", 2),
+                "",
+            ][:3]
+            code = int(status)
+        except ValueError as ex:
+            raise httplib.BadStatusLine(status_line.decode("latin-1")) from ex
+
+        response_headers = []
+        while True:
+            line = await self._readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response_headers.append((key.strip(), value.strip()))
+        lookup = {key.lower(): value for key, value in response_headers}
+
+        connection = lookup.get("connection", "").lower()
+        will_close = connection == "close" or (
+            version == "HTTP/1.0" and connection != "keep-alive"
+        )
+        if method == "HEAD" or code in (204, 304) or 100 <= code < 200:
+            data = b""
+        elif lookup.get("transfer-encoding", "").lower() == "chunked":
+            data = await self._read_chunked()
+        elif "content-length" in lookup:
+            data = await self._readexactly(int(lookup["content-length"]))
+        else:
+            data = await self._wait(self._reader.read(), self._timeouts.read)
+            will_close = True
+        if will_close:
+            self.close()
+        return AsyncResponse(code, reason, response_headers, data, will_close)
+
+    async def _read_chunked(self) -> bytes:
+        chunks: list[bytes] = []
+        while True:
+            size_line = await self._readline()
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError as ex:
+                raise httplib.IncompleteRead(b"".join(chunks)) from ex
+            if size == 0:
+                # Skip any trailers
+                while (await self._readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self._readexactly(size))
+            await self._readexactly(2)
+
+
+class AsyncConnectionPool:
+    """
+    A pool of keep-alive :class:`AsyncConnection` objects to a single host.
+
+    This mirrors :class:`uvcclient.pool.ConnectionPool`: idle connections
+    are reused, stale ones are transparently replaced, and an optional
+    limit bounds how many requests are in flight at once.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        ssl: bool = False,
+        size: int = 4,
+        idle_timeout: float = 30.0,
+        limit: int | None = None,
+        timeouts: Timeouts | None = DEFAULT_TIMEOUTS,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._ssl = ssl
+        self._timeouts = timeouts
+        self._size = size
+        self._idle_timeout = idle_timeout
+        self._limit = asyncio.Semaphore(limit) if limit else None
+        self._idle: deque[tuple[AsyncConnection, float]] = deque()
+        self._counters = {
+            "created": 0,
+            "reused": 0,
+            "reconnected": 0,
+            "expired": 0,
+            "discarded": 0,
+        }
+
+    @property
+    def stats(self) -> dict[str, int]:
+        stats = dict(self._counters)
+        stats["idle"] = len(self._idle)
+        return stats
+
+    def _acquire(self) -> tuple[AsyncConnection, bool]:
+        now = time.monotonic()
+        while self._idle:
+            conn, last_used = self._idle.pop()
+            if now - last_used > self._idle_timeout:
+                self._counters["expired"] += 1
+                conn.close()
+                continue
+            self._counters["reused"] += 1
+            return conn, True
+        self._counters["created"] += 1
+        return self._connection(), False
+
+    def _connection(self) -> AsyncConnection:
+        return AsyncConnection(self._host, self._port, self._ssl, self._timeouts)
+
+    def _checkin(self, conn: AsyncConnection, resp: AsyncResponse) -> None:
+        if resp.will_close or len(self._idle) >= self._size:
+            self._counters["discarded"] += 1
+            conn.close()
+        else:
+            self._idle.append((conn, time.monotonic()))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | str | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[AsyncResponse, bool]:
+        """
+        Send a request on a pooled connection.
+
+        :returns: A tuple of (response, reused)
+        """
+        if self._limit is not None:
+            async with self._limit:
+                return await self._request(method, url, body, headers)
+        return await self._request(method, url, body, headers)
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | str | None,
+        headers: dict[str, str] | None,
+    ) -> tuple[AsyncResponse, bool]:
+        conn, reused = self._acquire()
+        try:
+            resp = await conn.request(method, url, body, headers)
+        except STALE_ERRORS:
+            conn.close()
+            # The server may have seen the request before hanging up
+            if not reused or method not in RESENDABLE_METHODS:
+                raise
+            LOGGER.debug("Pooled connection was stale, reconnecting")
+            self._counters["reconnected"] += 1
+            self._counters["created"] += 1
+            conn, reused = self._connection(), False
+            try:
+                resp = await conn.request(method, url, body, headers)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        self._checkin(conn, resp)
+        return resp, reused
+
+    def close(self) -> None:
+        while self._idle:
+            conn, _ = self._idle.pop()
+            conn.close()
+
+
+class AsyncUVCRemote:
+    """
+    asyncio remote control client for Ubiquiti Unifi Video NVR.
+
+    This has the same methods as :class:`uvcclient.nvr.UVCRemote`, as
+    coroutines. The server version is fetched on first use rather than in
+    the constructor, so use :meth:`get_server_version` and
+    :meth:`get_camera_identifier` instead of the properties.
+
+    :param max_connections: Optional limit on concurrent requests to the NVR
+    :param timeouts: Socket timeouts, as for :class:`~uvcclient.nvr.UVCRemote`
+    """
+
+    CHANNEL_NAMES = ["high", "medium", "low"]
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        apikey: str,
+        path: str = "/",
+        ssl: bool = False,
+        pool_size: int = 4,
+        pool_idle_timeout: float = 30.0,
+        max_connections: int | None = None,
+        timeouts: Timeouts | None = DEFAULT_TIMEOUTS,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._path = path
+        self._ssl = ssl
+        if path != "/":
+            raise Invalid("Path not supported yet")
+        self._apikey = apikey
+        self._pool = AsyncConnectionPool(
+            host,
+            port,
+            ssl,
+            size=pool_size,
+            idle_timeout=pool_idle_timeout,
+            limit=max_connections,
+            timeouts=timeouts,
+        )
+        self._bootstrap: dict[str, Any] | None = None
+
+    async def __aenter__(self) -> "AsyncUVCRemote":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        self.close()
+
+    @property
+    def pool_stats(self) -> dict[str, int]:
+        """Return connection reuse counters for the NVR connection pool."""
+        return self._pool.stats
+
+    def close(self) -> None:
+        """Close any idle connections to the NVR."""
+        self._pool.close()
+
+    async def get_server_version(self) -> tuple[int, int, int]:
+        if self._bootstrap is None:
+            self._bootstrap = await self._get_bootstrap()
+        return _parse_version(self._bootstrap["systemInfo"]["version"])
+
+    async def get_camera_identifier(self) -> str:
+        if await self.get_server_version() >= (3, 2, 0):
+            return "id"
+        else:
+            return "uuid"
+
+    async def _safe_request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | str | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> AsyncResponse:
+        try:
+            resp, _reused = await self._pool.request(method, url, body, headers)
+            return resp
+        except (OSError, EOFError) as ex:
+            raise CameraConnectionError("Unable to contact camera") from ex
+        except httplib.HTTPException as ex:
+            raise CameraConnectionError(f"Error connecting to camera: {ex!s}") from ex
+
+    async def _uvc_request(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        try:
+            return await self._uvc_request_safe(*args, **kwargs)
+        except (OSError, EOFError) as ex:
+            raise NvrError("Failed to contact NVR") from ex
+        except httplib.HTTPException as ex:
+            raise NvrError(f"Error connecting to camera: {ex!s}") from ex
+
+    async def _uvc_request_safe(
+        self,
+        path: str,
+        method: str = "GET",
+        data: dict[str, Any] | bytes | None = None,
+        mimetype: str = "application/json",
+    ) -> dict[str, Any]:
+        if "?" in path:
+            url = f"{path}&apiKey={self._apikey}"
+        else:
+            url = f"{path}?apiKey={self._apikey}"
+
+        headers = {
+            "Content-Type": mimetype,
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "Accept-Encoding": ACCEPT_ENCODING,
+        }
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            # path rather than url, which has the API key in it
+            LOGGER.debug("%s %s headers=%s data=%r", method, path, headers, data)
+        body = None
+        if isinstance(data, bytes):
+            body = data
+        elif data is not None:
+            body = jsonutil.dumps(data)
+        resp, _reused = await self._pool.request(method, url, body, headers)
+        LOGGER.debug("%s %s Result: %s %s", method, path, resp.status, resp.reason)
+        if resp.status in (401, 403):
+            raise NotAuthorized("NVR reported authorization failure")
+        if resp.status / 100 != 2:
+            raise NvrError(f"Request failed: {resp.status}")
+        return jsonutil.loads(decode_body(resp.read(), resp.getheaders()))
+
+    async def _get_bootstrap(self) -> dict[str, Any]:
+        return (await self._uvc_request("/api/2.0/bootstrap"))["data"][0]
+
+    async def dump(self, uuid: str) -> None:
+        """Dump information for a camera by UUID."""
+        data = await self._uvc_request(f"/api/2.0/camera/{uuid}")
+        pprint.pprint(data)
+
+    async def set_recordmode(
+        self, uuid: str, mode: str, chan: str | None = None
+    ) -> bool:
+        """
+        Set the recording mode for a camera by UUID.
+
+        :param uuid: Camera UUID
+        :param mode: One of none, full, or motion
+        :param chan: One of the values from CHANNEL_NAMES
+        :returns: True if successful, False or None otherwise
+        """
+        url = f"/api/2.0/camera/{uuid}"
+        data = await self._uvc_request(url)
+        settings = data["data"][0]["recordingSettings"]
+        _set_recordmode(settings, mode, chan)
+        data = await self._uvc_request(url, "PUT", data["data"][0])
+        updated = data["data"][0]["recordingSettings"]
+        return settings == updated
+
+    async def get_recordmode(self, uuid: str) -> Literal["none", "full", "motion"]:
+        data = await self._uvc_request(f"/api/2.0/camera/{uuid}")
+        return _get_recordmode(data["data"][0]["recordingSettings"])
+
+    async def get_picture_settings(self, uuid: str) -> dict[str, Any]:
+        data = await self._uvc_request(f"/api/2.0/camera/{uuid}")
+        return data["data"][0]["ispSettings"]
+
+    async def set_picture_settings(
+        self, uuid: str, settings: dict[str, Any]
+    ) -> dict[str, Any]:
+        url = f"/api/2.0/camera/{uuid}"
+        data = await self._uvc_request(url)
+        _update_picture_settings(data["data"][0]["ispSettings"], settings)
+        data = await self._uvc_request(url, "PUT", data["data"][0])
+        return data["data"][0]["ispSettings"]
+
+    async def prune_zones(self, uuid: str) -> None:
+        url = f"/api/2.0/camera/{uuid}"
+        data = await self._uvc_request(url)
+        data["data"][0]["zones"] = [data["data"][0]["zones"][0]]
+        await self._uvc_request(url, "PUT", data["data"][0])
+
+    async def list_zones(self, uuid: str) -> list[dict[str, Any]]:
+        data = await self._uvc_request(f"/api/2.0/camera/{uuid}")
+        return data["data"][0]["zones"]
+
+    async def index(self) -> list[dict[str, Any]]:
+        """
+        Return an index of available cameras.
+
+        :returns: A list of dictionaries like :meth:`UVCRemote.index`
+        """
+        cams = (await self._uvc_request("/api/2.0/camera"))["data"]
+        return [_index_entry(x) for x in cams if not x["deleted"]]
+
+    async def name_to_uuid(self, name: str) -> str | None:
+        """
+        Attempt to convert a camera name to its UUID.
+
+        :param name: Camera name
+        :returns: The UUID of the camera with that name if found,
+                  otherwise None. On v3.2.0 and later, returns id.
+        :raises AmbiguousName: If more than one camera has that name
+        """
+        matches = [x for x in await self.index() if x["name"] == name]
+        if not matches:
+            return None
+        ident = await self.get_camera_identifier()
+        if len(matches) > 1:
+            ids = ", ".join(x[ident] for x in matches)
+            raise AmbiguousName(f"`{name}' matches {len(matches)} cameras: {ids}")
+        return matches[0][ident]
+
+    async def get_camera(self, uuid: str) -> dict[str, Any]:
+        return (await self._uvc_request(f"/api/2.0/camera/{uuid}"))["data"][0]
+
+    async def get_snapshot(self, uuid: str) -> bytes:
+        url = f"/api/2.0/snapshot/camera/{uuid}?force=true&apiKey={self._apikey}"
+        resp = await self._safe_request("GET", url)
+        if resp.status != 200:
+            raise NvrError(f"Snapshot returned {resp.status}")
+        return resp.read()
+
+
+class AsyncUVCCameraClient:
+    """
+    asyncio version of :class:`uvcclient.camera.UVCCameraClient`.
+
+    :param timeout: Socket timeouts, or a number of seconds to use for
+                    both connecting and reading; None waits forever. Not
+                    used if ``pool`` is given.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        port: int = 80,
+        pool: AsyncConnectionPool | None = None,
+        timeout: float | Timeouts | None = DEFAULT_TIMEOUTS,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._username = username
+        self._password = password
+        self._cookie = ""
+        if isinstance(timeout, int | float):
+            timeout = Timeouts(timeout, timeout)
+        self._pool = pool or AsyncConnectionPool(host, port, size=1, timeouts=timeout)
+
+    def close(self) -> None:
+        self._pool.close()
+
+    async def _safe_request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | str | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> AsyncResponse:
+        try:
+            resp, _reused = await self._pool.request(method, url, body, headers)
+            return resp
+        except (OSError, EOFError) as ex:
+            raise CameraConnectError("Unable to contact camera") from ex
+        except httplib.HTTPException as ex:
+            raise CameraConnectError(f"Error connecting to camera: {ex!s}") from ex
+
+    async def login(self) -> None:
+        resp = await self._safe_request("GET", "/")
+        headers = dict(resp.getheaders())
+        try:
+            self._cookie = headers["Set-Cookie"]
+        except KeyError:
+            self._cookie = headers["set-cookie"]
+        session = self._cookie.split("=")[1].split(";")[0]
+
+        data = urlparse.urlencode(
+            {
+                "username": self._username,
+                "password": self._password,
+                "AIROS_SESSIONID": session,
+            }
+        )
+        headers = {
+            "Content-type": "application/x-www-form-urlencoded",
+            "Accept": "*",
+            "Cookie": self._cookie,
+        }
+        resp = await self._safe_request("POST", "/login.cgi", data, headers)
+        if resp.status != 200:
+            raise CameraAuthError(f"Failed to login: {resp.reason}")
+
+    async def _cfgwrite(self, setting: str, value: str | int) -> bool:
+        headers = {"Cookie": self._cookie}
+        resp = await self._safe_request(
+            "GET", f"/cfgwrite.cgi?{setting}={value}", headers=headers
+        )
+        LOGGER.debug("Setting %s=%s: %s %s", setting, value, resp.status, resp.reason)
+        return resp.status == 200
+
+    async def set_led(self, enabled: bool) -> bool:
+        return await self._cfgwrite("led.front.status", int(enabled))
+
+    @property
+    def snapshot_url(self) -> str:
+        return "/snapshot.cgi"
+
+    @property
+    def reboot_url(self) -> str:
+        return "/api/1.1/reboot"
+
+    @property
+    def status_url(self) -> str:
+        return "/api/1.1/status"
+
+    async def _authed_get(self, url: str, action: str) -> AsyncResponse:
+        headers = {"Cookie": self._cookie}
+        resp = await self._safe_request("GET", url, headers=headers)
+        if resp.status in (401, 403, 302):
+            raise CameraAuthError("Not logged in")
+        elif resp.status != 200:
+            raise CameraConnectError(f"{action} failed: {resp.status}")
+        return resp
+
+    async def get_snapshot(self) -> bytes:
+        return (await self._authed_get(self.snapshot_url, "Snapshot")).read()
+
+    async def reboot(self) -> None:
+        await self._authed_get(self.reboot_url, "Reboot")
+
+    async def get_status(self) -> dict[str, Any]:
+        resp = await self._authed_get(self.status_url, "Status")
+        return jsonutil.loads(resp.read())
+
+
+class AsyncUVCCameraClientV320(AsyncUVCCameraClient):
+    @property
+    def snapshot_url(self) -> str:
+        return "/snap.jpeg"
+
+    async def login(self) -> None:
+        headers = {"Content-Type": "application/json"}
+        data = jsonutil.dumps({"username": self._username, "password": self._password})
+        resp = await self._safe_request("POST", "/api/1.1/login", data, headers)
+        if resp.status != 200:
+            raise CameraAuthError(f"Failed to login: {resp.reason}")
+        headers = dict(resp.getheaders())
+        try:
+            self._cookie = headers["Set-Cookie"]
+        except KeyError:
+            self._cookie = headers["set-cookie"]
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A small thread-safe LRU cache whose entries expire after a TTL.
+
+    :param ttl: Seconds an entry stays valid after it was stored
+    :param maxsize: Maximum number of entries; the least recently used
+                    entry is evicted when this is exceeded
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 256) -> None:
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._data)
+        return stats
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._data[key]
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key: K | None = None) -> None:
+        """Drop one entry, or everything if no key is given."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+class _Flight:
+    __slots__ = ("done", "error", "result")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: memoryview | None = None
+        self.error: BaseException | None = None
+
+
+class SnapshotCache(Generic[K]):
+    """
+    A cache of recent snapshots, shared by everyone asking for them.
+
+    A snapshot is served from the cache while it is at most ``max_age``
+    seconds old. When it is not, the first caller fetches it, and any
+    others asking for the same camera meanwhile wait for that fetch
+    instead of starting their own. Everyone gets the same read-only
+    :class:`memoryview` of the image, so nothing is copied on a hit.
+
+    :param max_age: Seconds a snapshot may be served after it was fetched
+    :param max_bytes: Total size of images kept; the least recently used
+                      are dropped to stay within it
+    """
+
+    def __init__(self, max_age: float = 1.0, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self._max_age = max_age
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._data: OrderedDict[K, tuple[float, memoryview]] = OrderedDict()
+        self._size = 0
+        self._flights: dict[K, _Flight] = {}
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._data)
+            stats["bytes"] = self._size
+        return stats
+
+    def get(
+        self,
+        key: K,
+        fetch: Callable[[], bytes | bytearray],
+        max_age: float | None = None,
+    ) -> memoryview:
+        """
+        Return a snapshot, fetching it if the cached one is too old.
+
+        :param key: The camera
+        :param fetch: Called to fetch the image when needed; any error it
+                      raises is raised to every caller waiting on it
+        :param max_age: Overrides the cache's ``max_age`` for this call
+        """
+        if max_age is None:
+            max_age = self._max_age
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self._data.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            assert flight.result is not None
+            return flight.result
+
+        try:
+            flight.result = memoryview(fetch()).toreadonly()
+        except BaseException as ex:
+            flight.error = ex
+            raise
+        else:
+            self._store(key, flight.result)
+            return flight.result
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _store(self, key: K, image: memoryview) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[1].nbytes
+            if image.nbytes > self._max_bytes:
+                return
+            self._data[key] = (time.monotonic(), image)
+            self._size += image.nbytes
+            while self._size > self._max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._size -= evicted.nbytes
+                self._counters["evictions"] += 1
+
+    def invalidate(self, key: K | None = None) -> None:
+        """Drop one snapshot, or everything if no key is given."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+                self._size = 0
+            else:
+                entry = self._data.pop(key, None)
+                if entry is not None:
+                    self._size -= entry[1].nbytes
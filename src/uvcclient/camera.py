@@ -13,12 +13,29 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import json
+import threading
+import time
 import urllib.parse as urlparse
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from http import client as httplib
-from typing import Any
+from typing import Any, TypeVar
 
+from uvcclient import jsonutil
 from uvcclient.const import LOGGER
+from uvcclient.metrics import Instrumentation
+from uvcclient.retry import (
+    DEFAULT_TIMEOUTS,
+    NO_RETRY,
+    BreakerRegistry,
+    Deadline,
+    RetryPolicy,
+    Timeouts,
+    call,
+    set_timeout,
+)
+from uvcclient.store import InfoStore, UnableToManageStore
+from uvcclient.stream import CHUNK_SIZE, Sink, copy_response
 
 
 class CameraConnectError(Exception):
@@ -29,24 +46,219 @@ class CameraAuthError(Exception):
     pass
 
 
+T = TypeVar("T")
+
+
+class SessionCache:
+    """
+    Authenticated camera session cookies, keyed by camera and user.
+
+    Sessions are kept in memory and, if an :class:`InfoStore` is given,
+    also persisted there so later processes can skip the login handshake.
+    A cookie is only handed out until its expiry; the camera may of course
+    drop it sooner, which clients handle by logging in again.
+
+    :param ttl: Seconds a new session is assumed to stay valid
+    :param store: Optional store to persist sessions in
+    """
+
+    def __init__(self, ttl: float = 1800.0, store: InfoStore | None = None) -> None:
+        self._ttl = ttl
+        self._store = store
+        self._lock = threading.Lock()
+        self._sessions: dict[str, tuple[str, float]] = {}
+        # Changes not yet written to the store, and how many batches are open
+        self._pending: dict[str, tuple[str, float] | None] = {}
+        self._batches = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None and self._store is not None:
+                session = self._store.get_camera_session(key)
+            if session is None:
+                return None
+            cookie, expires = session
+            if time.time() >= expires:
+                self._sessions.pop(key, None)
+                return None
+            self._sessions[key] = session
+            return cookie
+
+    def set(self, key: str, cookie: str) -> None:
+        expires = time.time() + self._ttl
+        with self._lock:
+            self._sessions[key] = (cookie, expires)
+            if self._store is not None:
+                self._pending[key] = (cookie, expires)
+        self._persist()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+            if self._store is not None:
+                self._pending[key] = None
+        self._persist()
+
+    @contextmanager
+    def batch(self) -> Iterator["SessionCache"]:
+        """
+        Write sessions to the store once, when the block ends.
+
+        Without this every login rewrites the store; use it around
+        logging in to many cameras at once.
+        """
+        with self._lock:
+            self._batches += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batches -= 1
+            self._persist()
+
+    def _persist(self) -> None:
+        # Writing the store is slow, so is done without holding the lock
+        with self._lock:
+            if self._batches or not self._pending or self._store is None:
+                return
+            pending, self._pending = self._pending, {}
+        try:
+            self._store.update_camera_sessions(pending)
+        except UnableToManageStore:
+            pass
+
+
 class UVCCameraClient:
-    def __init__(self, host: str, username: str, password: str, port: int = 80) -> None:
+    """
+    Client for a camera's own web interface.
+
+    :param timeout: Socket timeouts, or a number of seconds to use for
+                    both connecting and reading; None waits forever
+    :param retry: How to retry GET requests that fail to connect or
+                  time out (never a reboot)
+    :param deadline: Seconds allowed for each request, retries included,
+                     or a :class:`Deadline` that every request shares
+    :param breakers: Circuit breakers shared with other clients; while
+                     this camera's is open, requests fail straight away
+                     with :class:`CameraConnectError`
+    """
+
+    def __init__(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        port: int = 80,
+        timeout: float | Timeouts | None = DEFAULT_TIMEOUTS,
+        sessions: SessionCache | None = None,
+        instrumentation: Instrumentation | None = None,
+        retry: RetryPolicy = RetryPolicy(),
+        deadline: float | Deadline | None = None,
+        breakers: BreakerRegistry | None = None,
+    ) -> None:
         self._host = host
         self._port = port
         self._username = username
         self._password = password
+        if isinstance(timeout, int | float):
+            timeout = Timeouts(timeout, timeout)
+        self._timeouts = timeout
+        self._retry = retry
+        self._deadline = deadline
+        self._breaker = breakers.get(f"{host}:{port}") if breakers else None
+        self._sessions = sessions
+        self._instrumentation = instrumentation
         self._cookie = ""
 
+    @property
+    def _session_key(self) -> str:
+        return f"{self._username}@{self._host}:{self._port}"
+
+    def _remember_session(self) -> None:
+        if self._sessions is not None:
+            self._sessions.set(self._session_key, self._cookie)
+
+    def ensure_login(self) -> None:
+        """Log in unless we already hold a (possibly cached) session."""
+        if not self._cookie and self._sessions is not None:
+            self._cookie = self._sessions.get(self._session_key) or ""
+        if not self._cookie:
+            self.login()
+
+    def _with_session(self, func: Callable[[], T]) -> T:
+        # A cached or old session may have expired on the camera; if so,
+        # log in again once and retry.
+        try:
+            return func()
+        except CameraAuthError:
+            if not self._cookie:
+                raise
+            LOGGER.debug("Camera session for %s rejected, logging in", self._host)
+            if self._sessions is not None:
+                self._sessions.invalidate(self._session_key)
+            self._cookie = ""
+            self.login()
+            return func()
+
+    def _get_http_connection(
+        self, timeout: float | None = None
+    ) -> httplib.HTTPConnection:
+        if timeout is None:
+            return httplib.HTTPConnection(self._host, self._port)
+        return httplib.HTTPConnection(self._host, self._port, timeout=timeout)
+
     def _safe_request(self, *args: Any, **kwargs: Any) -> httplib.HTTPResponse:
+        if self._instrumentation is None:
+            return self._request(args, kwargs)
+        method, url = args[:2]
+        body = args[2] if len(args) > 2 else kwargs.get("body")
+        with self._instrumentation.track("camera", method, url) as info:
+            if body:
+                info.bytes_out = len(body)
+            resp = self._request(args, kwargs, info.retried)
+            info.status = resp.status
+            info.bytes_in = resp.length or 0
+        return resp
+
+    def _is_idempotent(self, method: str, url: str) -> bool:
+        # A reboot is a GET, but must not be sent twice
+        return method in ("GET", "HEAD") and url != self.reboot_url
+
+    def _request(
+        self,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        on_retry: Callable[[], None] | None = None,
+    ) -> httplib.HTTPResponse:
         try:
-            conn = httplib.HTTPConnection(self._host, self._port)
-            conn.request(*args, **kwargs)
-            return conn.getresponse()
+            return call(
+                lambda deadline: self._send(deadline, args, kwargs),
+                self._retry if self._is_idempotent(*args[:2]) else NO_RETRY,
+                (
+                    self._deadline
+                    if isinstance(self._deadline, Deadline)
+                    else Deadline(self._deadline)
+                ),
+                self._breaker,
+                on_retry,
+            )
         except OSError as ex:
             raise CameraConnectError("Unable to contact camera") from ex
         except httplib.HTTPException as ex:
             raise CameraConnectError(f"Error connecting to camera: {ex!s}") from ex
 
+    def _send(
+        self, deadline: Deadline, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> httplib.HTTPResponse:
+        timeouts = self._timeouts or Timeouts(None, None)
+        conn = self._get_http_connection(deadline.cap(timeouts.connect))
+        conn.request(*args, **kwargs)
+        read = deadline.cap(timeouts.read)
+        if read is not None:
+            set_timeout(conn, read)
+        return conn.getresponse()
+
     def login(self) -> None:
         resp = self._safe_request("GET", "/")
         headers = dict(resp.getheaders())
@@ -73,17 +285,22 @@ class UVCCameraClient:
         resp = self._safe_request("POST", "/login.cgi", data, headers)
         if resp.status != 200:
             raise CameraAuthError(f"Failed to login: {resp.reason}")
+        self._remember_session()
 
     def _cfgwrite(self, setting: str, value: str | int) -> bool:
         headers = {"Cookie": self._cookie}
         resp = self._safe_request(
             "GET", f"/cfgwrite.cgi?{setting}={value}", headers=headers
         )
-        LOGGER.debug(f"Setting {setting}={value}: {resp.status} {resp.reason}")
+        LOGGER.debug("Setting %s=%s: %s %s", setting, value, resp.status, resp.reason)
+        if resp.status in (401, 403, 302):
+            raise CameraAuthError("Not logged in")
         return resp.status == 200
 
     def set_led(self, enabled: bool) -> bool:
-        return self._cfgwrite("led.front.status", int(enabled))
+        return self._with_session(
+            lambda: self._cfgwrite("led.front.status", int(enabled))
+        )
 
     @property
     def snapshot_url(self) -> str:
@@ -97,16 +314,31 @@ class UVCCameraClient:
     def status_url(self) -> str:
         return "/api/1.1/status"
 
-    def get_snapshot(self) -> bytes:
+    def _get_snapshot_response(self) -> httplib.HTTPResponse:
         headers = {"Cookie": self._cookie}
         resp = self._safe_request("GET", self.snapshot_url, headers=headers)
         if resp.status in (401, 403, 302):
             raise CameraAuthError("Not logged in")
         elif resp.status != 200:
             raise CameraConnectError(f"Snapshot failed: {resp.status}")
-        return resp.read()
+        return resp
 
-    def reboot(self) -> None:
+    def get_snapshot(self) -> bytes:
+        return self._with_session(self._get_snapshot_response).read()
+
+    def stream_snapshot(self, out: Sink, chunk_size: int = CHUNK_SIZE) -> int:
+        """
+        Write a snapshot into a file or buffer without buffering it whole.
+
+        See :func:`uvcclient.stream.copy_response` for what ``out`` may be.
+
+        :param out: A writable binary file, bytearray or memoryview
+        :returns: The size of the image in bytes
+        """
+        resp = self._with_session(self._get_snapshot_response)
+        return copy_response(resp, out, chunk_size)
+
+    def _reboot(self) -> None:
         headers = {"Cookie": self._cookie}
         resp = self._safe_request("GET", self.reboot_url, headers=headers)
         if resp.status in (401, 403, 302):
@@ -114,14 +346,20 @@ class UVCCameraClient:
         elif resp.status != 200:
             raise CameraConnectError(f"Reboot failed: {resp.status}")
 
-    def get_status(self) -> dict[str, Any]:
+    def reboot(self) -> None:
+        self._with_session(self._reboot)
+
+    def _get_status(self) -> dict[str, Any]:
         headers = {"Cookie": self._cookie}
         resp = self._safe_request("GET", self.status_url, headers=headers)
         if resp.status in (401, 403, 302):
             raise CameraAuthError("Not logged in")
         elif resp.status != 200:
             raise CameraConnectError(f"Status failed: {resp.status}")
-        return json.loads(resp.read().decode())
+        return jsonutil.loads(resp.read())
+
+    def get_status(self) -> dict[str, Any]:
+        return self._with_session(self._get_status)
 
 
 class UVCCameraClientV320(UVCCameraClient):
@@ -131,7 +369,7 @@ class UVCCameraClientV320(UVCCameraClient):
 
     def login(self) -> None:
         headers = {"Content-Type": "application/json"}
-        data = json.dumps({"username": self._username, "password": self._password})
+        data = jsonutil.dumps({"username": self._username, "password": self._password})
         resp = self._safe_request("POST", "/api/1.1/login", data, headers=headers)
         if resp.status != 200:
             raise CameraAuthError(f"Failed to login: {resp.reason}")
@@ -140,3 +378,36 @@ class UVCCameraClientV320(UVCCameraClient):
             self._cookie = headers["Set-Cookie"]
         except KeyError:
             self._cookie = headers["set-cookie"]
+        self._remember_session()
+
+
+def get_camera_client(
+    server_version: tuple[int, int, int],
+    host: str,
+    username: str,
+    password: str,
+    port: int = 80,
+    timeout: float | Timeouts | None = DEFAULT_TIMEOUTS,
+    sessions: SessionCache | None = None,
+    instrumentation: Instrumentation | None = None,
+    retry: RetryPolicy = RetryPolicy(),
+    deadline: float | Deadline | None = None,
+    breakers: BreakerRegistry | None = None,
+) -> UVCCameraClient:
+    """Return the right camera client class for an NVR version."""
+    if server_version >= (3, 2, 0):
+        cls: type[UVCCameraClient] = UVCCameraClientV320
+    else:
+        cls = UVCCameraClient
+    return cls(
+        host,
+        username,
+        password,
+        port,
+        timeout,
+        sessions,
+        instrumentation,
+        retry,
+        deadline,
+        breakers,
+    )
@@ -0,0 +1,344 @@
+"""
+Serve ``uvc`` commands from a long-running process.
+
+``uvc --daemon`` listens on a Unix domain socket and runs each command it
+receives with a warm :class:`~uvcclient.nvr.UVCRemote` per NVR, so the
+bootstrap, pooled connections, camera index and camera sessions are all
+reused between commands. A plain ``uvc`` forwards its command line to a
+running daemon with :func:`forward` and only runs it itself when no
+daemon is listening.
+
+Each connection carries one command. The client sends a line of JSON
+with its arguments, UVC environment variables and working directory.
+The daemon sends the command's stdout back as it is written, as chunks
+each preceded by its length as a 4-byte big-endian integer, so that
+output such as ``--status-all`` arrives as it is produced. An empty
+chunk ends the output, and is followed by a line of JSON holding the
+exit status and stderr.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+from typing import IO, TYPE_CHECKING, Any
+
+from uvcclient.const import LOGGER
+
+if TYPE_CHECKING:
+    from uvcclient.nvr import UVCRemote
+
+#: Environment variables describing the NVR, passed along with a command
+ENV_VARS = ("UVC", "UVC_HOST", "UVC_PORT", "UVC_APIKEY")
+
+# The length of each chunk of output
+_CHUNK = struct.Struct(">I")
+
+#: Commands that are always run locally; --record runs until it is
+#: stopped, so would hold up every other command
+LOCAL_ONLY = ("--daemon", "--no-daemon", "--set-password", "--record")
+
+
+class DaemonError(Exception):
+    pass
+
+
+def socket_path(create: bool = False) -> str:
+    """
+    Return the daemon socket path, which UVC_SOCKET overrides.
+
+    The socket goes in ``XDG_RUNTIME_DIR`` or, failing that, in a
+    directory of the system temporary directory that only this user may
+    use, since the commands sent to the daemon carry the NVR API key.
+
+    :param create: Create that directory if it does not exist yet
+    :raises DaemonError: If the directory is not private to this user
+    """
+    path = os.getenv("UVC_SOCKET")
+    if path:
+        return path
+    base = os.getenv("XDG_RUNTIME_DIR")
+    if not base:
+        import tempfile
+
+        base = _private_dir(tempfile.gettempdir(), create)
+    return os.path.join(base, f"uvcclient-{os.getuid()}.sock")
+
+
+def _private_dir(parent: str, create: bool) -> str:
+    path = os.path.join(parent, f"uvcclient-{os.getuid()}")
+    if create:
+        with contextlib.suppress(FileExistsError):
+            os.mkdir(path, 0o700)
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        # Nothing can be listening in it yet
+        return path
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or stat.S_IMODE(st.st_mode) & 0o077
+    ):
+        raise DaemonError(f"{path} is not a directory private to this user")
+    return path
+
+
+def _peer_uid(sock: socket.socket) -> int | None:
+    """Return the user id of the process at the other end, if known."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    return int(struct.unpack("3i", creds)[1])
+
+
+def _owned_socket(path: str) -> bool:
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def forward(
+    argv: list[str], path: str | None = None, stdout: IO[bytes] | None = None
+) -> int | None:
+    """
+    Run a command line in a running daemon, if there is one.
+
+    :param argv: Command line arguments, without the program name
+    :param path: Socket path, defaulting to :func:`socket_path`
+    :param stdout: Where to write the command's output, defaulting to
+                   the binary stdout of this process
+    :returns: The command's exit status, or None if no daemon is
+              listening and the command should be run locally
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    if any(arg.split("=", 1)[0] in LOCAL_ONLY for arg in argv):
+        return None
+    if path is None:
+        try:
+            path = socket_path()
+        except DaemonError as ex:
+            LOGGER.warning("Not using the daemon: %s", ex)
+            return None
+    # Only hand the API key to a daemon run by this user
+    if not _owned_socket(path):
+        return None
+    request = {
+        "argv": argv,
+        "env": {name: os.environ[name] for name in ENV_VARS if name in os.environ},
+        "cwd": os.getcwd(),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+            peer = _peer_uid(sock)
+        except OSError:
+            return None
+        if peer is not None and peer != os.getuid():
+            LOGGER.warning("Not using the daemon: %s belongs to user %s", path, peer)
+            return None
+        # From here on the daemon may have started running the command,
+        # so failures are reported rather than retried locally.
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as f:
+                if stdout is None:
+                    stdout = sys.stdout.buffer
+                while length := _CHUNK.unpack(_read_exactly(f, _CHUNK.size))[0]:
+                    stdout.write(_read_exactly(f, length))
+                    stdout.flush()
+                line = f.readline()
+                if not line:
+                    raise DaemonError("Daemon closed the connection")
+                trailer = json.loads(line)
+        except (OSError, ValueError, KeyError, struct.error, DaemonError) as ex:
+            print(f"uvc daemon failed: {ex}", file=sys.stderr)
+            return 1
+    if trailer.get("stderr"):
+        sys.stderr.write(trailer["stderr"])
+    return int(trailer["status"])
+
+
+def _read_exactly(f: IO[bytes], size: int) -> bytes:
+    data = f.read(size)
+    if len(data) < size:
+        raise DaemonError("Daemon output was cut short")
+    return data
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Send whatever is written to a client, as chunks of output."""
+
+    def __init__(self, wfile: io.BufferedIOBase) -> None:
+        self._wfile = wfile
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        size = memoryview(data).nbytes
+        if size:
+            self._wfile.write(_CHUNK.pack(size))
+            self._wfile.write(data)
+            self._wfile.flush()
+        return size
+
+
+class Daemon:
+    """
+    Run ``uvc`` commands received on a Unix domain socket.
+
+    Commands are run one at a time, in the order they arrive, since each
+    one redirects this process's stdout and changes its working
+    directory. Snapshots are cached for ``snapshot_max_age`` seconds, so
+    that many clients asking for the same camera at about the same time
+    cost one fetch. Programs that fetch snapshots from many threads can
+    share a cache without the daemon, through the ``snapshot_max_age``
+    option of :class:`~uvcclient.nvr.UVCRemote`.
+
+    :param path: Socket path, defaulting to :func:`socket_path`
+    :param snapshot_max_age: Seconds a snapshot is served from memory
+    :param snapshot_cache_bytes: Total size of snapshots kept in memory
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        snapshot_max_age: float = 1.0,
+        snapshot_cache_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        from uvcclient.cache import SnapshotCache
+
+        self.path = path or socket_path(create=True)
+        self.snapshots: SnapshotCache[str] = SnapshotCache(
+            snapshot_max_age, snapshot_cache_bytes
+        )
+        self._clients: dict[tuple[str, int, str], UVCRemote] = {}
+        self._stopping = False
+
+    def get_client(self, host: str, port: int, apikey: str) -> "UVCRemote":
+        from uvcclient import main, nvr
+
+        key = (host, port, apikey)
+        client = self._clients.get(key)
+        if client is None:
+            client = nvr.UVCRemote(
+                host,
+                port,
+                apikey,
+                info_store=main.INFO_STORE,
+                breakers=main.get_breakers(),
+            )
+            self._clients[key] = client
+        return client
+
+    def run(
+        self, request: dict[str, Any], stdout: IO[bytes] | None = None
+    ) -> tuple[int, bytes, str]:
+        """
+        Run one command as if ``uvc`` had been started with it.
+
+        :param stdout: Where to write the command's output as it goes,
+                       instead of collecting it
+        :returns: The exit status, stdout (empty if ``stdout`` was given)
+                  and stderr of the command
+        """
+        from uvcclient import main
+
+        # Passwords may have been set by a uvc run outside the daemon
+        main.INFO_STORE.refresh()
+        main.SNAPSHOT_CACHE = self.snapshots
+        raw = io.BytesIO()
+        out = io.TextIOWrapper(stdout or raw, write_through=True)
+        err = io.StringIO()
+        cwd = os.getcwd()
+        try:
+            os.chdir(request.get("cwd") or cwd)
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                try:
+                    status = main.main(
+                        [*request["argv"], "--no-daemon"],
+                        env=request.get("env", {}),
+                        get_client=self.get_client,
+                    )
+                except SystemExit as ex:
+                    status = ex.code if isinstance(ex.code, int) else int(bool(ex.code))
+                except Exception as ex:
+                    LOGGER.exception("Command %s failed", request["argv"])
+                    print(f"Error: {ex}", file=sys.stderr)
+                    status = 1
+            # Anything still buffered goes out before the status does
+            with contextlib.suppress(OSError):
+                out.flush()
+        finally:
+            os.chdir(cwd)
+        return int(status or 0), raw.getvalue(), err.getvalue()
+
+    def serve_forever(self) -> None:
+        """
+        Listen on the socket until :meth:`shutdown` is called.
+
+        :raises DaemonError: If another daemon is already listening
+        """
+        if os.path.exists(self.path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(self.path)
+                except OSError:
+                    os.unlink(self.path)
+                else:
+                    raise DaemonError(f"A daemon is already listening on {self.path}")
+
+        # Only the server needs socketserver, not clients forwarding commands
+        import socketserver
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                peer = _peer_uid(self.request)
+                if peer is not None and peer != os.getuid():
+                    LOGGER.warning("Refusing command from user %s", peer)
+                    return
+                try:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    request = json.loads(line)
+                    stdout = io.BufferedWriter(_ChunkWriter(self.wfile))
+                    status, _, stderr = daemon.run(request, stdout)
+                    trailer = {"status": status, "stderr": stderr}
+                    self.wfile.write(_CHUNK.pack(0))
+                    self.wfile.write(json.dumps(trailer).encode() + b"\n")
+                except (OSError, ValueError, KeyError) as ex:
+                    LOGGER.warning("Bad request from client: %s", ex)
+
+        # Only the owner may send commands, since they carry API keys
+        umask = os.umask(0o177)
+        try:
+            server = socketserver.UnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(umask)
+        # Wake up now and then to notice shutdown()
+        server.timeout = 0.5
+        LOGGER.info("Listening on %s", self.path)
+        try:
+            while not self._stopping:
+                server.handle_request()
+        finally:
+            server.server_close()
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+
+    def shutdown(self) -> None:
+        """Make :meth:`serve_forever` return, from another thread."""
+        self._stopping = True
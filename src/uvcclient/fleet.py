@@ -0,0 +1,261 @@
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any
+
+from uvcclient import camera
+from uvcclient.const import LOGGER
+from uvcclient.nvr import UVCRemote
+from uvcclient.retry import BreakerRegistry, Deadline
+
+PasswordLookup = Callable[[str], str | None]
+
+
+@dataclass
+class SnapshotResult:
+    """The outcome of fetching one camera's snapshot."""
+
+    uuid: str
+    name: str
+    #: "camera" if the camera served the image directly, "nvr" if it was
+    #: proxied through the NVR, or None if both failed
+    source: str | None = None
+    latency: float = 0.0
+    image: bytearray = field(default_factory=bytearray, repr=False)
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _fetch_snapshot(
+    client: UVCRemote,
+    server_version: tuple[int, int, int],
+    camera_info: dict[str, Any],
+    password: str,
+    timeout: float | None,
+    deadline: float | None,
+    sessions: camera.SessionCache | None,
+    breakers: BreakerRegistry | None,
+) -> SnapshotResult:
+    result = SnapshotResult(camera_info["uuid"], camera_info["name"])
+    start = time.monotonic()
+    # One budget for the camera, whichever way the snapshot comes
+    budget = Deadline(deadline)
+    try:
+        if camera_info.get("host"):
+            cam_client = camera.get_camera_client(
+                server_version,
+                camera_info["host"],
+                camera_info["username"],
+                password,
+                timeout=timeout,
+                sessions=sessions,
+                deadline=budget,
+                breakers=breakers,
+            )
+            try:
+                cam_client.ensure_login()
+                cam_client.stream_snapshot(result.image)
+                result.source = "camera"
+            except (camera.CameraAuthError, camera.CameraConnectError, OSError) as ex:
+                LOGGER.debug(
+                    "Direct snapshot from %s failed (%s), using NVR",
+                    camera_info["uuid"],
+                    ex,
+                )
+                del result.image[:]
+        if result.source is None:
+            # A camera that used up the budget gets no NVR fallback
+            budget.check()
+            client.stream_snapshot(camera_info["uuid"], result.image, deadline=budget)
+            result.source = "nvr"
+    except Exception as ex:
+        result.source = None
+        result.error = str(ex) or type(ex).__name__
+    result.latency = time.monotonic() - start
+    return result
+
+
+def fetch_snapshots(
+    client: UVCRemote,
+    cameras: Iterable[dict[str, Any]],
+    passwords: PasswordLookup | None = None,
+    workers: int = 8,
+    timeout: float | None = 10.0,
+    deadline: float | None = 10.0,
+    sessions: camera.SessionCache | None = None,
+    breakers: BreakerRegistry | None = None,
+) -> Iterator[SnapshotResult]:
+    """
+    Fetch snapshots from many cameras concurrently.
+
+    Each camera is tried directly first and, if that fails, through the
+    NVR, exactly like ``uvc --get-snapshot``. Results are yielded as soon
+    as each camera finishes, so a slow camera does not hold up the rest.
+
+    :param client: NVR client, used for the fallback path
+    :param cameras: Camera entries as returned by :meth:`UVCRemote.index`
+    :param passwords: Callable mapping a camera UUID to its stored admin
+                      password; "ubnt" is used when it returns None
+    :param workers: Maximum number of cameras fetched at once
+    :param timeout: Socket timeout in seconds for each camera connection
+    :param deadline: Seconds allowed for each camera, retries included,
+                     covering both trying it directly and the NVR fallback
+    :param sessions: Optional cache of camera sessions to reuse; new
+                     sessions are written to its store once, at the end
+    :param breakers: Optional circuit breakers, so that cameras that are
+                     known to be down go straight to the NVR
+    """
+    server_version = client.server_version
+    with (
+        sessions.batch() if sessions is not None else nullcontext(),
+        ThreadPoolExecutor(max_workers=workers) as executor,
+    ):
+        futures = [
+            executor.submit(
+                _fetch_snapshot,
+                client,
+                server_version,
+                cam,
+                (passwords(cam["uuid"]) if passwords else None) or "ubnt",
+                timeout,
+                deadline,
+                sessions,
+                breakers,
+            )
+            for cam in cameras
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+@dataclass
+class StatusResult:
+    """The outcome of asking one camera for its status."""
+
+    uuid: str
+    name: str
+    latency: float = 0.0
+    #: The camera's status document, or None if it could not be had
+    status: dict[str, Any] | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "uuid": self.uuid,
+            "name": self.name,
+            "ok": self.ok,
+            "latency": round(self.latency, 6),
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+def _fetch_status(
+    server_version: tuple[int, int, int],
+    camera_info: dict[str, Any],
+    password: str,
+    timeout: float | None,
+    deadline: float | None,
+    sessions: camera.SessionCache | None,
+    breakers: BreakerRegistry | None,
+) -> StatusResult:
+    result = StatusResult(camera_info["uuid"], camera_info["name"])
+    start = time.monotonic()
+    budget = Deadline(deadline)
+    try:
+        if not camera_info.get("host"):
+            raise camera.CameraConnectError("Camera has no address")
+        cam_client = camera.get_camera_client(
+            server_version,
+            camera_info["host"],
+            camera_info["username"],
+            password,
+            timeout=timeout,
+            sessions=sessions,
+            # Logging in and the status share the budget, retries included
+            deadline=budget,
+            breakers=breakers,
+        )
+        cam_client.ensure_login()
+        # Logging in may have used up the camera's time
+        budget.check()
+        result.status = cam_client.get_status()
+    except Exception as ex:
+        result.error = str(ex) or type(ex).__name__
+    result.latency = time.monotonic() - start
+    return result
+
+
+def status_all(
+    client: UVCRemote,
+    cameras: Iterable[dict[str, Any]],
+    passwords: PasswordLookup | None = None,
+    workers: int = 8,
+    timeout: float | None = 10.0,
+    deadline: float | None = 30.0,
+    sessions: camera.SessionCache | None = None,
+    breakers: BreakerRegistry | None = None,
+) -> Iterator[StatusResult]:
+    """
+    Log in to many cameras concurrently and fetch each one's status.
+
+    Cameras are handed to the pool as ``cameras`` yields them, with no
+    more than ``2 * workers`` submitted but unfinished at once, and
+    results are yielded as soon as each camera answers, so a slow or
+    dead camera holds up nothing but its own result. Failures are
+    reported in the result rather than raised.
+
+    :param client: NVR client, for the NVR version
+    :param cameras: Camera entries as returned by :meth:`UVCRemote.index`
+    :param passwords: Callable mapping a camera UUID to its stored admin
+                      password; "ubnt" is used when it returns None
+    :param workers: Maximum number of cameras contacted at once
+    :param timeout: Socket timeout in seconds for each camera connection
+    :param deadline: Seconds allowed for each camera, logging in and
+                     retries included; a camera that has not logged in
+                     by then is not asked for its status
+    :param sessions: Optional cache of camera sessions to reuse; new
+                     sessions are written to its store once, at the end
+    :param breakers: Optional circuit breakers, so that cameras known
+                     to be down fail straight away
+    """
+    server_version = client.server_version
+    with (
+        sessions.batch() if sessions is not None else nullcontext(),
+        ThreadPoolExecutor(max_workers=workers) as executor,
+    ):
+        pending: set[Future[StatusResult]] = set()
+        for cam in cameras:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(
+                executor.submit(
+                    _fetch_status,
+                    server_version,
+                    cam,
+                    (passwords(cam["uuid"]) if passwords else None) or "ubnt",
+                    timeout,
+                    deadline,
+                    sessions,
+                    breakers,
+                )
+            )
+        for future in as_completed(pending):
+            yield future.result()
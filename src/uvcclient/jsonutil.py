@@ -0,0 +1,42 @@
+"""
+JSON encoding and decoding for NVR and camera documents.
+
+orjson is used when it is installed, since camera documents are large
+and it is several times faster than the standard library; otherwise
+this falls back to :mod:`json`. Either way :func:`dumps` returns bytes
+ready to be sent as a request body.
+"""
+
+import functools
+import json
+from importlib.util import find_spec
+from types import ModuleType
+from typing import Any
+
+# Only looked for here: orjson pulls in uuid, zoneinfo and platform, so
+# it is imported on first use rather than by every command at startup
+HAVE_ORJSON = find_spec("orjson") is not None
+
+
+BACKEND = "orjson" if HAVE_ORJSON else "json"
+
+
+@functools.cache
+def _orjson() -> ModuleType:
+    import orjson
+
+    return orjson
+
+
+def dumps(obj: Any) -> bytes:
+    if HAVE_ORJSON:
+        return _orjson().dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    if HAVE_ORJSON:
+        return _orjson().loads(data)
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
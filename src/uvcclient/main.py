@@ -14,59 +14,130 @@
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import getpass
 import logging
 import optparse
+import os
 import sys
-from typing import Any
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING, Any
 
-from . import camera, nvr, store
-from .nvr import Invalid, UVCRemote
+from . import store
 
-INFO_STORE = store.get_info_store()
+if TYPE_CHECKING:
+    from . import camera
+    from .cache import SnapshotCache
+    from .nvr import UVCRemote
+    from .retry import BreakerRegistry
+    from .stream import Sink
+
+# uvc is run from cron a lot, so nothing is read from disk and no camera
+# code is imported until a command actually needs it
+INFO_STORE = store.get_info_store(lazy=True)
+_SESSIONS: "camera.SessionCache | None" = None
+_BREAKERS: "BreakerRegistry | None" = None
+# Set by the daemon, so that snapshots asked for again soon after are
+# served from memory
+SNAPSHOT_CACHE: "SnapshotCache[str] | None" = None
+
+
+# Columns of CSV output
+INDEX_FIELDS = (
+    "uuid",
+    "name",
+    "id",
+    "state",
+    "managed",
+    "recordmode",
+    "model",
+    "host",
+    "username",
+)
+STATUS_FIELDS = ("uuid", "name", "ok", "latency", "status", "error")
+
+
+def get_sessions() -> "camera.SessionCache":
+    global _SESSIONS
+    if _SESSIONS is None:
+        from . import camera
+
+        _SESSIONS = camera.SessionCache(store=INFO_STORE)
+    return _SESSIONS
+
+
+def get_breakers() -> "BreakerRegistry":
+    # Only lasts as long as the process, so mostly of use to the daemon
+    global _BREAKERS
+    if _BREAKERS is None:
+        from .retry import BreakerRegistry
+
+        _BREAKERS = BreakerRegistry()
+    return _BREAKERS
 
 
 def do_led(camera_info: dict[str, Any], enabled: bool) -> None:
+    from . import camera
+
     password = INFO_STORE.get_camera_password(camera_info["uuid"]) or "ubnt"
     cam_client = camera.UVCCameraClient(
-        camera_info["host"], camera_info["username"], password
+        camera_info["host"],
+        camera_info["username"],
+        password,
+        sessions=get_sessions(),
+        breakers=get_breakers(),
     )
-    cam_client.login()
+    cam_client.ensure_login()
     cam_client.set_led(enabled)
 
 
-def do_snapshot(client: UVCRemote, camera_info: dict[str, Any]) -> bytes:
+def do_snapshot(client: "UVCRemote", camera_info: dict[str, Any], out: "Sink") -> int:
+    if SNAPSHOT_CACHE is None:
+        return _stream_snapshot(client, camera_info, out)
+    from .stream import write_bytes
+
+    def fetch() -> bytearray:
+        image = bytearray()
+        _stream_snapshot(client, camera_info, image)
+        return image
+
+    return write_bytes(out, SNAPSHOT_CACHE.get(camera_info["uuid"], fetch))
+
+
+def _stream_snapshot(
+    client: "UVCRemote", camera_info: dict[str, Any], out: "Sink"
+) -> int:
+    from . import camera
+
     password = INFO_STORE.get_camera_password(camera_info["uuid"]) or "ubnt"
-    cam_client: camera.UVCCameraClient
-    if client.server_version >= (3, 2, 0):
-        cam_client = camera.UVCCameraClientV320(
-            camera_info["host"], camera_info["username"], password
-        )
-    else:
-        cam_client = camera.UVCCameraClient(
-            camera_info["host"], camera_info["username"], password
-        )
+    cam_client = camera.get_camera_client(
+        client.server_version,
+        camera_info["host"],
+        camera_info["username"],
+        password,
+        sessions=get_sessions(),
+        breakers=get_breakers(),
+    )
     try:
-        cam_client.login()
-        return cam_client.get_snapshot()
+        cam_client.ensure_login()
+        return cam_client.stream_snapshot(out)
     except (camera.CameraAuthError, camera.CameraConnectError):
         # Fall back to proxy through the NVR
-        return client.get_snapshot(camera_info["uuid"])
+        return client.stream_snapshot(camera_info["uuid"], out)
 
 
-def do_reboot(client: UVCRemote, camera_info: dict[str, Any]) -> None:
+def do_reboot(client: "UVCRemote", camera_info: dict[str, Any]) -> None:
+    from . import camera
+
     password = INFO_STORE.get_camera_password(camera_info["uuid"]) or "ubnt"
-    cam_client: camera.UVCCameraClient
-    if client.server_version >= (3, 2, 0):
-        cam_client = camera.UVCCameraClientV320(
-            camera_info["host"], camera_info["username"], password
-        )
-    else:
-        cam_client = camera.UVCCameraClient(
-            camera_info["host"], camera_info["username"], password
-        )
+    cam_client = camera.get_camera_client(
+        client.server_version,
+        camera_info["host"],
+        camera_info["username"],
+        password,
+        sessions=get_sessions(),
+        breakers=get_breakers(),
+    )
     try:
-        cam_client.login()
+        cam_client.ensure_login()
         return cam_client.reboot()
     except camera.CameraAuthError:
         print("Failed to login to camera")
@@ -76,11 +147,99 @@ def do_reboot(client: UVCRemote, camera_info: dict[str, Any]) -> None:
         print(f"Failed to reboot: {e}")
 
 
+def do_snapshot_all(client: "UVCRemote", directory: str, opts: optparse.Values) -> int:
+    from . import fleet
+
+    cameras = [cam for cam in client.index() if cam["state"] == "CONNECTED"]
+    failed = 0
+    for result in fleet.fetch_snapshots(
+        client,
+        cameras,
+        INFO_STORE.get_camera_password,
+        workers=opts.workers,
+        timeout=opts.timeout,
+        deadline=opts.timeout,
+        sessions=get_sessions(),
+        breakers=get_breakers(),
+    ):
+        latency = f"{result.latency * 1000:.0f}ms"
+        if not result.ok:
+            failed += 1
+            print(
+                f"{result.uuid}: {result.name:<24.24} [{'failed':>6}] {latency:>7} {result.error}"
+            )
+            continue
+        path = os.path.join(directory, f"{result.uuid}.jpg")
+        with open(path + ".tmp", "wb") as f:
+            f.write(result.image)
+        os.replace(path + ".tmp", path)
+        print(
+            f"{result.uuid}: {result.name:<24.24} [{result.source:>6}] {latency:>7} {len(result.image)} bytes"
+        )
+    return 1 if failed else 0
+
+
+def do_status_all(client: "UVCRemote", opts: optparse.Values) -> int:
+    from . import fleet, output
+
+    failed = False
+    # NDJSON unless asked otherwise, so that each camera can be read as
+    # soon as it answers
+    fmt = "ndjson" if opts.format == "text" else opts.format
+    with output.RowWriter(sys.stdout, fmt, STATUS_FIELDS) as writer:
+        for result in fleet.status_all(
+            client,
+            client.index(),
+            INFO_STORE.get_camera_password,
+            workers=opts.workers,
+            timeout=opts.timeout,
+            deadline=opts.timeout,
+            sessions=get_sessions(),
+            breakers=get_breakers(),
+        ):
+            failed = failed or not result.ok
+            writer.write(result.as_dict())
+    return 1 if failed else 0
+
+
+def do_record(
+    client: "UVCRemote", camera_info: dict[str, Any], opts: optparse.Values
+) -> int:
+    from . import camera, recorder
+
+    password = INFO_STORE.get_camera_password(camera_info["uuid"]) or "ubnt"
+    cam_client = camera.get_camera_client(
+        client.server_version,
+        camera_info["host"],
+        camera_info["username"],
+        password,
+        sessions=get_sessions(),
+        breakers=get_breakers(),
+    )
+    size = int(opts.ring_size * 1024 * 1024)
+    try:
+        ring = recorder.RingWriter(opts.record, size, overwrite=opts.overwrite)
+    except (OSError, ValueError, recorder.RingError) as e:
+        print(f"Unable to open {opts.record}: {e}")
+        return 1
+    with ring:
+        rec = recorder.Recorder(cam_client, ring, opts.fps)
+        try:
+            rec.run(opts.frames or None)
+        except KeyboardInterrupt:
+            pass
+        ring.flush()
+    print(f"Recorded {rec.frames} frames ({rec.errors} failed, {rec.skipped} skipped)")
+    return 1 if rec.errors and not rec.frames else 0
+
+
 def do_set_password(opts: optparse.Values) -> None:
     print("This will store the administrator password for a camera ")
     print("for later use. It will be stored on disk obscured, but ")
     print("NOT ENCRYPTED! If this is not okay, cancel now.")
     print("")
+    import getpass
+
     password1 = getpass.getpass("Password: ")
     password2 = getpass.getpass("Confirm: ")
     if password1 != password2:
@@ -90,8 +249,33 @@ def do_set_password(opts: optparse.Values) -> None:
     print("Password set")
 
 
-def main() -> int:
-    host, port, apikey, path = nvr.get_auth_from_env()
+def main(
+    argv: list[str] | None = None,
+    env: Mapping[str, str] | None = None,
+    get_client: Callable[[str, int, str], "UVCRemote"] | None = None,
+) -> int:
+    """
+    Run the uvc command line.
+
+    Unless told otherwise, the command is handed to a running daemon
+    (see :mod:`uvcclient.daemon`) and only run here if there is none.
+
+    :param argv: Arguments, defaulting to those of this process
+    :param env: Environment to read NVR details from instead of ours
+    :param get_client: Returns the client to use for an NVR, in place of
+                       constructing a new one
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+        from . import daemon
+
+        forwarded = daemon.forward(argv)
+        if forwarded is not None:
+            return forwarded
+
+    from . import nvr
+
+    host, port, apikey, path = nvr.get_auth_from_env(env)
 
     parser = optparse.OptionParser()
     parser.add_option("-H", "--host", default=host, help="UVC Hostname")
@@ -102,9 +286,25 @@ def main() -> int:
     parser.add_option("-u", "--uuid", default=None, help="Camera UUID")
     parser.add_option("--name", default=None, help="Camera name")
     parser.add_option("-l", "--list", action="store_true", default=False)
+    parser.add_option(
+        "--format",
+        default="text",
+        type="choice",
+        choices=["text", "json", "ndjson", "csv"],
+        help=(
+            "Output format of --dump, --list, --list-zones, --get-recordmode, "
+            "--get-picture-settings and --status-all (text,json,ndjson,csv)"
+        ),
+    )
     parser.add_option(
         "--recordmode", default=None, help="Recording mode (none,full,motion)"
     )
+    parser.add_option(
+        "--all",
+        action="store_true",
+        default=False,
+        help="Apply --recordmode to every camera",
+    )
     parser.add_option(
         "--get-recordmode",
         default=None,
@@ -141,6 +341,61 @@ def main() -> int:
         action="store_true",
         help="Get a snapshot image and write to stdout",
     )
+    parser.add_option(
+        "--snapshot-all",
+        default=None,
+        metavar="DIR",
+        help="Get a snapshot from every online camera and write them to DIR",
+    )
+    parser.add_option(
+        "--status-all",
+        default=None,
+        action="store_true",
+        help="Get the status of every camera and write it to stdout as NDJSON",
+    )
+    parser.add_option(
+        "--workers",
+        default=8,
+        type=int,
+        help="Number of cameras to contact at once (default 8)",
+    )
+    parser.add_option(
+        "--timeout",
+        default=10.0,
+        type=float,
+        help="Per-camera timeout in seconds (default 10)",
+    )
+    parser.add_option(
+        "--record",
+        default=None,
+        metavar="PATH",
+        help="Record snapshots from a camera into a ring buffer file at PATH",
+    )
+    parser.add_option(
+        "--fps",
+        default=1.0,
+        type=float,
+        help="Frames per second to --record (default 1)",
+    )
+    parser.add_option(
+        "--ring-size",
+        default=64.0,
+        type=float,
+        metavar="MB",
+        help="Size of the --record ring buffer in MiB (default 64)",
+    )
+    parser.add_option(
+        "--frames",
+        default=0,
+        type=int,
+        help="Stop --record after this many frames (default: until interrupted)",
+    )
+    parser.add_option(
+        "--overwrite",
+        action="store_true",
+        default=False,
+        help=("Let --record replace a file that is not a ring buffer of --ring-size"),
+    )
     parser.add_option(
         "--reboot", default=None, action="store_true", help="Reboot camera"
     )
@@ -159,11 +414,22 @@ def main() -> int:
         action="store_true",
         help="Store camera password",
     )
-    opts, args = parser.parse_args()
-
-    if not all([host, port, apikey]):
-        print("Host, port, and apikey are required")
-        return 1
+    parser.add_option(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help=(
+            "Serve commands from other uvc runs on a local socket, "
+            "set with UVC_SOCKET, keeping connections and logins warm"
+        ),
+    )
+    parser.add_option(
+        "--no-daemon",
+        action="store_true",
+        default=False,
+        help="Run here even if a daemon is running",
+    )
+    opts, args = parser.parse_args(argv)
 
     if opts.verbose:
         level = logging.DEBUG
@@ -171,20 +437,59 @@ def main() -> int:
         level = logging.WARNING
     logging.basicConfig(level=level)
 
-    client = nvr.UVCRemote(opts.host, opts.port, opts.apikey)
+    if opts.daemon:
+        import signal
+
+        from . import daemon
+
+        # Let the socket be cleaned up when stopped by a service manager
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            daemon.Daemon().serve_forever()
+        except daemon.DaemonError as e:
+            print(e)
+            return 1
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not all([host, port, apikey]):
+        print("Host, port, and apikey are required")
+        return 1
+
+    if get_client is not None:
+        client = get_client(opts.host, opts.port, opts.apikey)
+    else:
+        client = nvr.UVCRemote(opts.host, opts.port, opts.apikey, info_store=INFO_STORE)
 
     if opts.name:
-        opts.uuid = client.name_to_uuid(opts.name)
+        try:
+            opts.uuid = client.name_to_uuid(opts.name)
+        except nvr.AmbiguousName as e:
+            print(e)
+            return 1
         if not opts.uuid:
             print(f"`{opts.name}' is not a valid name")
             return 1
 
     if opts.dump:
-        client.dump(opts.uuid)
+        if opts.format != "text":
+            from . import output
+
+            output.write_record(sys.stdout, opts.format, client.get_camera(opts.uuid))
+        else:
+            client.dump(opts.uuid)
     elif opts.list:
-        for cam in client.index():
-            ident = cam[client.camera_identifier]
-            recmode = client.get_recordmode(ident)
+        # Also warms the name index, which matters when running as a daemon
+        if opts.format != "text":
+            from . import output
+
+            output.write_rows(
+                sys.stdout, opts.format, client.iter_index(), INDEX_FIELDS
+            )
+            return 0
+        for cam in client.refresh_index():
+            recmode = cam["recordmode"]
             if not cam["managed"]:
                 status = "new"
             elif cam["state"] == "FIRMWARE_OUTDATED":
@@ -198,6 +503,20 @@ def main() -> int:
             else:
                 status = "unknown:{}".format(cam["state"])
             print(f"{cam['uuid']}: {cam['name']:<24.24} [{status:>10}] {recmode}")
+    elif opts.recordmode and opts.all:
+        failed = False
+        for change in client.set_recordmode_many(
+            None, opts.recordmode, opts.recordchannel, workers=opts.workers
+        ):
+            status = change.status
+            if change.error:
+                failed = True
+                status = f"{status}: {change.error}"
+            print(
+                f"{change.id}: {change.name:<24.24} "
+                f"{change.previous or '-':>6} -> {opts.recordmode:<6} [{status}]"
+            )
+        return 1 if failed else 0
     elif opts.recordmode:
         if not opts.uuid:
             print("Name or UUID is required")
@@ -213,10 +532,22 @@ def main() -> int:
             print("Name or UUID is required")
             return 1
         res = client.get_recordmode(opts.uuid)
-        print(res)
+        if opts.format != "text":
+            from . import output
+
+            output.write_record(
+                sys.stdout, opts.format, {"uuid": opts.uuid, "recordmode": res}
+            )
+        else:
+            print(res)
         return res == "none"
     elif opts.get_picture_settings:
         settings = client.get_picture_settings(opts.uuid)
+        if opts.format != "text":
+            from . import output
+
+            output.write_record(sys.stdout, opts.format, settings)
+            return 0
         print(",".join([f"{k}={v}" for k, v in settings.items()]))
         return 0
     elif opts.set_picture_settings:
@@ -230,7 +561,7 @@ def main() -> int:
             return 1
         try:
             result = client.set_picture_settings(opts.uuid, settings)
-        except Invalid as e:
+        except nvr.Invalid as e:
             print(f"Invalid value: {e}")
             return 1
         for k in settings:
@@ -256,6 +587,11 @@ def main() -> int:
             print("Name or UUID is required")
             return 1
         zones = client.list_zones(opts.uuid)
+        if opts.format != "text":
+            from . import output
+
+            output.write_rows(sys.stdout, opts.format, zones)
+            return 0
         for zone in zones:
             print(zone["name"])
     elif opts.get_snapshot:
@@ -263,7 +599,21 @@ def main() -> int:
         if not camera:
             print("No such camera")
             return 1
-        sys.stdout.buffer.write(do_snapshot(client, camera))
+        do_snapshot(client, camera, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    elif opts.snapshot_all:
+        return do_snapshot_all(client, opts.snapshot_all, opts)
+    elif opts.status_all:
+        return do_status_all(client, opts)
+    elif opts.record:
+        if opts.fps <= 0 or opts.ring_size <= 0:
+            print("--fps and --ring-size must be positive")
+            return 1
+        camera = client.get_camera(opts.uuid)
+        if not camera:
+            print("No such camera")
+            return 1
+        return do_record(client, camera, opts)
     elif opts.reboot:
         camera = client.get_camera(opts.uuid)
         if not camera:
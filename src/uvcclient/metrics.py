@@ -0,0 +1,285 @@
+"""
+Hooks around every HTTP request, and metrics built on them.
+
+Pass an :class:`Instrumentation` to :class:`~uvcclient.nvr.UVCRemote` or a
+camera client to have pre-request hooks called as each request starts
+and post-request hooks called once it has finished. Each hook gets the
+same :class:`RequestInfo`. URLs passed to hooks never include the API
+key. :class:`Metrics` is a ready-made post-request hook that keeps
+per-endpoint latency histograms and counters::
+
+    metrics = Metrics()
+    instrumentation = Instrumentation()
+    instrumentation.add_post_hook(metrics.record)
+    client = UVCRemote(host, port, apikey, instrumentation=instrumentation)
+    ...
+    print(metrics.prometheus())
+"""
+
+import bisect
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from uvcclient.const import LOGGER
+
+#: Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_APIKEY_RE = re.compile(r"(apiKey=)[^&]*", re.IGNORECASE)
+_ID_RE = re.compile(r"^(?:[0-9a-fA-F]{24}|[0-9a-fA-F-]{36}|\d+)$")
+# Path segments that are followed by a camera id or UUID
+_COLLECTIONS = {"camera"}
+
+
+def redact(url: str) -> str:
+    """Hide the API key in a URL."""
+    return _APIKEY_RE.sub(r"\1REDACTED", url)
+
+
+def endpoint_of(url: str) -> str:
+    """
+    Reduce a URL to the endpoint it calls, for grouping metrics.
+
+    The query string is dropped and camera ids are replaced, so that
+    ``/api/2.0/camera/5f3c...?apiKey=...`` becomes ``/api/2.0/camera/{id}``.
+    """
+    parts = url.split("?", 1)[0].split("/")
+    for i, part in enumerate(parts):
+        if part and (_ID_RE.match(part) or (i and parts[i - 1] in _COLLECTIONS)):
+            parts[i] = "{id}"
+    return "/".join(parts)
+
+
+@dataclass
+class RequestInfo:
+    """
+    One HTTP request, as seen by instrumentation hooks.
+
+    Pre-request hooks see the request as it starts; the response fields
+    are filled in by the time post-request hooks are called. For NVR
+    requests ``duration`` and ``bytes_in`` cover reading the whole body;
+    for camera requests, whose bodies are read by the caller, they stop
+    at the response headers and the Content-Length.
+    """
+
+    #: "nvr" or "camera"
+    target: str
+    method: str
+    #: The path without the query string and with ids replaced
+    endpoint: str
+    #: The URL with any API key redacted
+    url: str
+    start: float = field(default_factory=time.monotonic)
+    bytes_out: int = 0
+    bytes_in: int = 0
+    status: int | None = None
+    #: Whether the request went out on a kept-alive connection
+    reused: bool = False
+    retries: int = 0
+    duration: float = 0.0
+    error: str | None = None
+
+    def count_in(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass response body chunks through, adding up their size."""
+        for chunk in chunks:
+            self.bytes_in += len(chunk)
+            yield chunk
+
+    def retried(self) -> None:
+        self.retries += 1
+
+
+Hook = Callable[[RequestInfo], None]
+
+
+class Instrumentation:
+    """
+    A set of hooks called around every request a client makes.
+
+    Hooks are called on the thread making the request. An exception
+    from a hook is logged and otherwise ignored.
+    """
+
+    def __init__(self) -> None:
+        self._pre: list[Hook] = []
+        self._post: list[Hook] = []
+
+    def add_pre_hook(self, hook: Hook) -> None:
+        self._pre.append(hook)
+
+    def add_post_hook(self, hook: Hook) -> None:
+        self._post.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        for hooks in (self._pre, self._post):
+            while hook in hooks:
+                hooks.remove(hook)
+
+    def _call(self, hooks: list[Hook], info: RequestInfo) -> None:
+        for hook in hooks:
+            try:
+                hook(info)
+            except Exception:
+                LOGGER.exception("Request hook %r failed", hook)
+
+    @contextmanager
+    def track(self, target: str, method: str, url: str) -> Iterator[RequestInfo]:
+        """
+        Call the hooks around the request made inside the ``with`` block.
+
+        :param url: The URL requested; any API key in it is redacted
+        """
+        url = redact(url)
+        info = RequestInfo(target, method, endpoint_of(url), url)
+        self._call(self._pre, info)
+        try:
+            yield info
+        except GeneratorExit:
+            # A streamed response the caller stopped reading early
+            raise
+        except BaseException as ex:
+            info.error = str(ex) or type(ex).__name__
+            raise
+        finally:
+            info.duration = time.monotonic() - info.start
+            self._call(self._post, info)
+
+
+class _EndpointStats:
+    __slots__ = (
+        "buckets",
+        "bytes_in",
+        "bytes_out",
+        "count",
+        "errors",
+        "retries",
+        "reused",
+        "statuses",
+        "total",
+    )
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.reused = 0
+        self.errors = 0
+        self.statuses: Counter[int] = Counter()
+
+
+class Metrics:
+    """Per-endpoint request metrics, fed by :meth:`record` as a post hook."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str, str], _EndpointStats] = {}
+
+    def record(self, info: RequestInfo) -> None:
+        key = (info.target, info.method, info.endpoint)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+            stats.buckets[bisect.bisect_left(BUCKETS, info.duration)] += 1
+            stats.count += 1
+            stats.total += info.duration
+            stats.bytes_in += info.bytes_in
+            stats.bytes_out += info.bytes_out
+            stats.retries += info.retries
+            stats.reused += info.reused
+            if info.status is not None:
+                stats.statuses[info.status] += 1
+            if info.error is not None:
+                stats.errors += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        Return the metrics as plain data.
+
+        :returns: A dictionary keyed by "<target> <method> <endpoint>".
+                  Each value has count, total_seconds, bytes_in,
+                  bytes_out, retries, reused, errors, statuses (by
+                  code) and buckets (cumulative counts by upper bound,
+                  ending with "+Inf")
+        """
+        result = {}
+        with self._lock:
+            for (target, method, endpoint), stats in sorted(self._stats.items()):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(
+                    [*map(str, BUCKETS), "+Inf"], stats.buckets, strict=True
+                ):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                result[f"{target} {method} {endpoint}"] = {
+                    "count": stats.count,
+                    "total_seconds": stats.total,
+                    "bytes_in": stats.bytes_in,
+                    "bytes_out": stats.bytes_out,
+                    "retries": stats.retries,
+                    "reused": stats.reused,
+                    "errors": stats.errors,
+                    "statuses": dict(stats.statuses),
+                    "buckets": buckets,
+                }
+        return result
+
+    def prometheus(self, prefix: str = "uvcclient") -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Request latency",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        counters: dict[str, list[str]] = {
+            "requests_total": [],
+            "request_bytes_in_total": [],
+            "request_bytes_out_total": [],
+            "request_retries_total": [],
+            "request_reused_connections_total": [],
+            "request_errors_total": [],
+        }
+        for name, data in self.as_dict().items():
+            target, method, endpoint = name.split(" ", 2)
+            labels = (
+                f'target="{_escape(target)}",method="{_escape(method)}",'
+                f'endpoint="{_escape(endpoint)}"'
+            )
+            metric = f"{prefix}_request_duration_seconds"
+            for bound, count in data["buckets"].items():
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{metric}_sum{{{labels}}} {data['total_seconds']}")
+            lines.append(f"{metric}_count{{{labels}}} {data['count']}")
+            for status, count in sorted(data["statuses"].items()):
+                counters["requests_total"].append(
+                    f'{{{labels},status="{status}"}} {count}'
+                )
+            for counter, key in (
+                ("request_bytes_in_total", "bytes_in"),
+                ("request_bytes_out_total", "bytes_out"),
+                ("request_retries_total", "retries"),
+                ("request_reused_connections_total", "reused"),
+                ("request_errors_total", "errors"),
+            ):
+                counters[counter].append(f"{{{labels}}} {data[key]}")
+        for counter, samples in counters.items():
+            lines.append(f"# TYPE {prefix}_{counter} counter")
+            lines.extend(f"{prefix}_{counter}{sample}" for sample in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,236 @@
+"""
+Typed views of NVR camera documents.
+
+A camera document from the NVR is large and deeply nested, and only a
+handful of its fields are ever looked at. :class:`Camera` keeps the
+top-level fields that are, and holds the rest as the compact JSON it
+came from. The recording settings, picture settings and zones are only
+decoded when first accessed. :meth:`Camera.to_doc` rebuilds the whole
+document, including every field that is not modelled here and any
+changes made to the model, ready to be PUT back to the NVR, and
+:meth:`Camera.section` returns a single top-level section without
+rebuilding the rest.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from uvcclient import jsonutil
+
+RecordMode = Literal["none", "full", "motion"]
+
+
+def _put(doc: dict[str, Any], key: str, value: Any) -> None:
+    # Fields the NVR did not send are only added if they have been set,
+    # so that a round trip returns exactly what was parsed
+    if key in doc or value not in (None, ""):
+        doc[key] = value
+
+
+@dataclass(slots=True)
+class RecordingSettings:
+    full_time_record_enabled: bool = False
+    motion_record_enabled: bool = False
+    channel: int | None = None
+    raw: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_doc(cls, doc: dict[str, Any]) -> "RecordingSettings":
+        return cls(
+            bool(doc.get("fullTimeRecordEnabled")),
+            bool(doc.get("motionRecordEnabled")),
+            doc.get("channel"),
+            doc,
+        )
+
+    def to_doc(self) -> dict[str, Any]:
+        doc = dict(self.raw)
+        doc["fullTimeRecordEnabled"] = self.full_time_record_enabled
+        doc["motionRecordEnabled"] = self.motion_record_enabled
+        _put(doc, "channel", self.channel)
+        return doc
+
+    @property
+    def recordmode(self) -> RecordMode:
+        if self.full_time_record_enabled:
+            return "full"
+        elif self.motion_record_enabled:
+            return "motion"
+        else:
+            return "none"
+
+
+_ISP_KEYS = (
+    ("brightness", "brightness"),
+    ("contrast", "contrast"),
+    ("saturation", "saturation"),
+    ("sharpness", "sharpness"),
+    ("hue", "hue"),
+    ("denoise", "denoise"),
+    ("ir_led_mode", "irLedMode"),
+    ("ir_led_level", "irLedLevel"),
+)
+
+
+@dataclass(slots=True)
+class IspSettings:
+    """
+    Picture settings. Each field is None if the camera does not have it;
+    settings not modelled here are kept in ``raw``.
+    """
+
+    brightness: int | None = None
+    contrast: int | None = None
+    saturation: int | None = None
+    sharpness: int | None = None
+    hue: int | None = None
+    denoise: int | None = None
+    ir_led_mode: str | None = None
+    ir_led_level: int | None = None
+    raw: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_doc(cls, doc: dict[str, Any]) -> "IspSettings":
+        settings = cls(raw=doc)
+        for attr, key in _ISP_KEYS:
+            setattr(settings, attr, doc.get(key))
+        return settings
+
+    def to_doc(self) -> dict[str, Any]:
+        doc = dict(self.raw)
+        for attr, key in _ISP_KEYS:
+            _put(doc, key, getattr(self, attr))
+        return doc
+
+
+@dataclass(slots=True)
+class Zone:
+    name: str
+    raw: dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_doc(cls, doc: dict[str, Any]) -> "Zone":
+        return cls(doc.get("name", ""), doc)
+
+    def to_doc(self) -> dict[str, Any]:
+        return {**self.raw, "name": self.name}
+
+
+# Top-level fields that are decoded up front, by attribute name
+_CAMERA_KEYS = (
+    ("id", "_id"),
+    ("uuid", "uuid"),
+    ("name", "name"),
+    ("state", "state"),
+    ("managed", "managed"),
+    ("model", "model"),
+    ("host", "host"),
+    ("username", "username"),
+    ("deleted", "deleted"),
+)
+
+
+@dataclass(slots=True)
+class Camera:
+    """
+    One camera, as returned by :meth:`uvcclient.nvr.UVCRemote.cameras`.
+
+    The whole document is kept in ``raw`` as compact JSON. Modelled
+    fields can be changed, and are written back by :meth:`to_doc`.
+    """
+
+    id: str
+    uuid: str
+    name: str
+    state: str | None = None
+    managed: bool | None = None
+    model: str | None = None
+    host: str | None = None
+    username: str | None = None
+    deleted: bool | None = None
+    raw: bytes = field(default=b"{}", repr=False)
+    _recording: RecordingSettings | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _isp: IspSettings | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _zones: list[Zone] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def from_doc(cls, doc: dict[str, Any]) -> "Camera":
+        return cls(
+            doc.get("_id", ""),
+            doc.get("uuid", ""),
+            doc.get("name", ""),
+            doc.get("state"),
+            doc.get("managed"),
+            doc.get("model"),
+            doc.get("host"),
+            doc.get("username"),
+            doc.get("deleted"),
+            # orjson hands back its whole write buffer, which is at least
+            # 1KiB; copy it down to size, since models are kept in caches
+            bytes(memoryview(jsonutil.dumps(doc))),
+        )
+
+    @classmethod
+    def from_json(cls, raw: bytes | bytearray | memoryview) -> "Camera":
+        return cls.from_doc(jsonutil.loads(raw))
+
+    def _section(self, key: str) -> Any:
+        return jsonutil.loads(self.raw).get(key)
+
+    def section(self, key: str) -> Any:
+        """
+        Return a copy of one top-level section of the document, such as
+        ``"ispSettings"``, with any changes to the model applied.
+
+        :returns: The section, or None if the document has none
+        """
+        if key == "recordingSettings" and self._recording is not None:
+            return self._recording.to_doc()
+        if key == "ispSettings" and self._isp is not None:
+            return self._isp.to_doc()
+        if key == "zones" and self._zones is not None:
+            return [zone.to_doc() for zone in self._zones]
+        return self._section(key)
+
+    @property
+    def recording_settings(self) -> RecordingSettings:
+        if self._recording is None:
+            self._recording = RecordingSettings.from_doc(
+                self._section("recordingSettings") or {}
+            )
+        return self._recording
+
+    @property
+    def isp_settings(self) -> IspSettings:
+        if self._isp is None:
+            self._isp = IspSettings.from_doc(self._section("ispSettings") or {})
+        return self._isp
+
+    @property
+    def zones(self) -> list[Zone]:
+        if self._zones is None:
+            self._zones = [Zone.from_doc(z) for z in self._section("zones") or []]
+        return self._zones
+
+    @property
+    def recordmode(self) -> RecordMode:
+        return self.recording_settings.recordmode
+
+    def to_doc(self) -> dict[str, Any]:
+        """Return the full camera document, with any changes applied."""
+        doc: dict[str, Any] = jsonutil.loads(self.raw)
+        for attr, key in _CAMERA_KEYS:
+            _put(doc, key, getattr(self, attr))
+        if self._recording is not None:
+            doc["recordingSettings"] = self._recording.to_doc()
+        if self._isp is not None:
+            doc["ispSettings"] = self._isp.to_doc()
+        if self._zones is not None:
+            doc["zones"] = [zone.to_doc() for zone in self._zones]
+        return doc
@@ -16,15 +16,53 @@
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-import json
+import logging
 import os
-import pprint
+import time
 import urllib.parse as urlparse
-import zlib
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from contextlib import AbstractContextManager, nullcontext
 from http import client as httplib
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal, TypeVar
 
+from uvcclient import jsonutil
+from uvcclient.cache import SnapshotCache, TTLCache
 from uvcclient.const import LOGGER
+from uvcclient.pool import ConnectionPool
+from uvcclient.retry import (
+    DEFAULT_TIMEOUTS,
+    NO_RETRY,
+    BreakerRegistry,
+    Deadline,
+    RetryPolicy,
+    Timeouts,
+    call,
+)
+from uvcclient.store import InfoStore, UnableToManageStore
+from uvcclient.stream import (
+    CHUNK_SIZE,
+    Sink,
+    content_encoding,
+    copy_response,
+    iter_body,
+    iter_decoded,
+    iter_json_array,
+    write_bytes,
+)
+
+if TYPE_CHECKING:
+    from uvcclient.metrics import Instrumentation, RequestInfo
+    from uvcclient.models import Camera
+
+#: Every encoding listed here must be understood by stream.iter_decoded
+ACCEPT_ENCODING = "gzip, deflate"
+
+#: Methods retried by the retry policy after a timeout or other failure.
+#: Narrower than pool.RESENDABLE_METHODS, since a request that timed out
+#: may have reached the NVR and a PUT to it is not worth repeating blind.
+RETRYABLE_METHODS = ("GET", "HEAD")
+
+T = TypeVar("T")
 
 
 class Invalid(Exception):
@@ -43,13 +81,190 @@ class CameraConnectionError(Exception):
     pass
 
 
+class UpdateConflict(NvrError):
+    """A camera was changed on the NVR while we were changing it too."""
+
+
+class AmbiguousName(Invalid):
+    pass
+
+
+class RecordModeResult:
+    """The outcome of changing one camera in :meth:`UVCRemote.set_recordmode_many`."""
+
+    # A plain class rather than a dataclass, to keep dataclasses off the
+    # import path of every command
+    _FIELDS = ("id", "name", "previous", "status", "error")
+    __slots__ = _FIELDS
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        previous: str | None,
+        status: str,
+        error: str | None = None,
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.previous = previous
+        #: One of "changed", "unchanged" or "failed"
+        self.status = status
+        self.error = error
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._FIELDS)
+        return f"RecordModeResult({fields})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RecordModeResult):
+            return NotImplemented
+        return all(getattr(self, x) == getattr(other, x) for x in self._FIELDS)
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+class CameraUpdate:
+    """
+    A set of changes to one camera, sent to the NVR in a single PUT.
+
+    Get one from :meth:`UVCRemote.update_camera` and either use it as a
+    context manager, which commits the changes when the block exits
+    without an error, or call :meth:`commit` yourself::
+
+        with client.update_camera(uuid) as update:
+            update.set_recordmode("motion", "high")
+            update.set_picture_settings({"brightness": 60})
+            update.prune_zones()
+
+    Changes are applied in the order they were made. Setting values are
+    checked against the camera's current document, like
+    :meth:`UVCRemote.set_picture_settings` does, before anything is sent.
+    """
+
+    def __init__(self, client: "UVCRemote", uuid: str) -> None:
+        self._client = client
+        self._uuid = uuid
+        self._changes: list[Callable[[dict[str, Any]], None]] = []
+        #: The camera's document after :meth:`commit`
+        self.result: dict[str, Any] | None = None
+
+    def set_recordmode(self, mode: str, chan: str | None = None) -> "CameraUpdate":
+        """
+        Change the recording mode, and optionally the channel recorded.
+
+        :param mode: One of none, full, or motion
+        :param chan: One of the values from CHANNEL_NAMES
+        """
+        # Check the values now, so a typo fails where it was made
+        _set_recordmode({}, mode, chan)
+        self._changes.append(
+            lambda doc: _set_recordmode(doc["recordingSettings"], mode, chan)
+        )
+        return self
+
+    def set_picture_settings(self, settings: dict[str, Any]) -> "CameraUpdate":
+        settings = dict(settings)
+        self._changes.append(
+            lambda doc: _update_picture_settings(doc["ispSettings"], settings)
+        )
+        return self
+
+    def prune_zones(self) -> "CameraUpdate":
+        """Remove all but the first (default) zone."""
+        self._changes.append(lambda doc: doc.update(zones=doc["zones"][:1]))
+        return self
+
+    def _apply(self, doc: dict[str, Any]) -> None:
+        for change in self._changes:
+            change(doc)
+
+    def commit(self) -> dict[str, Any]:
+        """
+        Send the changes, fetching the camera once and PUTting once.
+
+        Nothing is sent if the changes leave the camera as it was.
+
+        :returns: The camera's document after the update
+        :raises Invalid: If a setting has the wrong type for the camera
+        """
+        self.result = self._client.patch_camera(self._uuid, self._apply)
+        self._changes = []
+        return self.result
+
+    def __enter__(self) -> "CameraUpdate":
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc: Any) -> None:
+        if exc_type is None:
+            self.commit()
+
+
 class UVCRemote:
-    """Remote control client for Ubiquiti Unifi Video NVR."""
+    """
+    Remote control client for Ubiquiti Unifi Video NVR.
+
+    Cameras can optionally be cached by passing a ``camera_cache_ttl``.
+    Reads are then served from the cache until the entry expires, and
+    writes refresh the cached copy from the NVR's response. The cache
+    holds compact :class:`~uvcclient.models.Camera` models rather than
+    documents; these are shared, so callers must not modify what
+    :meth:`camera` returns. :meth:`get_camera` returns a fresh document.
+
+    Snapshots can be cached too, by passing ``snapshot_max_age``. A
+    snapshot is then served from memory while it is at most that many
+    seconds old, and threads asking for the same camera at once share a
+    single fetch; see :class:`~uvcclient.cache.SnapshotCache`. At most
+    ``snapshot_cache_bytes`` of images are kept.
+
+    Name lookups are answered from an index of the camera list that is
+    built on first use and rebuilt once it is older than ``index_ttl``
+    seconds, or whenever :meth:`refresh_index` is called.
+
+    Nothing is fetched when the client is constructed. The bootstrap
+    document is only requested the first time :attr:`server_version` or
+    :attr:`camera_identifier` is needed, and not at all if the version is
+    passed in as ``server_version`` or found in ``info_store``, where it
+    is kept for ``bootstrap_ttl`` seconds so that short-lived processes
+    talking to the same NVR can skip it.
+
+    Every request is bounded by ``timeouts``, and each call as a whole,
+    retries included, by ``deadline`` seconds if given. GET requests that
+    fail with a connection error or timeout are retried according to
+    ``retry``. If ``breakers`` is given, requests fail fast with
+    :class:`NvrError` while the NVR's circuit breaker is open.
+
+    Settings are changed by :meth:`patch_camera`, which only sends the
+    sections of a camera's document that actually changed if
+    ``partial_updates`` is set. Only enable that for NVRs known to
+    accept partial documents; otherwise the whole document is sent.
+    """
 
     CHANNEL_NAMES = ["high", "medium", "low"]
 
     def __init__(
-        self, host: str, port: int, apikey: str, path: str = "/", ssl: bool = False
+        self,
+        host: str,
+        port: int,
+        apikey: str,
+        path: str = "/",
+        ssl: bool = False,
+        pool_size: int = 4,
+        pool_idle_timeout: float = 30.0,
+        camera_cache_ttl: float | None = None,
+        camera_cache_size: int = 256,
+        snapshot_max_age: float | None = None,
+        snapshot_cache_bytes: int = 32 * 1024 * 1024,
+        index_ttl: float = 300.0,
+        server_version: str | tuple[int, int, int] | None = None,
+        info_store: InfoStore | None = None,
+        bootstrap_ttl: float = 86400.0,
+        instrumentation: "Instrumentation | None" = None,
+        timeouts: Timeouts | None = DEFAULT_TIMEOUTS,
+        retry: RetryPolicy = RetryPolicy(),
+        deadline: float | None = None,
+        breakers: BreakerRegistry | None = None,
+        partial_updates: bool = False,
     ) -> None:
         self._host = host
         self._port = port
@@ -58,20 +273,38 @@ class UVCRemote:
         if path != "/":
             raise Invalid("Path not supported yet")
         self._apikey = apikey
-        self._bootstrap = self._get_bootstrap()
-        version = ".".join(str(x) for x in self.server_version)
-        LOGGER.debug(f"Server version is {version}")
+        self._pool = ConnectionPool(
+            self._get_http_connection,
+            size=pool_size,
+            idle_timeout=pool_idle_timeout,
+            timeouts=timeouts,
+        )
+        self._camera_cache: TTLCache[str, Camera] | None = None
+        if camera_cache_ttl is not None:
+            self._camera_cache = TTLCache(camera_cache_ttl, camera_cache_size)
+        self._snapshot_cache: SnapshotCache[str] | None = None
+        if snapshot_max_age is not None:
+            self._snapshot_cache = SnapshotCache(snapshot_max_age, snapshot_cache_bytes)
+        self._index_ttl = index_ttl
+        self._index_expires = 0.0
+        self._cameras_by_name: dict[str, list[dict[str, Any]]] = {}
+        self._cameras_by_ident: dict[str, dict[str, Any]] = {}
+        if isinstance(server_version, str):
+            server_version = _parse_version(server_version)
+        self._server_version = server_version
+        self._info_store = info_store
+        self._bootstrap_ttl = bootstrap_ttl
+        self._instrumentation = instrumentation
+        self._retry = retry
+        self._deadline = deadline
+        self._breaker = breakers.get(f"{host}:{port}") if breakers else None
+        self._partial_updates = partial_updates
 
     @property
     def server_version(self) -> tuple[int, int, int]:
-        version = self._bootstrap["systemInfo"]["version"].split(".")
-        major = int(version[0])
-        minor = int(version[1])
-        try:
-            rev = int(version[2])
-        except ValueError:
-            rev = 0
-        return (major, minor, rev)
+        if self._server_version is None:
+            self._server_version = self._load_server_version()
+        return self._server_version
 
     @property
     def camera_identifier(self) -> str:
@@ -86,16 +319,172 @@ class UVCRemote:
         else:
             return httplib.HTTPConnection(self._host, self._port)
 
-    def _safe_request(self, *args: Any, **kwargs: Any) -> httplib.HTTPResponse:
+    @property
+    def pool_stats(self) -> dict[str, int]:
+        """Return connection reuse counters for the NVR connection pool."""
+        return self._pool.stats
+
+    def close(self) -> None:
+        """Close any idle connections to the NVR."""
+        self._pool.close()
+
+    @property
+    def camera_cache_stats(self) -> dict[str, int] | None:
+        """Return hit/miss counters for the camera cache, if enabled."""
+        if self._camera_cache is None:
+            return None
+        return self._camera_cache.stats
+
+    @property
+    def snapshot_cache_stats(self) -> dict[str, int] | None:
+        """Return hit/miss counters for the snapshot cache, if enabled."""
+        if self._snapshot_cache is None:
+            return None
+        return self._snapshot_cache.stats
+
+    def invalidate_camera(self, uuid: str | None = None) -> None:
+        """Drop a camera, or all cameras, from the camera cache."""
+        if self._camera_cache is not None:
+            self._camera_cache.invalidate(uuid)
+
+    def _get_camera_doc(self, uuid: str, fresh: bool = False) -> dict[str, Any]:
+        if self._camera_cache is not None and not fresh:
+            return self._get_camera(uuid).to_doc()
+        return self._uvc_request(f"/api/2.0/camera/{uuid}")["data"][0]
+
+    def _get_camera_section(self, uuid: str, key: str) -> Any:
+        # A cached camera keeps the sections it has decoded as models
+        if self._camera_cache is None:
+            return self._get_camera_doc(uuid)[key]
+        section = self._get_camera(uuid).section(key)
+        if section is None:
+            raise KeyError(key)
+        return section
+
+    def _get_camera(self, uuid: str) -> "Camera":
+        if self._camera_cache is not None:
+            camera = self._camera_cache.get(uuid)
+            if camera is not None:
+                return camera
+        from uvcclient.models import Camera
+
+        doc = self._uvc_request(f"/api/2.0/camera/{uuid}")["data"][0]
+        camera = Camera.from_doc(doc)
+        if self._camera_cache is not None:
+            self._camera_cache.set(uuid, camera)
+        return camera
+
+    def _put_camera_doc(self, uuid: str, doc: dict[str, Any]) -> dict[str, Any]:
         try:
-            conn = self._get_http_connection()
-            conn.request(*args, **kwargs)
-            return conn.getresponse()
+            data = self._uvc_request(f"/api/2.0/camera/{uuid}", "PUT", doc)
+        except Exception:
+            self.invalidate_camera(uuid)
+            raise
+        updated = data["data"][0]
+        if self._camera_cache is not None:
+            from uvcclient.models import Camera
+
+            self._camera_cache.set(uuid, Camera.from_doc(updated))
+        return updated
+
+    def _update_body(
+        self, current: dict[str, Any], changes: dict[str, Any]
+    ) -> dict[str, Any]:
+        if self._partial_updates:
+            return changes
+        return {**current, **changes}
+
+    def patch_camera(
+        self, uuid: str, update: Callable[[dict[str, Any]], None]
+    ) -> dict[str, Any]:
+        """
+        Change a camera's settings, sending only what changed.
+
+        ``update`` is called with a copy of the camera's document and
+        changes it in place. The top-level sections that differ afterwards
+        are then PUT to the NVR; if none do, nothing is sent.
+
+        The document is taken from the camera cache if it is there. In
+        that case the camera is read again before the PUT, so that
+        sections changed on the NVR in the meantime are not overwritten.
+
+        :param uuid: Camera UUID (or id on v3.2.0 and later)
+        :param update: Callable that modifies the document it is given
+        :returns: The camera's document after the update
+        :raises UpdateConflict: If a section being changed was also
+                                changed on the NVR since it was cached
+        """
+        base = None
+        if self._camera_cache is not None:
+            cached = self._camera_cache.get(uuid)
+            if cached is not None:
+                base = cached.to_doc()
+        from_cache = base is not None
+        if base is None:
+            base = self._get_camera_doc(uuid, fresh=True)
+
+        doc = jsonutil.loads(jsonutil.dumps(base))
+        update(doc)
+        changes = {k: v for k, v in doc.items() if base.get(k) != v}
+        if not changes:
+            return base
+
+        if from_cache:
+            current = self._get_camera_doc(uuid, fresh=True)
+            conflicts = sorted(k for k in changes if current.get(k) != base.get(k))
+            if conflicts:
+                self.invalidate_camera(uuid)
+                raise UpdateConflict(
+                    f"Camera {uuid} was changed on the NVR: {', '.join(conflicts)}"
+                )
+            base = current
+        return self._put_camera_doc(uuid, self._update_body(base, changes))
+
+    def _safe_request(
+        self,
+        method: str,
+        url: str,
+        body: Any = None,
+        headers: dict[str, str] | None = None,
+        info: "RequestInfo | None" = None,
+        deadline: Deadline | None = None,
+    ) -> httplib.HTTPResponse:
+        on_retry = info.retried if info is not None else None
+        try:
+            resp, reused = self._call(
+                method,
+                lambda deadline: self._pool.request(
+                    method, url, body, headers, on_retry, deadline
+                ),
+                on_retry,
+                deadline,
+            )
+            if info is not None:
+                info.status = resp.status
+                info.reused = reused
+            return resp
         except OSError as ex:
             raise CameraConnectionError("Unable to contact camera") from ex
         except httplib.HTTPException as ex:
             raise CameraConnectionError(f"Error connecting to camera: {ex!s}") from ex
 
+    def _call(
+        self,
+        method: str,
+        func: Callable[[Deadline], T],
+        on_retry: Callable[[], None] | None = None,
+        deadline: Deadline | None = None,
+    ) -> T:
+        # Run one request under this client's deadline, or the caller's,
+        # retry policy and circuit breaker
+        return call(
+            func,
+            self._retry if method in RETRYABLE_METHODS else NO_RETRY,
+            deadline or Deadline(self._deadline),
+            self._breaker,
+            on_retry,
+        )
+
     def _uvc_request(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
         try:
             return self._uvc_request_safe(*args, **kwargs)
@@ -108,10 +497,55 @@ class UVCRemote:
         self,
         path: str,
         method: str = "GET",
-        data: dict[str, Any] | None = None,
+        data: dict[str, Any] | bytes | None = None,
         mimetype: str = "application/json",
     ) -> dict[str, Any]:
-        conn = self._get_http_connection()
+        """
+        Make a request to the NVR API and return the decoded response.
+
+        :param data: Request body, either a document to be serialized
+                     or bytes that are already serialized and sent as-is
+        """
+        with self._track(method, path) as info:
+
+            def attempt(deadline: Deadline) -> bytes:
+                resp, encoding = self._uvc_response(
+                    path, method, data, mimetype, info, deadline
+                )
+                try:
+                    return b"".join(_body_chunks(resp, encoding, info))
+                finally:
+                    self._pool.release(resp)
+
+            res = self._call(method, attempt, info.retried if info else None)
+        return jsonutil.loads(res)
+
+    def _track(
+        self, method: str, path: str
+    ) -> AbstractContextManager["RequestInfo | None"]:
+        if self._instrumentation is None:
+            return nullcontext()
+        return self._instrumentation.track("nvr", method, path)
+
+    def _uvc_response(
+        self,
+        path: str,
+        method: str = "GET",
+        data: dict[str, Any] | bytes | None = None,
+        mimetype: str = "application/json",
+        info: "RequestInfo | None" = None,
+        deadline: Deadline | None = None,
+    ) -> tuple[httplib.HTTPResponse, str | None]:
+        """
+        Send a request to the NVR API and check the response status.
+
+        The caller must read the returned response and hand it back to
+        the pool with ``self._pool.release()``.
+
+        :param info: Filled in with the request's details, if given
+        :param deadline: Bounds the socket timeouts of the request
+        :returns: The response and its Content-Encoding, if any
+        """
         if "?" in path:
             url = f"{path}&apiKey={self._apikey}"
         else:
@@ -120,37 +554,80 @@ class UVCRemote:
         headers = {
             "Content-Type": mimetype,
             "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Accept-Encoding": "gzip, deflate, sdch",
+            "Accept-Encoding": ACCEPT_ENCODING,
         }
-        LOGGER.debug(f"{method} {url} headers={headers} data={data!r}")
         body = None
-        if data:
-            body = json.dumps(data)
-        conn.request(method, url, body, headers)
-        resp = conn.getresponse()
-        headers = dict(resp.getheaders())
-        LOGGER.debug(f"{method} {url} Result: {resp.status} {resp.reason}")
-        if resp.status in (401, 403):
-            raise NotAuthorized("NVR reported authorization failure")
+        if isinstance(data, bytes):
+            body = data
+        elif data is not None:
+            body = jsonutil.dumps(data)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            # path rather than url, which has the API key in it
+            LOGGER.debug("%s %s headers=%s data=%r", method, path, headers, data)
+        resp, reused = self._pool.request(
+            method,
+            url,
+            body,
+            headers,
+            info.retried if info is not None else None,
+            deadline,
+        )
+        if info is not None:
+            info.bytes_out = len(body) if body else 0
+            info.status = resp.status
+            info.reused = reused
+        LOGGER.debug("%s %s Result: %s %s", method, path, resp.status, resp.reason)
         if resp.status / 100 != 2:
+            try:
+                # Drain the body so the connection can be reused
+                resp.read()
+            finally:
+                self._pool.release(resp)
+            if resp.status in (401, 403):
+                raise NotAuthorized("NVR reported authorization failure")
             raise NvrError(f"Request failed: {resp.status}")
-
-        res = resp.read()
-        if (
-            headers.get("content-encoding") == "gzip"
-            or headers.get("Content-Encoding") == "gzip"
-        ):
-            res = zlib.decompress(res, 32 + zlib.MAX_WBITS)
-        return json.loads(res.decode())
+        return resp, content_encoding(resp.getheaders())
 
     def _get_bootstrap(self) -> dict[str, Any]:
         return self._uvc_request("/api/2.0/bootstrap")["data"][0]
 
+    def _load_server_version(self) -> tuple[int, int, int]:
+        key = f"{self._host}:{self._port}"
+        if self._info_store is not None:
+            stored = self._info_store.get_server_version(key)
+            if stored is not None and stored[1] > time.time():
+                LOGGER.debug("Server version is %s (stored)", stored[0])
+                return _parse_version(stored[0])
+
+        version = self._get_bootstrap()["systemInfo"]["version"]
+        LOGGER.debug("Server version is %s", version)
+        parsed = _parse_version(version)
+        if self._info_store is not None:
+            try:
+                self._info_store.set_server_version(
+                    key, version, time.time() + self._bootstrap_ttl
+                )
+            except UnableToManageStore:
+                pass
+        return parsed
+
     def dump(self, uuid: str) -> None:
         """Dump information for a camera by UUID."""
-        data = self._uvc_request(f"/api/2.0/camera/{uuid}")
+        import pprint
+
+        data = {"data": [self._get_camera_doc(uuid)]}
         pprint.pprint(data)
 
+    def update_camera(self, uuid: str) -> CameraUpdate:
+        """
+        Start a set of changes to a camera that are sent together.
+
+        See :class:`CameraUpdate`.
+
+        :param uuid: Camera UUID (or id on v3.2.0 and later)
+        """
+        return CameraUpdate(self, uuid)
+
     def set_recordmode(self, uuid: str, mode: str, chan: str | None = None) -> bool:
         """
         Set the recording mode for a camera by UUID.
@@ -160,119 +637,420 @@ class UVCRemote:
         :param chan: One of the values from CHANNEL_NAMES
         :returns: True if successful, False or None otherwise
         """
-        url = f"/api/2.0/camera/{uuid}"
-        data = self._uvc_request(url)
-        settings = data["data"][0]["recordingSettings"]
-        mode = mode.lower()
-        if mode == "none":
-            settings["fullTimeRecordEnabled"] = False
-            settings["motionRecordEnabled"] = False
-        elif mode == "full":
-            settings["fullTimeRecordEnabled"] = True
-            settings["motionRecordEnabled"] = False
-        elif mode == "motion":
-            settings["fullTimeRecordEnabled"] = False
-            settings["motionRecordEnabled"] = True
+        wanted: dict[str, Any] = {}
+
+        def update(doc: dict[str, Any]) -> None:
+            _set_recordmode(doc["recordingSettings"], mode, chan)
+            wanted.update(doc["recordingSettings"])
+
+        updated = self.patch_camera(uuid, update)["recordingSettings"]
+        return wanted == updated
+
+    def set_recordmode_many(
+        self,
+        cameras: Iterable[str] | Callable[[dict[str, Any]], bool] | None,
+        mode: str,
+        chan: str | None = None,
+        workers: int = 8,
+    ) -> list[RecordModeResult]:
+        """
+        Set the recording mode for many cameras at once.
+
+        The camera list is fetched once, cameras already in the requested
+        mode (and channel) are skipped, and the rest are updated with up
+        to ``workers`` PUTs in flight at a time.
+
+        :param cameras: Camera ids/UUIDs, a predicate taking an entry like
+                        those from :meth:`index`, or None for all cameras
+        :param mode: One of none, full, or motion
+        :param chan: One of the values from CHANNEL_NAMES
+        :param workers: Maximum number of concurrent requests
+        :returns: A result for each selected camera
+        """
+        # Validate up front so a typo fails before anything is changed
+        _set_recordmode({}, mode, chan)
+
+        docs = [
+            x for x in self._uvc_request("/api/2.0/camera")["data"] if not x["deleted"]
+        ]
+        results: list[RecordModeResult] = []
+        if cameras is None:
+            selected = docs
+        elif callable(cameras):
+            selected = [x for x in docs if cameras(_index_entry(x))]
         else:
-            raise Invalid("Unknown mode")
+            by_ident = {}
+            for doc in docs:
+                by_ident[doc["uuid"]] = doc
+                by_ident[doc["_id"]] = doc
+            selected = []
+            for ident in cameras:
+                if ident in by_ident:
+                    selected.append(by_ident[ident])
+                else:
+                    results.append(
+                        RecordModeResult(ident, "", None, "failed", "No such camera")
+                    )
+
+        key = "_id" if self.camera_identifier == "id" else "uuid"
+        pending = []
+        for doc in selected:
+            settings = doc["recordingSettings"]
+            result = RecordModeResult(
+                doc[key], doc["name"], _get_recordmode(settings), "unchanged"
+            )
+            results.append(result)
+            wanted_settings = dict(settings)
+            _set_recordmode(wanted_settings, mode, chan)
+            if wanted_settings != settings:
+                doc["recordingSettings"] = wanted_settings
+                pending.append((result, doc))
 
-        if chan:
-            settings["channel"] = self.CHANNEL_NAMES.index(chan)
+        def update(result: RecordModeResult, doc: dict[str, Any]) -> None:
+            wanted = doc["recordingSettings"]
+            body = self._update_body(doc, {"recordingSettings": wanted})
+            try:
+                updated = self._put_camera_doc(result.id, body)
+            except (NvrError, NotAuthorized) as ex:
+                result.status = "failed"
+                result.error = str(ex)
+                return
+            if updated["recordingSettings"] == wanted:
+                result.status = "changed"
+            else:
+                result.status = "failed"
+                result.error = "NVR did not apply the change"
 
-        data = self._uvc_request(url, "PUT", json.dumps(data["data"][0]))
-        updated = data["data"][0]["recordingSettings"]
-        return settings == updated
+        if pending:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(update, *item) for item in pending]:
+                    future.result()
+        return results
 
     def get_recordmode(self, uuid: str) -> Literal["none", "full", "motion"]:
-        url = f"/api/2.0/camera/{uuid}"
-        data = self._uvc_request(url)
-        recmodes = data["data"][0]["recordingSettings"]
-        if recmodes["fullTimeRecordEnabled"]:
-            return "full"
-        elif recmodes["motionRecordEnabled"]:
-            return "motion"
-        else:
-            return "none"
+        if self._camera_cache is None:
+            return _get_recordmode(self._get_camera_doc(uuid)["recordingSettings"])
+        return self._get_camera(uuid).recordmode
 
     def get_picture_settings(self, uuid: str) -> dict[str, Any]:
-        url = f"/api/2.0/camera/{uuid}"
-        data = self._uvc_request(url)
-        return data["data"][0]["ispSettings"]
+        return self._get_camera_section(uuid, "ispSettings")
 
     def set_picture_settings(
         self, uuid: str, settings: dict[str, Any]
     ) -> dict[str, Any]:
-        url = f"/api/2.0/camera/{uuid}"
-        data = self._uvc_request(url)
-        for key in settings:
-            dtype = type(data["data"][0]["ispSettings"][key])
-            try:
-                data["data"][0]["ispSettings"][key] = dtype(settings[key])
-            except ValueError as ex:
-                raise Invalid(
-                    f"Setting `{key}' requires {dtype.__name__} not {type(settings[key]).__name__}"
-                ) from ex
-        data = self._uvc_request(url, "PUT", json.dumps(data["data"][0]))
-        return data["data"][0]["ispSettings"]
+        return self.patch_camera(
+            uuid, lambda doc: _update_picture_settings(doc["ispSettings"], settings)
+        )["ispSettings"]
 
     def prune_zones(self, uuid: str) -> None:
-        url = f"/api/2.0/camera/{uuid}"
-        data = self._uvc_request(url)
-        data["data"][0]["zones"] = [data["data"][0]["zones"][0]]
-        self._uvc_request(url, "PUT", json.dumps(data["data"][0]))
+        self.patch_camera(uuid, lambda doc: doc.update(zones=doc["zones"][:1]))
 
     def list_zones(self, uuid: str) -> list[dict[str, Any]]:
-        url = f"/api/2.0/camera/{uuid}"
-        data = self._uvc_request(url)
-        return data["data"][0]["zones"]
+        return self._get_camera_section(uuid, "zones")
 
-    def index(self) -> list[dict[str, Any]]:
+    def index(self, stream: bool = False) -> list[dict[str, Any]]:
         """
         Return an index of available cameras.
 
-        :returns: A list of dictionaries with keys of name, uuid
+        Everything here comes from the single camera list request, so
+        callers should not need to fetch each camera separately just to
+        show its recording mode.
+
+        :param stream: Parse the camera list as it downloads instead of
+                       decoding the whole response at once, which keeps
+                       memory use down on large NVRs
+        :returns: A list of dictionaries with keys of name, uuid, id,
+                  state, managed, recordmode, model, host and username
         """
+        if stream:
+            return [_index_entry(x) for x in self.iter_cameras()]
         cams = self._uvc_request("/api/2.0/camera")["data"]
-        return [
-            {
-                "name": x["name"],
-                "uuid": x["uuid"],
-                "state": x["state"],
-                "managed": x["managed"],
-                "id": x["_id"],
-            }
-            for x in cams
-            if not x["deleted"]
-        ]
+        return [_index_entry(x) for x in cams if not x["deleted"]]
+
+    def iter_cameras(self) -> Iterator[dict[str, Any]]:
+        """
+        Yield the full document of each camera as the camera list downloads.
+
+        Only one camera document is decoded at a time, so the whole
+        (potentially multi-megabyte) list is never held in memory.
+        Deleted cameras are skipped.
+
+        :raises NvrError: If the request fails part way through
+        """
+        path = "/api/2.0/camera"
+        try:
+            with self._track("GET", path) as info:
+                resp, encoding = self._call(
+                    "GET",
+                    lambda deadline: self._uvc_response(
+                        path, info=info, deadline=deadline
+                    ),
+                    info.retried if info else None,
+                )
+                try:
+                    chunks = _body_chunks(resp, encoding, info)
+                    for cam in iter_json_array(chunks, "data"):
+                        if not cam["deleted"]:
+                            yield cam
+                finally:
+                    self._pool.release(resp)
+        except OSError as ex:
+            raise NvrError("Failed to contact NVR") from ex
+        except httplib.HTTPException as ex:
+            raise NvrError(f"Error connecting to camera: {ex!s}") from ex
+        except ValueError as ex:
+            raise NvrError(f"Invalid camera list from NVR: {ex!s}") from ex
 
     def name_to_uuid(self, name: str) -> str | None:
         """
         Attempt to convert a camera name to its UUID.
 
         :param name: Camera name
-        :returns: The UUID of the first camera with the same name if found,
+        :returns: The UUID of the camera with that name if found,
                   otherwise None. On v3.2.0 and later, returns id.
+        :raises AmbiguousName: If more than one camera has that name
+        """
+        matches = self._get_camera_index()[0].get(name)
+        if not matches:
+            return None
+        if len(matches) > 1:
+            ids = ", ".join(x[self.camera_identifier] for x in matches)
+            raise AmbiguousName(f"`{name}' matches {len(matches)} cameras: {ids}")
+        return matches[0][self.camera_identifier]
+
+    def find_camera(self, key: str) -> dict[str, Any] | None:
+        """
+        Look up a camera in the index by id, UUID or name.
+
+        :param key: Camera id, UUID or unique name
+        :returns: The index entry for the camera, or None if not found
         """
+        by_name, by_ident = self._get_camera_index()
+        if key in by_ident:
+            return by_ident[key]
+        matches = by_name.get(key)
+        if matches and len(matches) > 1:
+            raise AmbiguousName(f"`{key}' matches {len(matches)} cameras")
+        return matches[0] if matches else None
+
+    def refresh_index(self) -> list[dict[str, Any]]:
+        """Rebuild the camera index used for name lookups and return it."""
         cameras = self.index()
-        if self.server_version >= (3, 2, 0):
-            cams_by_name = {x["name"]: x["id"] for x in cameras}
-        else:
-            cams_by_name = {x["name"]: x["uuid"] for x in cameras}
-        return cams_by_name.get(name)
+        self._set_index(cameras)
+        return cameras
+
+    def iter_index(self) -> Iterator[dict[str, Any]]:
+        """
+        Yield the index entry of each camera as the camera list downloads.
+
+        The entries are those of :meth:`index`. Once the whole list has
+        been read, the camera index used for name lookups is rebuilt from
+        it, as by :meth:`refresh_index`.
+        """
+        cameras = []
+        for camera in self.iter_cameras():
+            entry = _index_entry(camera)
+            cameras.append(entry)
+            yield entry
+        self._set_index(cameras)
+
+    def _set_index(self, cameras: list[dict[str, Any]]) -> None:
+        by_name: dict[str, list[dict[str, Any]]] = {}
+        by_ident: dict[str, dict[str, Any]] = {}
+        for camera in cameras:
+            by_name.setdefault(camera["name"], []).append(camera)
+            by_ident[camera["uuid"]] = camera
+            by_ident[camera["id"]] = camera
+        self._cameras_by_name = by_name
+        self._cameras_by_ident = by_ident
+        self._index_expires = time.monotonic() + self._index_ttl
+
+    def _get_camera_index(
+        self,
+    ) -> tuple[dict[str, list[dict[str, Any]]], dict[str, dict[str, Any]]]:
+        if time.monotonic() >= self._index_expires:
+            self.refresh_index()
+        return self._cameras_by_name, self._cameras_by_ident
 
     def get_camera(self, uuid: str) -> dict[str, Any]:
-        return self._uvc_request(f"/api/2.0/camera/{uuid}")["data"][0]
+        return self._get_camera_doc(uuid)
 
-    def get_snapshot(self, uuid: str) -> bytes:
+    def camera(self, uuid: str) -> "Camera":
+        """
+        Return a camera as a typed model.
+
+        :param uuid: Camera UUID (or id on v3.2.0 and later)
+        """
+        return self._get_camera(uuid)
+
+    def cameras(self) -> "list[Camera]":
+        """
+        Return every camera on the NVR as a typed model.
+
+        Like :meth:`iter_cameras`, deleted cameras are skipped and the
+        camera list is parsed as it downloads.
+        """
+        from uvcclient.models import Camera
+
+        return [Camera.from_doc(doc) for doc in self.iter_cameras()]
+
+    def _get_snapshot_response(
+        self,
+        uuid: str,
+        info: "RequestInfo | None" = None,
+        deadline: Deadline | None = None,
+    ) -> httplib.HTTPResponse:
         url = f"/api/2.0/snapshot/camera/{uuid}?force=true&apiKey={self._apikey}"
-        print(url)
-        resp = self._safe_request("GET", url)
+        if info is None and deadline is None:
+            resp = self._safe_request("GET", url)
+        else:
+            resp = self._safe_request("GET", url, info=info, deadline=deadline)
         if resp.status != 200:
+            resp.read()
+            self._pool.release(resp)
             raise NvrError(f"Snapshot returned {resp.status}")
-        return resp.read()
+        return resp
+
+    def get_snapshot(self, uuid: str) -> bytes:
+        if self._snapshot_cache is not None:
+            return bytes(self._cached_snapshot(uuid))
+        with self._track("GET", f"/api/2.0/snapshot/camera/{uuid}") as info:
+            resp = self._get_snapshot_response(uuid, info)
+            try:
+                data = resp.read()
+            finally:
+                self._pool.release(resp)
+            if info is not None:
+                info.bytes_in = len(data)
+        return data
+
+    def stream_snapshot(
+        self,
+        uuid: str,
+        out: Sink,
+        chunk_size: int = CHUNK_SIZE,
+        deadline: Deadline | None = None,
+    ) -> int:
+        """
+        Write a snapshot from a camera into a file or buffer.
+
+        See :func:`uvcclient.stream.copy_response` for what ``out`` may be.
+
+        :param uuid: Camera UUID (or id on v3.2.0 and later)
+        :param out: A writable binary file, bytearray or memoryview
+        :param deadline: Bounds the request instead of this client's
+                         ``deadline``, such as what is left of a larger
+                         budget
+        :returns: The size of the image in bytes
+        """
+        if self._snapshot_cache is not None:
+            return write_bytes(out, self._cached_snapshot(uuid, deadline))
+        return self._stream_snapshot(uuid, out, chunk_size, deadline)
+
+    def _cached_snapshot(
+        self, uuid: str, deadline: Deadline | None = None
+    ) -> memoryview:
+        assert self._snapshot_cache is not None
+
+        def fetch() -> bytearray:
+            image = bytearray()
+            self._stream_snapshot(uuid, image, CHUNK_SIZE, deadline)
+            return image
+
+        return self._snapshot_cache.get(uuid, fetch)
+
+    def _stream_snapshot(
+        self, uuid: str, out: Sink, chunk_size: int, deadline: Deadline | None
+    ) -> int:
+        with self._track("GET", f"/api/2.0/snapshot/camera/{uuid}") as info:
+            resp = self._get_snapshot_response(uuid, info, deadline)
+            try:
+                size = copy_response(resp, out, chunk_size)
+            finally:
+                self._pool.release(resp)
+            if info is not None:
+                info.bytes_in = size
+        return size
+
+
+def _parse_version(version_string: str) -> tuple[int, int, int]:
+    version = version_string.split(".")
+    major = int(version[0])
+    minor = int(version[1])
+    try:
+        rev = int(version[2])
+    except ValueError:
+        rev = 0
+    return (major, minor, rev)
+
+
+def _body_chunks(
+    resp: httplib.HTTPResponse, encoding: str | None, info: "RequestInfo | None"
+) -> Iterator[bytes]:
+    if info is None:
+        return iter_body(resp, encoding)
+    return iter_decoded(
+        info.count_in(iter(lambda: resp.read(CHUNK_SIZE), b"")), encoding
+    )
+
+
+def _index_entry(camera: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "name": camera["name"],
+        "uuid": camera["uuid"],
+        "state": camera["state"],
+        "managed": camera["managed"],
+        "id": camera["_id"],
+        "recordmode": _get_recordmode(camera["recordingSettings"]),
+        "model": camera.get("model"),
+        "host": camera.get("host"),
+        "username": camera.get("username"),
+    }
+
+
+def _set_recordmode(settings: dict[str, Any], mode: str, chan: str | None) -> None:
+    mode = mode.lower()
+    if mode == "none":
+        settings["fullTimeRecordEnabled"] = False
+        settings["motionRecordEnabled"] = False
+    elif mode == "full":
+        settings["fullTimeRecordEnabled"] = True
+        settings["motionRecordEnabled"] = False
+    elif mode == "motion":
+        settings["fullTimeRecordEnabled"] = False
+        settings["motionRecordEnabled"] = True
+    else:
+        raise Invalid("Unknown mode")
+
+    if chan:
+        settings["channel"] = UVCRemote.CHANNEL_NAMES.index(chan)
+
+
+def _update_picture_settings(current: dict[str, Any], settings: dict[str, Any]) -> None:
+    for key in settings:
+        dtype = type(current[key])
+        try:
+            current[key] = dtype(settings[key])
+        except ValueError as ex:
+            raise Invalid(
+                f"Setting `{key}' requires {dtype.__name__} not {type(settings[key]).__name__}"
+            ) from ex
+
+
+def _get_recordmode(settings: dict[str, Any]) -> Literal["none", "full", "motion"]:
+    if settings["fullTimeRecordEnabled"]:
+        return "full"
+    elif settings["motionRecordEnabled"]:
+        return "motion"
+    else:
+        return "none"
 
 
-def get_auth_from_env() -> tuple[str | None, int, str | None, str]:
+def get_auth_from_env(
+    env: Mapping[str, str] | None = None,
+) -> tuple[str | None, int, str | None, str]:
     """
     Attempt to get UVC NVR connection information from the environment.
 
@@ -286,9 +1064,11 @@ def get_auth_from_env() -> tuple[str | None, int, str | None, str]:
         UVC_PORT=7080
         UVC_APIKEY=XXXXXXXXXX
 
+    :param env: Variables to use instead of the process environment
     :returns: A tuple like (host, port, apikey, path)
     """
-    combined = os.getenv("UVC")
+    getenv = os.getenv if env is None else env.get
+    combined = getenv("UVC")
     if combined:
         # http://192.168.1.1:7080/apikey
         result = urlparse.urlparse(combined)
@@ -302,8 +1082,8 @@ def get_auth_from_env() -> tuple[str | None, int, str | None, str]:
         path = result.path
         return host, port, apikey, path
     else:
-        env_host = os.getenv("UVC_HOST")
-        env_port = int(os.getenv("UVC_PORT", 7080))
-        env_apikey = os.getenv("UVC_APIKEY")
+        env_host = getenv("UVC_HOST")
+        env_port = int(getenv("UVC_PORT") or 7080)
+        env_apikey = getenv("UVC_APIKEY")
         env_path = "/"
         return env_host, env_port, env_apikey, env_path
@@ -0,0 +1,129 @@
+"""
+Machine-readable output for the command line.
+
+Rows are written out one at a time as they are produced, and flushed as
+they go, so a long listing starts appearing straight away and never has
+to be held in memory. The formats are:
+
+``json``
+    A JSON array of objects, or a single object for :func:`write_record`
+``ndjson``
+    One JSON object per line
+``csv``
+    A header line, then one line per row; nested values are written as
+    JSON and None as an empty field
+
+If producing the rows fails part way, the output stops where it is: a
+JSON array is left unterminated, so that a reader sees it is cut short
+rather than taking it for the complete list.
+"""
+
+import csv
+from collections.abc import Iterable, Sequence
+from types import TracebackType
+from typing import IO, Any
+
+from uvcclient import jsonutil
+
+FORMATS = ("json", "ndjson", "csv")
+
+
+def _dumps(value: Any) -> str:
+    return jsonutil.dumps(value).decode()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, dict | list):
+        return _dumps(value)
+    return value
+
+
+class RowWriter:
+    """
+    Write rows to a text stream in one of :data:`FORMATS`.
+
+    :param out: Where to write, such as ``sys.stdout``
+    :param fmt: The format to write
+    :param fields: The CSV columns, by default the keys of the first row;
+                   other formats write every key of every row
+    :raises ValueError: If the format is not known
+    """
+
+    def __init__(
+        self, out: IO[str], fmt: str, fields: Sequence[str] | None = None
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format {fmt!r}")
+        self._out = out
+        self._format = fmt
+        self._fields = fields
+        self._csv: Any = None
+        self.rows = 0
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._out.flush()
+
+    def _start_csv(self, fields: Sequence[str]) -> None:
+        self._csv = csv.DictWriter(
+            self._out, fields, extrasaction="ignore", lineterminator="\n"
+        )
+        self._csv.writeheader()
+
+    def write(self, row: dict[str, Any]) -> None:
+        if self._format == "ndjson":
+            self._out.write(_dumps(row) + "\n")
+        elif self._format == "json":
+            self._out.write(("[\n" if not self.rows else ",\n") + _dumps(row))
+        else:
+            if self._csv is None:
+                self._start_csv(self._fields or list(row))
+            self._csv.writerow({k: _csv_value(v) for k, v in row.items()})
+        self.rows += 1
+        self._out.flush()
+
+    def close(self) -> None:
+        """Finish the output; a JSON array is closed here."""
+        if self._format == "json":
+            self._out.write("\n]\n" if self.rows else "[]\n")
+        elif self._format == "csv" and self._csv is None and self._fields:
+            self._start_csv(self._fields)
+        self._out.flush()
+
+
+def write_rows(
+    out: IO[str],
+    fmt: str,
+    rows: Iterable[dict[str, Any]],
+    fields: Sequence[str] | None = None,
+) -> int:
+    """
+    Write rows as they are produced by ``rows``.
+
+    :returns: The number of rows written
+    """
+    with RowWriter(out, fmt, fields) as writer:
+        for row in rows:
+            writer.write(row)
+    return writer.rows
+
+
+def write_record(out: IO[str], fmt: str, record: dict[str, Any]) -> None:
+    """Write a single record, as an object rather than an array in JSON."""
+    if fmt == "json":
+        out.write(_dumps(record) + "\n")
+        out.flush()
+    else:
+        write_rows(out, fmt, [record])
@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import threading
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from uvcclient.const import LOGGER
+from uvcclient.nvr import NotAuthorized, NvrError, UVCRemote
+
+#: Event kinds for a change of camera state, by the state changed to
+STATE_EVENTS = {
+    "DISCONNECTED": "offline",
+    "CONNECTED": "online",
+    "FIRMWARE_OUTDATED": "firmware_outdated",
+}
+
+
+@dataclass
+class CameraEvent:
+    """A change to one camera between two polls of the camera list."""
+
+    #: One of "added", "removed", "offline", "online", "firmware_outdated",
+    #: "state_changed", "recordmode_changed" or "managed_changed"
+    kind: str
+    id: str
+    name: str
+    previous: Any = None
+    current: Any = None
+
+
+def diff_cameras(
+    previous: Mapping[str, dict[str, Any]], current: Mapping[str, dict[str, Any]]
+) -> list[CameraEvent]:
+    """
+    Compare two camera indexes keyed by id and describe what changed.
+
+    :param previous: Index entries, as from :meth:`UVCRemote.index`, by id
+    :param current: The same, from a later poll
+    """
+    events = []
+    for ident, cam in current.items():
+        old = previous.get(ident)
+        if old is None:
+            events.append(CameraEvent("added", ident, cam["name"], None, cam["state"]))
+            continue
+        if cam["state"] != old["state"]:
+            kind = STATE_EVENTS.get(cam["state"], "state_changed")
+            events.append(
+                CameraEvent(kind, ident, cam["name"], old["state"], cam["state"])
+            )
+        if cam["recordmode"] != old["recordmode"]:
+            events.append(
+                CameraEvent(
+                    "recordmode_changed",
+                    ident,
+                    cam["name"],
+                    old["recordmode"],
+                    cam["recordmode"],
+                )
+            )
+        if cam["managed"] != old["managed"]:
+            events.append(
+                CameraEvent(
+                    "managed_changed",
+                    ident,
+                    cam["name"],
+                    old["managed"],
+                    cam["managed"],
+                )
+            )
+    for ident, old in previous.items():
+        if ident not in current:
+            events.append(CameraEvent("removed", ident, old["name"], old["state"]))
+    return events
+
+
+class CameraPoller:
+    """
+    Watch an NVR's camera list and report what changes.
+
+    The camera list is fetched every ``interval`` seconds and compared
+    with the previous one. While nothing changes the interval grows by
+    ``backoff`` each poll, up to ``max_interval``, and it drops back to
+    ``interval`` as soon as something does. Failed polls also back off.
+
+    Events are delivered either to ``callback`` by :meth:`run` or by
+    iterating over the poller with ``async for``. The first poll only
+    records the initial state, so it produces no events.
+
+    :param client: The NVR to watch
+    :param interval: Seconds between polls while cameras are changing
+    :param max_interval: Longest time between polls
+    :param backoff: Factor by which the interval grows when idle
+    :param callback: Called with each event by :meth:`run`
+    """
+
+    def __init__(
+        self,
+        client: UVCRemote,
+        interval: float = 10.0,
+        max_interval: float = 60.0,
+        backoff: float = 2.0,
+        callback: Callable[[CameraEvent], None] | None = None,
+    ) -> None:
+        self._client = client
+        self._min_interval = interval
+        self._max_interval = max(interval, max_interval)
+        self._backoff = backoff
+        self._callback = callback
+        self._cameras: dict[str, dict[str, Any]] | None = None
+        self._stop = threading.Event()
+        # Wakes an async iteration waiting for the next poll
+        self._wake: tuple[asyncio.AbstractEventLoop, asyncio.Event] | None = None
+        self.interval = interval
+
+    @property
+    def cameras(self) -> dict[str, dict[str, Any]]:
+        """The camera index from the last successful poll, by id."""
+        return dict(self._cameras or {})
+
+    def poll(self) -> list[CameraEvent]:
+        """
+        Fetch the camera list once and return the changes since last time.
+
+        Updates :attr:`interval` for the next poll.
+
+        :raises NvrError: If the camera list could not be fetched
+        """
+        try:
+            # refresh_index() also keeps the client's name lookups current
+            cameras = {cam["id"]: cam for cam in self._client.refresh_index()}
+        except (NvrError, NotAuthorized):
+            self._slow_down()
+            raise
+        events = [] if self._cameras is None else diff_cameras(self._cameras, cameras)
+        self._cameras = cameras
+        if events:
+            self.interval = self._min_interval
+        else:
+            self._slow_down()
+        return events
+
+    def _slow_down(self) -> None:
+        self.interval = min(self.interval * self._backoff, self._max_interval)
+
+    def _poll_quietly(self) -> Iterable[CameraEvent]:
+        try:
+            return self.poll()
+        except (NvrError, NotAuthorized) as ex:
+            LOGGER.warning(
+                "Polling cameras failed (%s), retrying in %.0fs", ex, self.interval
+            )
+            return []
+
+    def run(self) -> None:
+        """Poll and pass events to the callback until :meth:`stop` is called."""
+        if self._callback is None:
+            raise ValueError("run() needs a callback")
+        self._stop.clear()
+        while not self._stop.is_set():
+            for event in self._poll_quietly():
+                self._callback(event)
+            self._stop.wait(self.interval)
+
+    def stop(self) -> None:
+        """
+        Make :meth:`run` or an ``async for`` over the poller finish.
+
+        Either one returns straight away if it is waiting for the next
+        poll. This may be called from any thread.
+        """
+        self._stop.set()
+        wake = self._wake
+        if wake is not None:
+            loop, event = wake
+            with contextlib.suppress(RuntimeError):  # The loop has closed
+                loop.call_soon_threadsafe(event.set)
+
+    async def __aiter__(self) -> AsyncIterator[CameraEvent]:
+        self._stop.clear()
+        wake = asyncio.Event()
+        self._wake = (asyncio.get_running_loop(), wake)
+        try:
+            while not self._stop.is_set():
+                # The client is synchronous, so keep it off the event loop
+                for event in await asyncio.to_thread(self._poll_quietly):
+                    yield event
+                if self._stop.is_set():
+                    break
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(wake.wait(), self.interval)
+        finally:
+            self._wake = None
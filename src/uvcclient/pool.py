@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from http import client as httplib
+from typing import Any
+
+from uvcclient.const import LOGGER
+from uvcclient.retry import Deadline, Timeouts, set_timeout
+
+# Errors that mean a kept-alive socket was most likely closed by the server
+# while idle. They do not prove the request never reached the server: it
+# may have been processed before the connection dropped. Only idempotent
+# requests are therefore sent again on a fresh connection.
+STALE_ERRORS = (
+    httplib.RemoteDisconnected,
+    httplib.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+#: Methods resent when a reused connection turns out to be stale. These
+#: are the idempotent methods (RFC 9110, section 9.2.2): a stale socket
+#: means the request most likely never reached the server.
+RESENDABLE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Upper bound on responses handed out but not yet released.  Callers that
+# never finish reading a response simply lose the chance to reuse its
+# connection once this many newer requests have been made.
+MAX_LENT = 64
+
+
+class ConnectionPool:
+    """
+    A pool of reusable keep-alive connections to a single host.
+
+    Connections are handed out by :meth:`request` along with the response.
+    A connection goes back to the pool once its response has been fully
+    read and the server did not ask to close it, either explicitly through
+    :meth:`release` or lazily the next time a connection is needed.
+
+    :param factory: Callable returning a new, unconnected HTTP connection
+    :param size: Maximum number of idle connections kept around; zero
+                 disables reuse entirely
+    :param idle_timeout: Seconds an idle connection may sit in the pool
+                         before it is considered stale and closed
+    :param timeouts: Connect and read timeouts applied to every request;
+                     None leaves the connections' own timeout alone
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], httplib.HTTPConnection],
+        size: int = 4,
+        idle_timeout: float = 30.0,
+        timeouts: Timeouts | None = None,
+    ) -> None:
+        self._factory = factory
+        self._timeouts = timeouts
+        self._size = size
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle: deque[tuple[httplib.HTTPConnection, float]] = deque()
+        self._lent: dict[int, tuple[httplib.HTTPConnection, Any]] = {}
+        self._counters = {
+            "created": 0,
+            "reused": 0,
+            "reconnected": 0,
+            "expired": 0,
+            "discarded": 0,
+        }
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Return connection counters for this pool."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._lent)
+        return stats
+
+    def _reclaim(self) -> None:
+        # Must be called with the lock held
+        for key, (conn, resp) in list(self._lent.items()):
+            if resp.isclosed():
+                del self._lent[key]
+                self._checkin(conn, resp)
+
+    def _checkin(self, conn: httplib.HTTPConnection, resp: Any) -> None:
+        # Must be called with the lock held
+        if resp.will_close or len(self._idle) >= self._size:
+            self._counters["discarded"] += 1
+            conn.close()
+        else:
+            self._idle.append((conn, time.monotonic()))
+
+    def _acquire(self) -> tuple[httplib.HTTPConnection, bool]:
+        with self._lock:
+            self._reclaim()
+            now = time.monotonic()
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if now - last_used > self._idle_timeout:
+                    self._counters["expired"] += 1
+                    conn.close()
+                    continue
+                self._counters["reused"] += 1
+                return conn, True
+            self._counters["created"] += 1
+        return self._factory(), False
+
+    def _send(
+        self,
+        conn: httplib.HTTPConnection,
+        method: str,
+        url: str,
+        body: Any,
+        headers: dict[str, str] | None,
+        deadline: Deadline | None,
+    ) -> httplib.HTTPResponse:
+        timeouts = self._timeouts
+        if timeouts is None and deadline is not None:
+            timeouts = Timeouts(None, None)
+        if timeouts is not None:
+            connect = timeouts.connect
+            set_timeout(conn, deadline.cap(connect) if deadline else connect)
+        conn.request(method, url, body, headers or {})
+        if timeouts is not None:
+            read = timeouts.read
+            set_timeout(conn, deadline.cap(read) if deadline else read)
+        return conn.getresponse()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Any = None,
+        headers: dict[str, str] | None = None,
+        on_retry: Callable[[], None] | None = None,
+        deadline: Deadline | None = None,
+    ) -> tuple[httplib.HTTPResponse, bool]:
+        """
+        Send a request on a pooled connection.
+
+        If a reused connection turns out to have been closed by the server,
+        an idempotent request is transparently sent again on a fresh
+        connection; any other request raises the error.
+
+        :param on_retry: Called when the request has to be sent again
+        :param deadline: Socket timeouts are cut short to end by this
+        :returns: A tuple of (response, reused)
+        """
+        conn, reused = self._acquire()
+        try:
+            resp = self._send(conn, method, url, body, headers, deadline)
+        except STALE_ERRORS:
+            conn.close()
+            if not reused or method not in RESENDABLE_METHODS:
+                raise
+            LOGGER.debug("Pooled connection was stale, reconnecting")
+            if on_retry is not None:
+                on_retry()
+            with self._lock:
+                self._counters["reconnected"] += 1
+                self._counters["created"] += 1
+            conn, reused = self._factory(), False
+            try:
+                resp = self._send(conn, method, url, body, headers, deadline)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            while len(self._lent) >= MAX_LENT:
+                evicted, _ = self._lent.pop(next(iter(self._lent)))
+                self._counters["discarded"] += 1
+                evicted.close()
+            self._lent[id(resp)] = (conn, resp)
+        return resp, reused
+
+    def release(self, resp: httplib.HTTPResponse) -> None:
+        """
+        Return the connection behind a response to the pool.
+
+        The response should have been read to completion; otherwise the
+        connection cannot be reused and is closed.
+        """
+        with self._lock:
+            entry = self._lent.pop(id(resp), None)
+            if entry is None:
+                return
+            conn, resp = entry
+            if resp.isclosed():
+                self._checkin(conn, resp)
+                return
+            self._counters["discarded"] += 1
+        conn.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._lent.clear()
+        for conn, _ in idle:
+            conn.close()
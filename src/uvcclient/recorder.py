@@ -0,0 +1,332 @@
+"""
+Record snapshots from a camera into a fixed-size ring buffer file.
+
+A :class:`Recorder` logs in to a camera once and captures a snapshot at
+a target rate, for as long as it runs. Frames are appended to a
+:class:`RingWriter`: a memory-mapped file of fixed size laid out as
+
+* a header holding the geometry of the file, the sequence number of the
+  next frame and how far the writer has got,
+* an index of ``slots`` entries, each the sequence number, position,
+  length and capture time of one frame, and
+* a data area that frames are written into one after the other, starting
+  again from the beginning when the next frame does not fit at the end.
+
+Once the file is full the oldest frames are overwritten. A
+:class:`RingReader`, in this process or another, maps the same file and
+returns recent frames as memoryviews straight into the mapping, without
+copying them or opening the file again. The writer only ever overwrites
+the oldest frames, so a reader can tell with :meth:`RingReader.intact`
+whether a frame it holds has been overwritten since it was returned.
+"""
+
+import mmap
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import TypeVar
+
+from uvcclient.camera import CameraAuthError, CameraConnectError, UVCCameraClient
+from uvcclient.const import LOGGER
+from uvcclient.retry import TRANSIENT_ERRORS
+
+MAGIC = b"UVCRING1"
+
+# Magic, slots, unused, data size, next sequence number, write position
+_HEADER = struct.Struct("<8sIIQQQ")
+_HEADER_SIZE = 64
+# Sequence number, position, capture time, length
+_ENTRY = struct.Struct("<QQdI4x")
+# The offset of the next sequence number and write position in the header
+_PROGRESS = struct.Struct("<QQ")
+_PROGRESS_OFFSET = 24
+
+#: Frames are assumed to be at least this large when sizing the index
+MIN_FRAME_SIZE = 16 * 1024
+
+# A frame that fails with one of these is skipped
+_CAPTURE_ERRORS: tuple[type[BaseException], ...] = (
+    CameraAuthError,
+    CameraConnectError,
+    ValueError,
+    *TRANSIENT_ERRORS,
+)
+
+
+R = TypeVar("R", bound="_Ring")
+
+
+class RingError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class Frame:
+    """
+    One frame in a ring buffer.
+
+    ``data`` points straight into the file's mapping; copy it with
+    ``bytes(frame.data)`` to keep it once the writer may have moved on.
+    """
+
+    seq: int
+    timestamp: float
+    data: memoryview = field(repr=False)
+    #: Where the frame starts, counting every byte ever written
+    position: int = field(default=0, repr=False)
+
+
+class _Ring:
+    def __init__(self, path: str, writable: bool) -> None:
+        self.path = path
+        # The mapping keeps its own handle on the file
+        with open(path, "r+b" if writable else "rb") as f:
+            try:
+                self._mmap = mmap.mmap(
+                    f.fileno(),
+                    0,
+                    access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+                )
+            except ValueError as ex:
+                raise RingError(f"{path} is not a ring buffer") from ex
+        self._view = memoryview(self._mmap)
+        if len(self._view) < _HEADER_SIZE:
+            self.close()
+            raise RingError(f"{path} is not a ring buffer")
+        magic, slots, _, data_size, _, _ = _HEADER.unpack_from(self._view)
+        if magic != MAGIC or len(self._view) != _size(slots, data_size):
+            self.close()
+            raise RingError(f"{path} is not a ring buffer")
+        self.slots: int = slots
+        self.data_size: int = data_size
+        self._data_start = _HEADER_SIZE + slots * _ENTRY.size
+
+    def __enter__(self: R) -> R:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+
+        :raises BufferError: If the data of a returned frame is still
+                             referenced
+        """
+        self._view.release()
+        self._mmap.close()
+
+    def _progress(self) -> tuple[int, int]:
+        return _PROGRESS.unpack_from(self._view, _PROGRESS_OFFSET)
+
+    def __len__(self) -> int:
+        """Return the number of frames that can currently be read."""
+        return len(self.latest(self.slots))
+
+    def intact(self, frame: Frame) -> bool:
+        """Return whether a frame has not been overwritten yet."""
+        _, written = self._progress()
+        return written - frame.position <= self.data_size
+
+    def latest(self, count: int = 1) -> list[Frame]:
+        """
+        Return up to ``count`` of the most recent frames, oldest first.
+
+        The data of each frame is a view of the mapped file; see
+        :meth:`intact` for whether it has since been overwritten.
+        """
+        next_seq, written = self._progress()
+        frames = []
+        for seq in range(next_seq - 1, max(-1, next_seq - 1 - count), -1):
+            entry_seq, position, timestamp, length = _ENTRY.unpack_from(
+                self._view, _HEADER_SIZE + (seq % self.slots) * _ENTRY.size
+            )
+            if entry_seq != seq or written - position > self.data_size:
+                break
+            start = self._data_start + position % self.data_size
+            frames.append(
+                Frame(seq, timestamp, self._view[start : start + length], position)
+            )
+        frames.reverse()
+        return frames
+
+
+def _size(slots: int, data_size: int) -> int:
+    return _HEADER_SIZE + slots * _ENTRY.size + data_size
+
+
+class RingReader(_Ring):
+    """
+    Read frames from a ring buffer file as it is being written.
+
+    :raises RingError: If the file is not a ring buffer
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path, writable=False)
+
+
+class RingWriter(_Ring):
+    """
+    Append frames to a ring buffer file, creating it if needed.
+
+    An existing ring buffer of the same geometry is appended to, keeping
+    its frames. Anything else at ``path`` is only replaced if asked to.
+
+    :param size: Size of the data area in bytes
+    :param slots: Number of frames to index, by default enough for
+                  frames of :data:`MIN_FRAME_SIZE`
+    :param overwrite: Replace a file that is not a ring buffer, or is
+                      one of a different size or slot count
+    :raises RingError: If ``path`` is such a file and ``overwrite`` is
+                       not set
+    """
+
+    def __init__(
+        self, path: str, size: int, slots: int | None = None, overwrite: bool = False
+    ) -> None:
+        if slots is None:
+            slots = max(16, size // MIN_FRAME_SIZE)
+        if size <= 0 or slots <= 0:
+            raise ValueError("Ring buffer size and slots must be positive")
+        try:
+            super().__init__(path, writable=True)
+        except FileNotFoundError:
+            mode = "xb"
+        except RingError:
+            if not overwrite:
+                raise
+            mode = "wb"
+        else:
+            if self.slots == slots and self.data_size == size:
+                return
+            self.close()
+            if not overwrite:
+                raise RingError(
+                    f"{path} is a ring buffer of {self.data_size} bytes and "
+                    f"{self.slots} slots, not {size} bytes and {slots} slots"
+                )
+            mode = "wb"
+        with open(path, mode) as f:
+            f.write(_HEADER.pack(MAGIC, slots, 0, size, 0, 0))
+            f.truncate(_size(slots, size))
+        super().__init__(path, writable=True)
+
+    def append(self, data: bytes | bytearray | memoryview, timestamp: float) -> int:
+        """
+        Add a frame, overwriting the oldest frames to make room.
+
+        :returns: The frame's sequence number
+        :raises ValueError: If the frame is larger than the ring buffer
+        """
+        length = memoryview(data).nbytes
+        if length > self.data_size:
+            raise ValueError(
+                f"{length} byte frame does not fit a {self.data_size} byte ring"
+            )
+        seq, position = self._progress()
+        # Frames are never split, so a reader always gets one view
+        offset = position % self.data_size
+        if offset + length > self.data_size:
+            position += self.data_size - offset
+            offset = 0
+        # Claim the space first, so readers stop handing out the frames
+        # about to be overwritten before they are
+        _PROGRESS.pack_into(self._view, _PROGRESS_OFFSET, seq, position + length)
+        start = self._data_start + offset
+        self._view[start : start + length] = data
+        _ENTRY.pack_into(
+            self._view,
+            _HEADER_SIZE + (seq % self.slots) * _ENTRY.size,
+            seq,
+            position,
+            timestamp,
+            length,
+        )
+        _PROGRESS.pack_into(self._view, _PROGRESS_OFFSET, seq + 1, position + length)
+        return seq
+
+    def flush(self) -> None:
+        self._mmap.flush()
+
+
+class Recorder:
+    """
+    Capture snapshots from one camera at a steady rate into a ring buffer.
+
+    The camera is logged in to once and the session kept for every frame,
+    logging in again only if the camera drops it. If a snapshot takes
+    longer than the interval between frames, the frames that could not
+    be taken are skipped rather than captured late in a burst. A failed
+    snapshot is logged and counted, and recording carries on.
+
+    :param client: The camera to record from
+    :param ring: Where to store the frames
+    :param fps: Frames to capture per second
+    """
+
+    def __init__(
+        self, client: UVCCameraClient, ring: RingWriter, fps: float = 1.0
+    ) -> None:
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self._client = client
+        self._ring = ring
+        self._interval = 1.0 / fps
+        self._stop = threading.Event()
+        self.frames = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def capture(self) -> int | None:
+        """
+        Take one snapshot and append it to the ring buffer.
+
+        :returns: The frame's sequence number, or None if it failed
+        """
+        try:
+            self._client.ensure_login()
+            image = self._client.get_snapshot()
+            seq = self._ring.append(image, time.time())
+        except _CAPTURE_ERRORS as ex:
+            self.errors += 1
+            LOGGER.warning("Failed to record frame: %s", ex)
+            return None
+        self.frames += 1
+        return seq
+
+    def run(self, frames: int | None = None) -> int:
+        """
+        Record until :meth:`stop` is called or enough frames are taken.
+
+        :param frames: Number of frames to capture, or None for no limit
+        :returns: The number of frames recorded
+        """
+        recorded = 0
+        attempts = 0
+        due = time.monotonic()
+        while not self._stop.is_set() and (frames is None or attempts < frames):
+            if self.capture() is not None:
+                recorded += 1
+            attempts += 1
+            due += self._interval
+            now = time.monotonic()
+            if now > due:
+                missed = int((now - due) // self._interval) + 1
+                self.skipped += missed
+                due += missed * self._interval
+            if frames is None or attempts < frames:
+                self._stop.wait(due - now)
+        return recorded
+
+    def stop(self) -> None:
+        """Stop :meth:`run`, from another thread or a signal handler."""
+        self._stop.set()
@@ -0,0 +1,258 @@
+"""
+Timeouts, retries and circuit breakers for NVR and camera requests.
+
+:class:`Timeouts` bounds connecting to a host and waiting on a response
+separately, and a :class:`Deadline` bounds a whole call, retries and
+back-off included. Idempotent requests that fail with a transport error
+are retried according to a :class:`RetryPolicy`, with jittered
+exponential back-off. A :class:`CircuitBreaker` per host, kept in a
+:class:`BreakerRegistry` shared by clients, stops requests to a host
+that keeps failing for a while, so that a dead camera costs nothing
+instead of a timeout per request.
+"""
+
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from http import client as httplib
+from typing import NamedTuple, TypeVar
+
+from uvcclient.const import LOGGER
+
+T = TypeVar("T")
+
+#: Errors worth retrying: the request may not have reached the host, or
+#: the host did not answer in time
+TRANSIENT_ERRORS: tuple[type[BaseException], ...] = (OSError, httplib.HTTPException)
+
+
+class CircuitOpen(ConnectionError):
+    """Raised instead of contacting a host whose circuit breaker is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call runs out of time before it could complete."""
+
+
+class Timeouts(NamedTuple):
+    """
+    Socket timeouts in seconds; None waits forever.
+
+    :param connect: For connecting to the host and sending the request
+    :param read: For each read while waiting on and reading the response
+    """
+
+    connect: float | None = 10.0
+    read: float | None = 30.0
+
+
+DEFAULT_TIMEOUTS = Timeouts()
+
+
+class Deadline:
+    """
+    A point in time by which a call must have finished.
+
+    :param seconds: Time allowed from now, or None for no deadline
+    """
+
+    def __init__(self, seconds: float | None) -> None:
+        self._expires = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> float | None:
+        if self._expires is None:
+            return None
+        return max(0.0, self._expires - time.monotonic())
+
+    def check(self) -> None:
+        if self.remaining() == 0.0:
+            raise DeadlineExceeded("Deadline exceeded")
+
+    def cap(self, timeout: float | None) -> float | None:
+        """Shorten a timeout so that it ends no later than the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        self.check()
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def set_timeout(conn: httplib.HTTPConnection, timeout: float | None) -> None:
+    """Set the timeout of a connection, whether or not it is connected yet."""
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+
+
+class RetryPolicy(NamedTuple):
+    """
+    How often and how quickly to retry a failed idempotent request.
+
+    The delay before retry ``n`` (counting from zero) is drawn uniformly
+    between zero and ``min(max_delay, base_delay * 2 ** n)``, so that
+    many clients retrying at once spread out rather than arrive together.
+
+    :param attempts: Total number of tries, including the first
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+
+    def delays(self) -> Iterator[float]:
+        for n in range(self.attempts - 1):
+            yield random.uniform(0, min(self.max_delay, self.base_delay * 2**n))  # noqa: S311
+
+
+#: A policy that never retries
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+class CircuitBreaker:
+    """
+    Track failures of one host and refuse to contact it while it is down.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    :meth:`before` raises :class:`CircuitOpen` for ``reset_timeout``
+    seconds. After that a single trial request is let through: if it
+    succeeds the breaker closes again, and if it fails it stays open
+    for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self._threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        """Return "closed", "open" or "half-open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or (
+                time.monotonic() - self._opened_at >= self._reset_timeout
+            ):
+                return "half-open"
+            return "open"
+
+    def before(self) -> None:
+        """Raise :class:`CircuitOpen` unless a request may be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if not self._trial and (
+                time.monotonic() - self._opened_at >= self._reset_timeout
+            ):
+                self._trial = True
+                return
+            raise CircuitOpen("Host is failing, not trying again yet")
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """Let another trial through, when one ends without an answer."""
+        with self._lock:
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self._threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class BreakerRegistry:
+    """
+    The circuit breakers of many hosts, created as they are first needed.
+
+    Share one registry between the clients of a fleet so that every
+    client learns when a host is down.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self._threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self._threshold, self._reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
+
+    @property
+    def states(self) -> dict[str, str]:
+        """Return the state of each host's breaker."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.state for host, breaker in breakers.items()}
+
+
+def call(
+    func: Callable[[Deadline], T],
+    policy: RetryPolicy = NO_RETRY,
+    deadline: Deadline | None = None,
+    breaker: CircuitBreaker | None = None,
+    on_retry: Callable[[], None] | None = None,
+) -> T:
+    """
+    Call ``func`` until it succeeds, retrying transient errors.
+
+    ``func`` is passed the deadline so that it can bound its own socket
+    timeouts by it. Only :data:`TRANSIENT_ERRORS` are retried or count
+    against the breaker; anything else, such as an HTTP error status,
+    means the host is up, so counts as a success for the breaker and is
+    raised straight away.
+
+    :param on_retry: Called before each retry
+    :raises CircuitOpen: If the breaker is open
+    :raises DeadlineExceeded: If the deadline passes before a try starts
+    """
+    if deadline is None:
+        deadline = Deadline(None)
+    delays = policy.delays()
+    while True:
+        deadline.check()
+        if breaker is not None:
+            breaker.before()
+        try:
+            result = func(deadline)
+        except (CircuitOpen, DeadlineExceeded):
+            # The host was never asked, so this says nothing about it
+            if breaker is not None:
+                breaker.release()
+            raise
+        except TRANSIENT_ERRORS as ex:
+            if breaker is not None:
+                breaker.failure()
+            delay = next(delays, None)
+            remaining = deadline.remaining()
+            if delay is None or remaining == 0.0:
+                raise
+            if remaining is not None and delay >= remaining:
+                raise
+            LOGGER.debug("Request failed (%s), retrying in %.2fs", ex, delay)
+            if on_retry is not None:
+                on_retry()
+            time.sleep(delay)
+            continue
+        except Exception:
+            if breaker is not None:
+                breaker.success()
+            raise
+        if breaker is not None:
+            breaker.success()
+        return result
@@ -1,7 +1,10 @@
 import base64
+import contextlib
 import json
 import logging
 import os
+import threading
+from collections.abc import Callable, Iterator, Mapping
 from typing import Any
 
 LOG = logging.getLogger(__name__)
@@ -13,33 +16,124 @@ class UnableToManageStore(Exception):
 
 
 class InfoStore:
-    _data: dict[str, Any]
+    """
+    Camera passwords and other state kept in ``~/.uvcclient``.
 
-    def __init__(self, path: str | None = None) -> None:
+    :param lazy: Do not read the file until something is looked up in
+                 it, so that creating a store costs nothing for callers
+                 that may never use it
+    """
+
+    _loaded: dict[str, Any] | None
+
+    def __init__(self, path: str | None = None, lazy: bool = False) -> None:
         if path is None:
             path = os.path.expanduser(os.path.join("~", ".uvcclient"))
         self._path = path
-        self.load()
+        self._loaded = None
+        self._version: tuple[int, int] | None = None
+        self._lock = threading.RLock()
+        if not lazy:
+            self.load()
+
+    @property
+    def _data(self) -> dict[str, Any]:
+        if self._loaded is None:
+            self.load()
+            assert self._loaded is not None
+        return self._loaded
+
+    @_data.setter
+    def _data(self, data: dict[str, Any]) -> None:
+        self._loaded = data
 
     def load(self) -> None:
         try:
             with open(self._path) as f:
+                self._version = self._current_version()
                 self._data = json.loads(base64.b64decode(f.read()).decode())
         except OSError:
             LOG.debug("No info store")
+            self._version = None
             self._data = {}
         except Exception as ex:
             LOG.error("Failed to read store data: %s", ex)
             raise UnableToManageStore("Unable to write to store") from ex
 
+    def refresh(self) -> None:
+        """Re-read the store if another process has changed it since."""
+        if self._loaded is None:
+            return
+        if self._current_version() != self._version:
+            self.load()
+
+    def _current_version(self) -> tuple[int, int] | None:
+        # Every save replaces the file, so a new inode means a new
+        # version even if it was written within one tick of the clock
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
     def save(self) -> None:
+        """
+        Write the store out.
+
+        The file is written in full to a temporary file next to it, which
+        then replaces it, so that other processes never read a partly
+        written store.
+        """
+        import tempfile
+
+        directory = os.path.dirname(self._path) or "."
+        data = base64.b64encode(json.dumps(self._data).encode()).decode()
         try:
-            with open(self._path, "w") as f:
-                f.write(base64.b64encode(json.dumps(self._data).encode()).decode())
-            os.chmod(self._path, 0o600)
+            # Created readable by us alone
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".uvcclient.")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(data)
+                os.replace(tmp, self._path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
         except OSError as ex:
             LOG.error("Unable to write store: %s", str(ex))
             raise UnableToManageStore("Unable to write to store") from ex
+        self._version = self._current_version()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Held while reading, changing and writing the store, by this
+        # thread against others and by this process against other uvc
+        # processes, through a lock file next to the store
+        with self._lock:
+            try:
+                import fcntl
+            except ImportError:
+                # No flock() on Windows; only this process is covered
+                yield
+                return
+            try:
+                fd = os.open(self._path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+            except OSError as ex:
+                LOG.error("Unable to lock store: %s", str(ex))
+                raise UnableToManageStore("Unable to write to store") from ex
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the file releases the lock
+                os.close(fd)
+
+    def _modify(self, change: Callable[[dict[str, Any]], bool]) -> None:
+        # Other processes write the store too, so apply the change on top
+        # of what is on disk now rather than what was read earlier
+        with self._locked():
+            self.refresh()
+            if change(self._data):
+                self.save()
 
     def get_camera_passwords(self) -> dict[str, str]:
         return self._data.get("camera_passwords", {})
@@ -48,14 +142,66 @@ class InfoStore:
         return self.get_camera_passwords().get(uuid)
 
     def set_camera_password(self, uuid: str, password: str) -> None:
-        if "camera_passwords" not in self._data:
-            self._data["camera_passwords"] = {}
-        self._data["camera_passwords"][uuid] = password
-        self.save()
+        def change(data: dict[str, Any]) -> bool:
+            data.setdefault("camera_passwords", {})[uuid] = password
+            return True
+
+        self._modify(change)
+
+    def get_camera_session(self, key: str) -> tuple[str, float] | None:
+        session = self._data.get("camera_sessions", {}).get(key)
+        if session is None:
+            return None
+        return session["cookie"], session["expires"]
+
+    def update_camera_sessions(
+        self, sessions: Mapping[str, tuple[str, float] | None]
+    ) -> None:
+        """
+        Store or delete many camera sessions with a single write.
+
+        :param sessions: (cookie, expiry) by key, or None to delete a key
+        """
+
+        def change(data: dict[str, Any]) -> bool:
+            stored = data.setdefault("camera_sessions", {})
+            changed = False
+            for key, session in sessions.items():
+                if session is None:
+                    changed = stored.pop(key, None) is not None or changed
+                else:
+                    cookie, expires = session
+                    stored[key] = {"cookie": cookie, "expires": expires}
+                    changed = True
+            return changed
+
+        self._modify(change)
+
+    def set_camera_session(self, key: str, cookie: str, expires: float) -> None:
+        self.update_camera_sessions({key: (cookie, expires)})
+
+    def delete_camera_session(self, key: str) -> None:
+        self.update_camera_sessions({key: None})
+
+    def get_server_version(self, key: str) -> tuple[str, float] | None:
+        entry = self._data.get("server_versions", {}).get(key)
+        if entry is None:
+            return None
+        return entry["version"], entry["expires"]
+
+    def set_server_version(self, key: str, version: str, expires: float) -> None:
+        def change(data: dict[str, Any]) -> bool:
+            data.setdefault("server_versions", {})[key] = {
+                "version": version,
+                "expires": expires,
+            }
+            return True
+
+        self._modify(change)
 
 
-def get_info_store(path: str | None = None) -> InfoStore:
+def get_info_store(path: str | None = None, lazy: bool = False) -> InfoStore:
     global _INFO_STORE
     if _INFO_STORE is None:
-        _INFO_STORE = InfoStore(path)
+        _INFO_STORE = InfoStore(path, lazy=lazy)
     return _INFO_STORE
@@ -0,0 +1,255 @@
+import codecs
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import IO, Any
+
+CHUNK_SIZE = 64 * 1024
+
+Sink = IO[bytes] | bytearray | memoryview
+
+
+def copy_response(resp: Any, out: Sink, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Copy a response body into a file, bytearray or memoryview.
+
+    The body is never held in memory as a whole. A file-like ``out`` gets
+    the body one chunk at a time through a single reused buffer. A
+    ``bytearray`` is resized to the Content-Length up front, when known,
+    and read into in place; otherwise it is extended chunk by chunk. A
+    ``memoryview`` is filled from the start and must be large enough.
+
+    :param resp: An :class:`http.client.HTTPResponse`
+    :param out: Where to put the body
+    :returns: The number of bytes copied
+    """
+    length = resp.length if isinstance(resp.length, int) else None
+
+    if isinstance(out, bytearray) and length is not None:
+        start = len(out)
+        out.extend(bytes(length))
+        view = memoryview(out)[start:]
+        try:
+            total = _readinto(resp, view, length)
+        finally:
+            view.release()
+        del out[start + total :]
+        return total
+    if isinstance(out, memoryview):
+        if length is not None and length > len(out):
+            raise ValueError(f"Buffer too small for {length} byte response")
+        total = _readinto(resp, out, len(out))
+        if length is None and total == len(out) and resp.read(1):
+            raise ValueError("Buffer too small for response")
+        return total
+
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    total = 0
+    try:
+        while True:
+            count = resp.readinto(view)
+            if not count:
+                break
+            if isinstance(out, bytearray):
+                out.extend(view[:count])
+            else:
+                out.write(view[:count])
+            total += count
+    finally:
+        view.release()
+    return total
+
+
+def write_bytes(out: Sink, data: bytes | bytearray | memoryview) -> int:
+    """
+    Write a whole image or body into a file, bytearray or memoryview.
+
+    :returns: The number of bytes written
+    """
+    if isinstance(out, bytearray):
+        out.extend(data)
+    elif isinstance(out, memoryview):
+        size = memoryview(data).nbytes
+        if size > len(out):
+            raise ValueError(f"Buffer too small for {size} bytes")
+        out[:size] = data
+    else:
+        out.write(data)
+    return memoryview(data).nbytes
+
+
+def _readinto(resp: Any, view: memoryview, limit: int) -> int:
+    total = 0
+    while total < limit:
+        count = resp.readinto(view[total:limit])
+        if not count:
+            break
+        total += count
+    return total
+
+
+def iter_body(
+    resp: Any, encoding: str | None = None, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Read a response body one chunk at a time, decompressing as it goes.
+
+    :param resp: An :class:`http.client.HTTPResponse`
+    :param encoding: The response's Content-Encoding, if any
+    """
+    return iter_decoded(iter(lambda: resp.read(chunk_size), b""), encoding)
+
+
+def content_encoding(headers: Iterable[tuple[str, str]]) -> str | None:
+    """Return the Content-Encoding from a list of response headers."""
+    for name, value in headers:
+        if name.lower() == "content-encoding":
+            return value
+    return None
+
+
+def decode_body(body: bytes, headers: Iterable[tuple[str, str]]) -> bytes:
+    """Decompress a whole response body according to its headers."""
+    encoding = content_encoding(headers)
+    if not encoding:
+        return body
+    return b"".join(iter_decoded([body], encoding))
+
+
+def iter_decoded(chunks: Iterable[bytes], encoding: str | None) -> Iterator[bytes]:
+    """
+    Decompress a body in the given Content-Encoding chunk by chunk.
+
+    gzip and deflate are supported; "deflate" is accepted both with the
+    zlib framing RFC 9110 asks for and as the raw stream some servers
+    send instead.
+
+    :raises ValueError: If the encoding is not supported
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        yield from chunks
+        return
+    if encoding in ("gzip", "x-gzip"):
+        # 32 also accepts a zlib header, which older NVRs send as "gzip"
+        wbits = 32 + zlib.MAX_WBITS
+    elif encoding == "deflate":
+        wbits = zlib.MAX_WBITS
+    else:
+        raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+    decompressor = zlib.decompressobj(wbits)
+    started = False
+    for chunk in chunks:
+        try:
+            data = decompressor.decompress(chunk)
+        except zlib.error:
+            if started or encoding != "deflate":
+                raise
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            data = decompressor.decompress(chunk)
+        started = True
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class _JSONScanner:
+    """Pull JSON values one at a time out of a stream of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            if text:
+                self._buf = self._buf[self._pos :] + text
+                self._pos = 0
+                return True
+        self._buf = self._buf[self._pos :] + self._text.decode(b"", final=True)
+        self._pos = 0
+        self._eof = True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON stream")
+        self._pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A value is only known to be complete once a delimiter
+            # follows it: "12" or "1.5e" at the end of a chunk may
+            # still continue in the next one.
+            if (
+                end < len(self._buf) and self._buf[end] in _DELIMITERS
+            ) or not self._fill():
+                self._pos = end
+                return value
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    Yield the items of one array in a JSON object as they are parsed.
+
+    Only the item being parsed is held in memory, so a large list such
+    as ``{"data": [...]}`` can be processed while it downloads. The rest
+    of the object is read and skipped.
+
+    :param chunks: The document as an iterable of UTF-8 byte chunks
+    :param key: The top-level key holding the array
+    :raises ValueError: If the document is not valid JSON
+    """
+    scanner = _JSONScanner(chunks)
+    scanner.expect("{")
+    if scanner.peek() == "}":
+        return
+    while True:
+        name = scanner.value()
+        scanner.expect(":")
+        if name == key:
+            scanner.expect("[")
+            if scanner.peek() == "]":
+                scanner.expect("]")
+            else:
+                while True:
+                    yield scanner.value()
+                    if scanner.expect(",]") == "]":
+                        break
+        else:
+            scanner.value()
+        if scanner.expect(",}") == "}":
+            return
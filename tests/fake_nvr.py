@@ -0,0 +1,243 @@
+"""
+Local stand-ins for an NVR and its cameras, served over real HTTP.
+
+Both servers run in a background thread on a random localhost port and
+speak HTTP/1.1 with keep-alive, so client connection pooling, gzip and
+session handling are exercised the same way as against real hardware.
+``latency`` is added to every response and ``payload_size`` pads each
+camera document, to mimic a slow or heavily configured NVR.
+"""
+
+import gzip
+import http.server
+import itertools
+import json
+import threading
+import time
+import urllib.parse
+from collections import Counter
+
+API_KEY = "fakekey"
+PASSWORD = "ubnt"  # noqa: S105
+
+_session_ids = itertools.count(1)
+
+
+def camera_doc(index, payload_size=0):
+    doc = {
+        "_id": f"id{index}",
+        "uuid": f"uuid{index}",
+        "name": f"Camera {index}",
+        "model": "UVC G3" if index % 2 else "UVC Micro",
+        "host": "",
+        "username": "ubnt",
+        "state": "CONNECTED",
+        "managed": True,
+        "deleted": False,
+        "recordingSettings": {
+            "fullTimeRecordEnabled": False,
+            "motionRecordEnabled": True,
+            "channel": 0,
+        },
+        "ispSettings": {"brightness": 50, "contrast": 50, "irLedMode": "auto"},
+        "zones": [{"name": "Default"}, {"name": "Door"}],
+    }
+    if payload_size:
+        size = len(json.dumps(doc))
+        doc["platform"] = "x" * max(0, payload_size - size - 16)
+    return doc
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed
+    # ACKs on keep-alive connections add ~40ms to every response
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        fake = self.server.fake
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        fake.requests[(self.command, url.path)] += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+        status, headers, payload = fake.handle(
+            self.command, url.path, query, self.headers, body
+        )
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = _handle
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fake):
+        self.fake = fake
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+
+class FakeServer:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = Counter()
+        self._server = None
+
+    @property
+    def host(self):
+        return "127.0.0.1"
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._server = _Server(self)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, method, path, query, headers, body):
+        raise NotImplementedError
+
+
+def _json(doc, headers=(), gzipped=False):
+    payload = json.dumps(doc).encode()
+    headers = [("Content-Type", "application/json"), *headers]
+    if gzipped:
+        payload = gzip.compress(payload, compresslevel=1)
+        headers.append(("Content-Encoding", "gzip"))
+    return 200, headers, payload
+
+
+class FakeNVR(FakeServer):
+    """
+    Serve bootstrap, camera list, camera documents and snapshots.
+
+    :param cameras: Number of cameras
+    :param payload_size: Approximate size in bytes of each camera document
+    :param snapshot_size: Size in bytes of each snapshot
+    """
+
+    def __init__(
+        self,
+        cameras=10,
+        latency=0.0,
+        payload_size=0,
+        snapshot_size=64 * 1024,
+        version="3.10.13",
+    ):
+        super().__init__(latency)
+        self.version = version
+        self.snapshot = b"\xff\xd8" + bytes(max(0, snapshot_size - 2))
+        self.cameras = {}
+        for i in range(cameras):
+            doc = camera_doc(i, payload_size)
+            self.cameras[doc["_id"]] = doc
+        self._lock = threading.Lock()
+
+    def _find(self, ident):
+        for doc in self.cameras.values():
+            if ident in (doc["_id"], doc["uuid"]):
+                return doc
+        return None
+
+    def handle(self, method, path, query, headers, body):
+        if query.get("apiKey") != API_KEY:
+            return 401, [], b""
+        gzipped = "gzip" in (headers.get("Accept-Encoding") or "")
+        parts = path.strip("/").split("/")
+        if path == "/api/2.0/bootstrap":
+            return _json({"data": [{"systemInfo": {"version": self.version}}]})
+        if path == "/api/2.0/camera":
+            with self._lock:
+                docs = list(self.cameras.values())
+            return _json({"data": docs, "meta": {"totalCount": len(docs)}}, (), gzipped)
+        if parts[:3] == ["api", "2.0", "camera"] and len(parts) == 4:
+            with self._lock:
+                doc = self._find(parts[3])
+                if doc is None:
+                    return 404, [], b""
+                if method == "PUT":
+                    doc.update(json.loads(body))
+            return _json({"data": [doc]}, (), gzipped)
+        if parts[:4] == ["api", "2.0", "snapshot", "camera"]:
+            if self._find(parts[4]) is None:
+                return 404, [], b""
+            return 200, [("Content-Type", "image/jpeg")], self.snapshot
+        return 404, [], b""
+
+
+class FakeCamera(FakeServer):
+    """
+    Serve the login, configuration and snapshot pages of a camera.
+
+    Both the pre-3.2 (``/login.cgi``) and 3.2+ (``/api/1.1/login``)
+    logins are supported; the resulting session cookie is required for
+    everything else.
+    """
+
+    def __init__(self, latency=0.0, snapshot_size=64 * 1024):
+        super().__init__(latency)
+        self.snapshot = b"\xff\xd8" + bytes(max(0, snapshot_size - 2))
+        self.settings = {}
+        self.sessions = set()
+        self._pending = set()
+
+    def _session(self, headers):
+        cookie = headers.get("Cookie") or ""
+        return cookie.split("=", 1)[-1].split(";")[0]
+
+    def handle(self, method, path, query, headers, body):
+        if path == "/" and method == "GET":
+            session = f"s{next(_session_ids)}"
+            self._pending.add(session)
+            return 200, [("Set-Cookie", f"AIROS_SESSIONID={session}; Path=/")], b""
+        if path == "/login.cgi" and method == "POST":
+            form = dict(urllib.parse.parse_qsl(body.decode()))
+            if form.get("password") != PASSWORD or form["AIROS_SESSIONID"] not in (
+                self._pending
+            ):
+                return 403, [], b""
+            self._pending.discard(form["AIROS_SESSIONID"])
+            self.sessions.add(form["AIROS_SESSIONID"])
+            return 200, [], b""
+        if path == "/api/1.1/login" and method == "POST":
+            if json.loads(body).get("password") != PASSWORD:
+                return 403, [], b""
+            session = f"s{next(_session_ids)}"
+            self.sessions.add(session)
+            return 200, [("Set-Cookie", f"authId={session}; Path=/")], b""
+
+        if self._session(headers) not in self.sessions:
+            return 401, [], b""
+        if path == "/cfgwrite.cgi":
+            self.settings.update(query)
+            return 200, [], b""
+        if path in ("/snap.jpeg", "/snapshot.cgi"):
+            return 200, [("Content-Type", "image/jpeg")], self.snapshot
+        if path == "/api/1.1/status":
+            return _json({"uptime": 1234})
+        if path == "/api/1.1/reboot":
+            return 200, [], b""
+        return 404, [], b""
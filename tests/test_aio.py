@@ -0,0 +1,234 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from uvcclient import aio, camera, nvr, retry
+
+
+class FakeServer:
+    """Serve canned HTTP responses, one per request, on a local port."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        while self.responses:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode().split("\r\n")
+            headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+            body = await reader.readexactly(int(headers.get("Content-Length", 0)))
+            self.requests.append((lines[0], headers, body))
+            writer.write(self.responses.pop(0))
+            await writer.drain()
+        writer.close()
+
+
+def response(body, status="200 OK", headers=()):
+    head = [f"HTTP/1.1 {status}", f"Content-Length: {len(body)}", *headers]
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+class TestAsyncConnection(unittest.IsolatedAsyncioTestCase):
+    async def test_keepalive_reuse(self):
+        server = FakeServer([response(b'{"data": [1]}'), response(b'{"data": [2]}')])
+        port = await server.start()
+        client = aio.AsyncUVCRemote("127.0.0.1", port, "key")
+        self.assertEqual({"data": [1]}, await client._uvc_request("/a"))
+        self.assertEqual({"data": [2]}, await client._uvc_request("/b?x=y"))
+        self.assertEqual(1, server.connections)
+        self.assertEqual(1, client.pool_stats["reused"])
+        self.assertEqual("GET /b?x=y&apiKey=key HTTP/1.1", server.requests[1][0])
+        client.close()
+        await server.stop()
+
+    async def test_chunked(self):
+        body = b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n"
+        server = FakeServer(
+            [
+                b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n" + body,
+            ]
+        )
+        port = await server.start()
+        pool = aio.AsyncConnectionPool("127.0.0.1", port)
+        resp, reused = await pool.request("GET", "/")
+        self.assertFalse(reused)
+        self.assertEqual(b"hello world", resp.read())
+        pool.close()
+        await server.stop()
+
+    async def test_stale_connection_reconnects(self):
+        server = FakeServer([response(b"one")])
+        port = await server.start()
+        pool = aio.AsyncConnectionPool("127.0.0.1", port)
+        resp, _ = await pool.request("GET", "/")
+        self.assertEqual(b"one", resp.read())
+        # The server hung up after its only response; the next request
+        # must notice and go out on a new connection.
+        server.responses.append(response(b"two"))
+        resp, reused = await pool.request("GET", "/")
+        self.assertEqual(b"two", resp.read())
+        self.assertFalse(reused)
+        self.assertEqual(1, pool.stats["reconnected"])
+        pool.close()
+        await server.stop()
+
+    async def test_stale_connection_post_not_resent(self):
+        server = FakeServer([response(b"one")])
+        port = await server.start()
+        pool = aio.AsyncConnectionPool("127.0.0.1", port)
+        resp, _ = await pool.request("GET", "/")
+        resp.read()
+        server.responses.append(response(b"two"))
+        with self.assertRaises(aio.STALE_ERRORS):
+            await pool.request("POST", "/", b"x")
+        self.assertEqual(1, server.connections)
+        pool.close()
+        await server.stop()
+
+    async def test_error_status(self):
+        server = FakeServer([response(b"", status="401 Unauthorized")])
+        port = await server.start()
+        client = aio.AsyncUVCRemote("127.0.0.1", port, "key")
+        with self.assertRaises(nvr.NotAuthorized):
+            await client._uvc_request("/a")
+        client.close()
+        await server.stop()
+
+    async def test_read_timeout(self):
+        # A server that accepts the request but never answers
+        hang = asyncio.Event()
+
+        async def handle(reader, writer):
+            await hang.wait()
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = aio.AsyncUVCRemote(
+            "127.0.0.1", port, "key", timeouts=retry.Timeouts(connect=1, read=0.1)
+        )
+        with self.assertRaises(nvr.NvrError) as ctx:
+            await asyncio.wait_for(client._uvc_request("/a"), 5)
+        self.assertIsInstance(ctx.exception.__cause__, TimeoutError)
+        self.assertEqual(0, client.pool_stats["idle"])
+        hang.set()
+        server.close()
+        await server.wait_closed()
+
+    async def test_connect_error(self):
+        client = aio.AsyncUVCRemote("127.0.0.1", 1, "key")
+        with self.assertRaises(nvr.NvrError):
+            await client._uvc_request("/a")
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+    async def test_index_and_name(self):
+        client = aio.AsyncUVCRemote("foo", 7080, "key")
+        cams = {
+            "data": [
+                {
+                    "name": "Porch",
+                    "uuid": "uuid1",
+                    "_id": "id1",
+                    "state": "CONNECTED",
+                    "managed": True,
+                    "deleted": False,
+                    "recordingSettings": {
+                        "fullTimeRecordEnabled": False,
+                        "motionRecordEnabled": False,
+                    },
+                }
+            ]
+        }
+        bootstrap = {"data": [{"systemInfo": {"version": "3.2.1"}}]}
+
+        async def fake_req(path, method="GET", data=None):
+            return bootstrap if path == "/api/2.0/bootstrap" else cams
+
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            self.assertEqual("none", (await client.index())[0]["recordmode"])
+            self.assertEqual("id1", await client.name_to_uuid("Porch"))
+            self.assertEqual((3, 2, 1), await client.get_server_version())
+            self.assertIsNone(await client.name_to_uuid("Garage"))
+            cams["data"].append({**cams["data"][0], "uuid": "uuid2", "_id": "id2"})
+            with self.assertRaises(nvr.AmbiguousName):
+                await client.name_to_uuid("Porch")
+
+    async def test_set_recordmode(self):
+        client = aio.AsyncUVCRemote("foo", 7080, "key")
+        doc = {
+            "recordingSettings": {
+                "fullTimeRecordEnabled": False,
+                "motionRecordEnabled": False,
+            }
+        }
+        expected = {
+            "fullTimeRecordEnabled": False,
+            "motionRecordEnabled": True,
+            "channel": 0,
+        }
+
+        puts = []
+
+        async def fake_req(path, method="GET", data=None):
+            if method == "PUT":
+                puts.append(data)
+                return {"data": [data]}
+            return {"data": [json.loads(json.dumps(doc))]}
+
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            self.assertTrue(await client.set_recordmode("uuid", "motion", "high"))
+            with self.assertRaises(nvr.Invalid):
+                await client.set_recordmode("uuid", "sometimes")
+        self.assertEqual([{"recordingSettings": expected}], puts)
+
+    async def test_concurrent_snapshots(self):
+        client = aio.AsyncUVCRemote("foo", 7080, "key")
+
+        async def fake_req(method, url, body=None, headers=None):
+            await asyncio.sleep(0)
+            return aio.AsyncResponse(200, "OK", [], url.encode(), False)
+
+        with mock.patch.object(client, "_safe_request", side_effect=fake_req):
+            results = await asyncio.gather(
+                *(client.get_snapshot(f"cam{i}") for i in range(100))
+            )
+        self.assertEqual(100, len(results))
+        self.assertTrue(results[5].startswith(b"/api/2.0/snapshot/camera/cam5"))
+
+
+class TestAsyncCamera(unittest.IsolatedAsyncioTestCase):
+    async def test_login_v320_and_snapshot(self):
+        server = FakeServer(
+            [
+                response(b"{}", headers=["Set-Cookie: thecookie"]),
+                response(b"jpeg"),
+                response(b"", status="401 Unauthorized"),
+            ]
+        )
+        port = await server.start()
+        c = aio.AsyncUVCCameraClientV320("127.0.0.1", "ubnt", "pass", port=port)
+        await c.login()
+        self.assertEqual("POST /api/1.1/login HTTP/1.1", server.requests[0][0])
+        self.assertEqual(
+            {"username": "ubnt", "password": "pass"},
+            json.loads(server.requests[0][2]),
+        )
+        self.assertEqual(b"jpeg", await c.get_snapshot())
+        self.assertEqual("thecookie", server.requests[1][1]["Cookie"])
+        with self.assertRaises(camera.CameraAuthError):
+            await c.get_snapshot()
+        c.close()
+        await server.stop()
@@ -0,0 +1,138 @@
+"""
+Benchmarks against the local fake NVR and camera in fake_nvr.py.
+
+Run them on their own to get timings, since pytest-benchmark turns
+itself off under xdist::
+
+    pytest tests/test_benchmarks.py -o addopts="" --benchmark-only
+
+Each benchmark fails if its median time is over its entry in
+:data:`BUDGETS`. The budgets are several times the usual timings, so
+that they hold on slow CI runners; CI also compares pull requests
+against their base branch, which catches smaller regressions.
+"""
+
+import contextlib
+import io
+import itertools
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fake_nvr import API_KEY, PASSWORD, FakeCamera, FakeNVR
+
+from uvcclient import camera, main, nvr, store
+
+CAMERAS = 200
+DOC_SIZE = 8 * 1024
+
+#: Median seconds allowed per call, by benchmark
+BUDGETS = {
+    "test_index": 0.25,
+    "test_index_streamed": 0.25,
+    "test_cli_list": 0.3,
+    "test_snapshot_via_nvr": 0.005,
+    "test_set_recordmode": 0.02,
+    "test_set_recordmode_many": 2.0,
+    "test_camera_login": 0.02,
+    "test_camera_snapshot_cached_session": 0.01,
+}
+
+
+@pytest.fixture(autouse=True)
+def budget(request, benchmark):
+    yield
+    # No stats when benchmarks are disabled, as under xdist
+    if benchmark.stats is None:
+        return
+    median = benchmark.stats.stats.median
+    allowed = BUDGETS[request.node.originalname]
+    assert median <= allowed, f"median {median:.4f}s is over {allowed}s budget"
+
+
+@pytest.fixture(scope="module")
+def nvr_server():
+    with FakeNVR(cameras=CAMERAS, payload_size=DOC_SIZE) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def camera_server():
+    with FakeCamera() as server:
+        yield server
+
+
+@pytest.fixture
+def client(nvr_server):
+    client = nvr.UVCRemote(nvr_server.host, nvr_server.port, API_KEY)
+    yield client
+    client.close()
+
+
+def test_index(benchmark, client):
+    assert len(benchmark(client.index)) == CAMERAS
+
+
+def test_index_streamed(benchmark, client):
+    assert len(benchmark(client.index, stream=True)) == CAMERAS
+
+
+def test_cli_list(benchmark, nvr_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "INFO_STORE", store.InfoStore(str(tmp_path / "s")))
+    env = {"UVC_HOST": nvr_server.host, "UVC_PORT": str(nvr_server.port)}
+    env["UVC_APIKEY"] = API_KEY
+
+    def run():
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            assert main.main(["--list", "--no-daemon"], env=env) == 0
+        return out.getvalue()
+
+    assert len(benchmark(run).splitlines()) == CAMERAS
+
+
+def test_snapshot_via_nvr(benchmark, client, nvr_server):
+    def run():
+        buf = bytearray()
+        client.stream_snapshot("id1", buf)
+        return buf
+
+    assert benchmark(run) == nvr_server.snapshot
+
+
+def test_set_recordmode(benchmark, client):
+    modes = itertools.cycle(["full", "motion"])
+    assert benchmark(lambda: client.set_recordmode("id1", next(modes)))
+
+
+def test_set_recordmode_many(benchmark, client):
+    # Start every camera in motion, so each round changes all of them
+    client.set_recordmode_many(None, "motion")
+    modes = itertools.cycle(["full", "motion"])
+    results = benchmark(lambda: client.set_recordmode_many(None, next(modes)))
+    assert {r.status for r in results} == {"changed"}
+
+
+@pytest.mark.parametrize(
+    "client_class", [camera.UVCCameraClient, camera.UVCCameraClientV320]
+)
+def test_camera_login(benchmark, camera_server, client_class):
+    cam = client_class(camera_server.host, "ubnt", PASSWORD, camera_server.port)
+    benchmark(cam.login)
+
+
+def test_camera_snapshot_cached_session(benchmark, camera_server, tmp_path):
+    sessions = camera.SessionCache(store=store.InfoStore(os.path.join(tmp_path, "s")))
+
+    def run():
+        cam = camera.UVCCameraClientV320(
+            camera_server.host, "ubnt", PASSWORD, camera_server.port, sessions=sessions
+        )
+        cam.ensure_login()
+        buf = bytearray()
+        cam.stream_snapshot(buf)
+        return buf
+
+    assert benchmark(run) == camera_server.snapshot
@@ -0,0 +1,143 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from uvcclient import cache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        c = cache.TTLCache(10)
+        self.assertIsNone(c.get("a"))
+        c.set("a", 1)
+        self.assertEqual(1, c.get("a"))
+        self.assertEqual(1, c.stats["hits"])
+        self.assertEqual(1, c.stats["misses"])
+
+    def test_expires(self):
+        c = cache.TTLCache(10)
+        with mock.patch("time.monotonic", return_value=100):
+            c.set("a", 1)
+        with mock.patch("time.monotonic", return_value=110):
+            self.assertIsNone(c.get("a"))
+        self.assertEqual(1, c.stats["expired"])
+        self.assertEqual(0, len(c))
+
+    def test_lru_eviction(self):
+        c = cache.TTLCache(10, maxsize=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")
+        c.set("c", 3)
+        self.assertIsNone(c.get("b"))
+        self.assertEqual(1, c.get("a"))
+        self.assertEqual(3, c.get("c"))
+        self.assertEqual(1, c.stats["evictions"])
+
+    def test_invalidate(self):
+        c = cache.TTLCache(10)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.invalidate("a")
+        self.assertIsNone(c.get("a"))
+        c.invalidate()
+        self.assertEqual(0, len(c))
+
+
+class TestSnapshotCache(unittest.TestCase):
+    def test_hit_within_max_age(self):
+        c = cache.SnapshotCache(max_age=1)
+        fetch = mock.MagicMock(return_value=bytearray(b"jpeg"))
+        with mock.patch("time.monotonic", return_value=100):
+            first = c.get("cam", fetch)
+            second = c.get("cam", fetch)
+        self.assertIs(first, second)
+        self.assertTrue(first.readonly)
+        self.assertEqual(b"jpeg", first)
+        with mock.patch("time.monotonic", return_value=101.5):
+            c.get("cam", fetch)
+            c.get("cam", fetch, max_age=5)
+        self.assertEqual(2, fetch.call_count)
+        self.assertEqual(2, c.stats["hits"])
+        self.assertEqual(2, c.stats["misses"])
+
+    def test_byte_budget(self):
+        c = cache.SnapshotCache(max_bytes=10)
+        c.get("a", lambda: b"1234")
+        c.get("b", lambda: b"1234")
+        c.get("a", lambda: b"")
+        c.get("c", lambda: b"1234")
+        self.assertEqual(["a", "c"], list(c._data))
+        self.assertEqual(8, c.stats["bytes"])
+        self.assertEqual(1, c.stats["evictions"])
+        # Too big to keep at all
+        self.assertEqual(b"x" * 11, c.get("d", lambda: b"x" * 11))
+        self.assertEqual(2, len(c))
+        c.invalidate("a")
+        self.assertEqual(4, c.stats["bytes"])
+        c.invalidate()
+        self.assertEqual((0, 0), (len(c), c.stats["bytes"]))
+
+    def test_single_flight(self):
+        c = cache.SnapshotCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return b"jpeg"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(c.get("cam", fetch)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(c.get("cam", fetch)))
+            for _ in range(3)
+        ]
+        for t in followers:
+            t.start()
+        while c.stats["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for t in [leader, *followers]:
+            t.join(5)
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, len(results))
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_error_shared(self):
+        c = cache.SnapshotCache()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fetch():
+            started.set()
+            release.wait(5)
+            raise OSError("camera down")
+
+        errors = []
+
+        def get():
+            try:
+                c.get("cam", fetch)
+            except OSError as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=get)]
+        threads[0].start()
+        started.wait(5)
+        threads.append(threading.Thread(target=get))
+        threads[1].start()
+        while c.stats["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(2, len(errors))
+        self.assertEqual(0, len(c))
+        self.assertEqual(b"ok", c.get("cam", lambda: b"ok"))
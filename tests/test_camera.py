@@ -1,3 +1,4 @@
+import io
 import json
 import unittest
 from http import client as httplib
@@ -27,6 +28,23 @@ class TestCamera(unittest.TestCase):
             r = c.get_snapshot()
             self.assertEqual(conn.getresponse.return_value.read.return_value, r)
 
+    def test_stream_snapshot(self):
+        c = camera.UVCCameraClientV320("foo", "ubnt", "ubnt")
+        out = bytearray()
+        with mock.patch.object(c, "_safe_request") as mock_r:
+            mock_r.return_value = io.BytesIO(b"jpegdata")
+            mock_r.return_value.status = 200
+            mock_r.return_value.length = 8
+            self.assertEqual(8, c.stream_snapshot(out))
+            mock_r.assert_called_once_with("GET", "/snap.jpeg", headers={"Cookie": ""})
+        self.assertEqual(b"jpegdata", out)
+
+    def test_stream_snapshot_auth_error(self):
+        c = camera.UVCCameraClient("foo", "ubnt", "ubnt")
+        with mock.patch.object(c, "_safe_request") as mock_r:
+            mock_r.return_value.status = 401
+            self.assertRaises(camera.CameraAuthError, c.stream_snapshot, io.BytesIO())
+
     def test_cfgwrite(self):
         c = camera.UVCCameraClient("foo", "ubnt", "ubnt")
         c._cookie = "foo-cookie"
@@ -85,3 +103,90 @@ class TestCamera(unittest.TestCase):
         data = json.loads(mock_h.return_value.request.call_args_list[0][0][2])
         self.assertEqual({"username": "ubnt", "password": "ubnt"}, data)
         self.assertEqual("cookie", c._cookie)
+
+
+class TestCameraSessions(unittest.TestCase):
+    def test_session_cache_expires(self):
+        sessions = camera.SessionCache(ttl=10)
+        with mock.patch("time.time", return_value=100):
+            sessions.set("key", "cookie")
+        with mock.patch("time.time", return_value=105):
+            self.assertEqual("cookie", sessions.get("key"))
+        with mock.patch("time.time", return_value=110):
+            self.assertIsNone(sessions.get("key"))
+
+    def test_session_cache_persists(self):
+        store = mock.MagicMock()
+        store.get_camera_session.return_value = ("stored", 2000)
+        sessions = camera.SessionCache(ttl=10, store=store)
+        with mock.patch("time.time", return_value=1000):
+            self.assertEqual("stored", sessions.get("key"))
+            sessions.set("key", "cookie")
+        store.update_camera_sessions.assert_called_once_with({"key": ("cookie", 1010)})
+        sessions.invalidate("key")
+        store.update_camera_sessions.assert_called_with({"key": None})
+
+    def test_session_cache_batch(self):
+        store = mock.MagicMock()
+        sessions = camera.SessionCache(ttl=10, store=store)
+        with mock.patch("time.time", return_value=1000), sessions.batch():
+            sessions.set("a", "cookie-a")
+            sessions.set("b", "cookie-b")
+            sessions.invalidate("c")
+            store.update_camera_sessions.assert_not_called()
+            self.assertEqual("cookie-a", sessions.get("a"))
+        store.update_camera_sessions.assert_called_once_with(
+            {"a": ("cookie-a", 1010), "b": ("cookie-b", 1010), "c": None}
+        )
+
+    def test_ensure_login_uses_cached_session(self):
+        sessions = camera.SessionCache()
+        sessions.set("ubnt@foo:80", "cached-cookie")
+        c = camera.UVCCameraClientV320("foo", "ubnt", "ubnt", sessions=sessions)
+        with mock.patch.object(c, "login") as mock_login:
+            c.ensure_login()
+            self.assertFalse(mock_login.called)
+        self.assertEqual("cached-cookie", c._cookie)
+
+    def test_login_stores_session(self):
+        sessions = camera.SessionCache()
+        c = camera.UVCCameraClientV320("foo", "ubnt", "ubnt", sessions=sessions)
+        with mock.patch.object(c, "_safe_request") as mock_r:
+            mock_r.return_value.status = 200
+            mock_r.return_value.getheaders.return_value = {"set-cookie": "cookie"}
+            c.ensure_login()
+        self.assertEqual("cookie", sessions.get("ubnt@foo:80"))
+
+    def test_relogin_on_expired_session(self):
+        sessions = camera.SessionCache()
+        sessions.set("ubnt@foo:80", "stale-cookie")
+        c = camera.UVCCameraClientV320("foo", "ubnt", "ubnt", sessions=sessions)
+        c.ensure_login()
+        expired = mock.MagicMock(status=401)
+        ok = mock.MagicMock(status=200)
+        ok.read.return_value = b'{"up": true}'
+
+        def fake_login():
+            c._cookie = "fresh-cookie"
+            c._remember_session()
+
+        with (
+            mock.patch.object(c, "_safe_request", side_effect=[expired, ok]) as mr,
+            mock.patch.object(c, "login", side_effect=fake_login) as mock_login,
+        ):
+            self.assertEqual({"up": True}, c.get_status())
+            mock_login.assert_called_once_with()
+            self.assertEqual(
+                {"Cookie": "fresh-cookie"}, mr.call_args_list[1][1]["headers"]
+            )
+        self.assertEqual("fresh-cookie", sessions.get("ubnt@foo:80"))
+
+    def test_no_relogin_without_session(self):
+        c = camera.UVCCameraClient("foo", "ubnt", "ubnt")
+        with (
+            mock.patch.object(c, "_safe_request") as mock_r,
+            mock.patch.object(c, "login") as mock_login,
+        ):
+            mock_r.return_value.status = 302
+            self.assertRaises(camera.CameraAuthError, c.reboot)
+            self.assertFalse(mock_login.called)
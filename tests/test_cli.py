@@ -1,7 +1,13 @@
+import ast
+import io
+import json
+import os
+import sys
+import tempfile
 import unittest
 from unittest import mock
 
-from uvcclient import nvr
+from uvcclient import camera, fleet, main, nvr, recorder, store
 
 
 class TestCliUtils(unittest.TestCase):
@@ -32,3 +38,230 @@ class TestCliUtils(unittest.TestCase):
         self.assertEqual(7443, port)
         self.assertEqual("myKey", key)
         self.assertEqual("/", path)
+
+
+class TestCli(unittest.TestCase):
+    def _run(self, *args):
+        raw = io.BytesIO()
+        stdout = io.TextIOWrapper(raw, write_through=True)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        info_store = store.InfoStore(os.path.join(tmpdir.name, "store"))
+        with (
+            mock.patch.object(main, "INFO_STORE", info_store),
+            mock.patch.object(main, "_SESSIONS", None),
+            mock.patch.dict(
+                os.environ, {"UVC_SOCKET": os.path.join(tmpdir.name, "sock")}
+            ),
+            mock.patch.object(sys, "argv", ["uvc", "-H", "nvr", "-K", "key", *args]),
+            mock.patch.object(sys, "stdout", stdout),
+            mock.patch.object(nvr, "get_auth_from_env") as mock_auth,
+        ):
+            mock_auth.return_value = ("nvr", 7080, "key", "/")
+            result = main.main()
+        return result, raw.getvalue().decode(errors="replace")
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "_uvc_request")
+    def test_list_single_request(self, mock_r, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_r.return_value = {
+            "data": [
+                {
+                    "name": "Porch",
+                    "uuid": "uuid1",
+                    "_id": "id1",
+                    "state": "CONNECTED",
+                    "managed": True,
+                    "deleted": False,
+                    "recordingSettings": {
+                        "fullTimeRecordEnabled": True,
+                        "motionRecordEnabled": False,
+                    },
+                }
+            ]
+        }
+        result, output = self._run("--list")
+        self.assertEqual(0, result)
+        mock_r.assert_called_once_with("/api/2.0/camera")
+        self.assertIn("Porch", output)
+        self.assertIn("[    online] full", output)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "iter_cameras")
+    def test_list_formats(self, mock_cameras, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_cameras.side_effect = lambda: iter(
+            [
+                {
+                    "name": "Porch",
+                    "uuid": "uuid1",
+                    "_id": "id1",
+                    "state": "CONNECTED",
+                    "managed": True,
+                    "host": "cam1",
+                    "recordingSettings": {
+                        "fullTimeRecordEnabled": False,
+                        "motionRecordEnabled": True,
+                    },
+                }
+            ]
+        )
+        result, output = self._run("--list", "--format", "ndjson")
+        self.assertEqual(0, result)
+        row = json.loads(output)
+        self.assertEqual(("uuid1", "motion"), (row["uuid"], row["recordmode"]))
+        result, output = self._run("--list", "--format", "csv")
+        self.assertEqual(
+            [
+                "uuid,name,id,state,managed,recordmode,model,host,username",
+                "uuid1,Porch,id1,CONNECTED,True,motion,,cam1,",
+            ],
+            output.splitlines(),
+        )
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "get_picture_settings")
+    @mock.patch.object(nvr.UVCRemote, "list_zones")
+    def test_camera_formats(self, mock_zones, mock_settings, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_settings.return_value = {"brightness": 50, "irLedMode": "auto"}
+        mock_zones.return_value = [{"name": "Default", "coordinates": [[0, 0]]}]
+        result, output = self._run(
+            "--uuid", "uuid1", "--get-picture-settings", "--format", "json"
+        )
+        self.assertEqual(0, result)
+        self.assertEqual(mock_settings.return_value, json.loads(output))
+        result, output = self._run(
+            "--uuid", "uuid1", "--list-zones", "--format", "json"
+        )
+        self.assertEqual(0, result)
+        self.assertEqual(mock_zones.return_value, json.loads(output))
+        result, output = self._run("--uuid", "uuid1", "--list-zones", "--format", "csv")
+        self.assertEqual(0, result)
+        self.assertEqual('name,coordinates\nDefault,"[[0,0]]"\n', output)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "_get_camera_doc")
+    def test_dump_formats(self, mock_camera, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_camera.return_value = {"uuid": "uuid1", "zones": [{"name": "Default"}]}
+        result, output = self._run("--uuid", "uuid1", "--dump", "--format", "json")
+        self.assertEqual(0, result)
+        self.assertEqual(mock_camera.return_value, json.loads(output))
+        result, output = self._run("--uuid", "uuid1", "--dump", "--format", "ndjson")
+        self.assertEqual(mock_camera.return_value, json.loads(output))
+        result, output = self._run("--uuid", "uuid1", "--dump")
+        self.assertEqual({"data": [mock_camera.return_value]}, ast.literal_eval(output))
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "get_camera")
+    @mock.patch.object(nvr.UVCRemote, "stream_snapshot")
+    def test_get_snapshot_falls_back_to_nvr(
+        self, mock_stream, mock_camera, mock_bootstrap
+    ):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_camera.return_value = {
+            "uuid": "uuid1",
+            "host": "cam",
+            "username": "ubnt",
+        }
+
+        def fake_stream(uuid, out):
+            out.write(b"nvr-image")
+            return 9
+
+        mock_stream.side_effect = fake_stream
+        with mock.patch.object(
+            camera.UVCCameraClientV320,
+            "ensure_login",
+            side_effect=camera.CameraConnectError,
+        ):
+            result, output = self._run("--uuid", "uuid1", "--get-snapshot")
+        self.assertEqual(0, result)
+        mock_stream.assert_called_once_with("uuid1", mock.ANY)
+        self.assertEqual("nvr-image", output)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "index")
+    @mock.patch.object(fleet, "status_all")
+    def test_status_all(self, mock_status, mock_index, mock_bootstrap):
+        mock_index.return_value = [{"uuid": "uuid1"}, {"uuid": "uuid2"}]
+        mock_status.return_value = [
+            fleet.StatusResult("uuid1", "Porch", 0.5, {"uptime": 1}),
+            fleet.StatusResult("uuid2", "Garage", 2.0, error="timed out"),
+        ]
+        result, output = self._run("--status-all", "--timeout", "2")
+        self.assertEqual(1, result)
+        lines = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(["uuid1", "uuid2"], [line["uuid"] for line in lines])
+        self.assertEqual({"uptime": 1}, lines[0]["status"])
+        self.assertEqual([True, False], [line["ok"] for line in lines])
+        self.assertEqual(mock_index.return_value, mock_status.call_args[0][1])
+        self.assertEqual(2, mock_status.call_args[1]["deadline"])
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "get_camera")
+    @mock.patch.object(camera.UVCCameraClientV320, "ensure_login")
+    @mock.patch.object(camera.UVCCameraClientV320, "get_snapshot")
+    def test_record(self, mock_snapshot, mock_login, mock_camera, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_camera.return_value = {"uuid": "uuid1", "host": "cam", "username": "ubnt"}
+        mock_snapshot.return_value = b"jpeg"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cam.ring")
+            result, output = self._run(
+                "--uuid", "uuid1", "--record", path, "--fps", "100", "--frames", "3",
+                "--ring-size", "0.5",
+            )  # fmt: skip
+            with recorder.RingReader(path) as reader:
+                self.assertEqual(512 * 1024, reader.data_size)
+                self.assertEqual([b"jpeg"] * 3, [f.data for f in reader.latest(5)])
+            self.assertEqual(0, result)
+            self.assertIn("Recorded 3 frames", output)
+            # A ring of another size is only replaced when asked to
+            args = ("--uuid", "uuid1", "--record", path, "--ring-size", "0.25")
+            result, output = self._run(*args)
+            self.assertEqual(1, result)
+            self.assertIn("Unable to open", output)
+            result, output = self._run(*args, "--frames", "1", "--overwrite")
+            self.assertEqual(0, result)
+            with recorder.RingReader(path) as reader:
+                self.assertEqual(256 * 1024, reader.data_size)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "index")
+    @mock.patch.object(fleet, "fetch_snapshots")
+    def test_snapshot_all(self, mock_fetch, mock_index, mock_bootstrap):
+        mock_index.return_value = [
+            {"uuid": "uuid1", "name": "Porch", "state": "CONNECTED"},
+            {"uuid": "uuid2", "name": "Garage", "state": "DISCONNECTED"},
+        ]
+        mock_fetch.return_value = [
+            fleet.SnapshotResult("uuid1", "Porch", "camera", 0.012, bytearray(b"jpeg")),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result, output = self._run("--snapshot-all", tmpdir, "--workers", "3")
+            with open(os.path.join(tmpdir, "uuid1.jpg"), "rb") as f:
+                self.assertEqual(b"jpeg", f.read())
+            self.assertEqual(["uuid1.jpg"], os.listdir(tmpdir))
+        self.assertEqual(0, result)
+        cameras = mock_fetch.call_args[0][1]
+        self.assertEqual(["uuid1"], [c["uuid"] for c in cameras])
+        self.assertEqual(3, mock_fetch.call_args[1]["workers"])
+        self.assertIn("[camera]    12ms 4 bytes", output)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "set_recordmode_many")
+    def test_recordmode_all(self, mock_many, mock_bootstrap):
+        mock_many.return_value = [
+            nvr.RecordModeResult("id1", "Porch", "none", "changed"),
+            nvr.RecordModeResult("id2", "Garage", "full", "failed", "boom"),
+        ]
+        result, output = self._run("--recordmode", "motion", "--all", "--workers", "4")
+        self.assertEqual(1, result)
+        mock_many.assert_called_once_with(None, "motion", None, workers=4)
+        self.assertIn(
+            "id1: Porch                      none -> motion [changed]", output
+        )
+        self.assertIn("[failed: boom]", output)
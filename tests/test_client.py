@@ -1,3 +1,5 @@
+import gzip
+import io
 import json
 import unittest
 import zlib
@@ -24,6 +26,7 @@ class TestClientLowLevel(unittest.TestCase):
         )
         bootstrap_mock.start()
         self._patches.append(bootstrap_mock)
+        self.addCleanup(self.cleanUp)
 
     def _bootstrap(self):
         return {"systemInfo": {"version": "3.1.3"}}
@@ -37,12 +40,12 @@ class TestClientLowLevel(unittest.TestCase):
         conn = httplib.HTTPConnection.return_value
         resp = conn.getresponse.return_value
         resp.status = 200
-        resp.read.return_value = json.dumps({}).encode()
+        resp.read.side_effect = [b"{}", b""]
         client._uvc_request("/bar")
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Accept-Encoding": "gzip, deflate, sdch",
+            "Accept-Encoding": "gzip, deflate",
         }
         conn.request.assert_called_once_with("GET", "/bar?apiKey=key", None, headers)
 
@@ -51,18 +54,44 @@ class TestClientLowLevel(unittest.TestCase):
         conn = httplib.HTTPConnection.return_value
         resp = conn.getresponse.return_value
         resp.status = 200
-        resp.read.return_value = json.dumps({}).encode()
+        resp.read.side_effect = [b"{}", b""]
         result = client._uvc_request("/bar?foo=bar", method="PUT", data={"foo": "bar"})
         self.assertEqual({}, result)
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Accept-Encoding": "gzip, deflate, sdch",
+            "Accept-Encoding": "gzip, deflate",
         }
         conn.request.assert_called_once_with(
-            "PUT", "/bar?foo=bar&apiKey=key", '{"foo": "bar"}', headers
+            "PUT", "/bar?foo=bar&apiKey=key", b'{"foo":"bar"}', headers
         )
 
+    def test_uvc_request_put_preserialized(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        conn = httplib.HTTPConnection.return_value
+        resp = conn.getresponse.return_value
+        resp.status = 200
+        resp.read.side_effect = [b'{"data": []}', b""]
+        body = b'{"foo": "bar"}'
+        result = client._uvc_request("/bar", method="PUT", data=body)
+        self.assertEqual({"data": []}, result)
+        self.assertIs(body, conn.request.call_args[0][2])
+
+    def test_uvc_request_reuses_connection(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        httplib.HTTPConnection.reset_mock()
+        conn = httplib.HTTPConnection.return_value
+        resp = conn.getresponse.return_value
+        resp.status = 200
+        resp.will_close = False
+        resp.isclosed.return_value = True
+        resp.read.side_effect = [b"{}", b"", b"{}", b""]
+        client._uvc_request("/bar")
+        client._uvc_request("/baz")
+        self.assertEqual(1, httplib.HTTPConnection.call_count)
+        self.assertEqual(2, conn.request.call_count)
+        self.assertEqual(1, client.pool_stats["reused"])
+
     def test_uvc_request_failed(self):
         client = nvr.UVCRemote("foo", 7080, "key")
         conn = httplib.HTTPConnection.return_value
@@ -90,16 +119,43 @@ class TestClientLowLevel(unittest.TestCase):
         conn = httplib.HTTPConnection.return_value
         resp = conn.getresponse.return_value
         resp.status = 200
-        resp.read.return_value = zlib.compress(json.dumps({}).encode())
+        resp.read.side_effect = [zlib.compress(json.dumps({}).encode()), b""]
         resp.getheaders.return_value = [("Content-Encoding", "gzip")]
         client._uvc_request("/bar")
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Accept-Encoding": "gzip, deflate, sdch",
+            "Accept-Encoding": "gzip, deflate",
         }
         conn.request.assert_called_once_with("GET", "/bar?apiKey=key", None, headers)
 
+    def test_uvc_request_raw_deflate(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        conn = httplib.HTTPConnection.return_value
+        resp = conn.getresponse.return_value
+        resp.status = 200
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        body = compressor.compress(b'{"data": [1]}') + compressor.flush()
+        resp.read.side_effect = [body[:3], body[3:], b""]
+        resp.getheaders.return_value = [("content-encoding", "deflate")]
+        self.assertEqual({"data": [1]}, client._uvc_request("/bar"))
+
+    def test_iter_cameras_streams_gzip(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        conn = httplib.HTTPConnection.return_value
+        resp = conn.getresponse.return_value
+        resp.status = 200
+        cams = [{"uuid": f"uuid{i}", "deleted": i == 1} for i in range(3)]
+        body = gzip.compress(json.dumps({"data": cams, "meta": {}}).encode())
+        resp.read.side_effect = [body[i : i + 16] for i in range(0, len(body), 16)] + [
+            b""
+        ]
+        resp.getheaders.return_value = [("Content-Encoding", "gzip")]
+        result = client.iter_cameras()
+        self.assertEqual(cams[0], next(result))
+        self.assertEqual([cams[2]], list(result))
+        self.assertEqual("/api/2.0/camera?apiKey=key", conn.request.call_args[0][1])
+
 
 class TestClient32(unittest.TestCase):
     @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
@@ -114,6 +170,47 @@ class TestClient32(unittest.TestCase):
         client = nvr.UVCRemote("foo", 7080, "key")
         self.assertEqual((3, 4, 0), client.server_version)
 
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    def test_bootstrap_is_lazy(self, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        client = nvr.UVCRemote("foo", 7080, "key")
+        self.assertFalse(mock_bootstrap.called)
+        self.assertEqual("id", client.camera_identifier)
+        self.assertEqual((3, 2, 0), client.server_version)
+        mock_bootstrap.assert_called_once_with()
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    def test_explicit_server_version(self, mock_bootstrap):
+        client = nvr.UVCRemote("foo", 7080, "key", server_version="3.1.4")
+        self.assertEqual((3, 1, 4), client.server_version)
+        client = nvr.UVCRemote("foo", 7080, "key", server_version=(3, 2, 0))
+        self.assertEqual("id", client.camera_identifier)
+        self.assertFalse(mock_bootstrap.called)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    def test_server_version_stored(self, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.1"}}
+        info_store = mock.MagicMock()
+        info_store.get_server_version.return_value = None
+        client = nvr.UVCRemote("foo", 7080, "key", info_store=info_store)
+        with mock.patch("time.time", return_value=1000.0):
+            self.assertEqual((3, 2, 1), client.server_version)
+        info_store.set_server_version.assert_called_once_with(
+            "foo:7080", "3.2.1", 1000.0 + 86400.0
+        )
+
+        mock_bootstrap.reset_mock()
+        info_store.get_server_version.return_value = ("3.1.0", 2000.0)
+        client = nvr.UVCRemote("foo", 7080, "key", info_store=info_store)
+        with mock.patch("time.time", return_value=1500.0):
+            self.assertEqual((3, 1, 0), client.server_version)
+        self.assertFalse(mock_bootstrap.called)
+
+        client = nvr.UVCRemote("foo", 7080, "key", info_store=info_store)
+        with mock.patch("time.time", return_value=2500.0):
+            self.assertEqual((3, 2, 1), client.server_version)
+        mock_bootstrap.assert_called_once_with()
+
     @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
     @mock.patch.object(nvr.UVCRemote, "index")
     def test_310_returns_uuid(self, mock_index, mock_bootstrap):
@@ -142,6 +239,50 @@ class TestClient32(unittest.TestCase):
         client = nvr.UVCRemote("foo", 7080, "key")
         self.assertEqual(mock.sentinel.id, client.name_to_uuid(mock.sentinel.name))
 
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "index")
+    def test_name_index_cached(self, mock_index, mock_bootstrap):
+        mock_index.return_value = [
+            {"name": "Porch", "uuid": "uuid1", "id": "id1"},
+            {"name": "Garage", "uuid": "uuid2", "id": "id2"},
+        ]
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        client = nvr.UVCRemote("foo", 7080, "key")
+        self.assertEqual("id1", client.name_to_uuid("Porch"))
+        self.assertEqual("id2", client.name_to_uuid("Garage"))
+        self.assertIsNone(client.name_to_uuid("Nope"))
+        self.assertEqual("Garage", client.find_camera("uuid2")["name"])
+        self.assertEqual("uuid1", client.find_camera("Porch")["uuid"])
+        self.assertEqual(1, mock_index.call_count)
+        client.refresh_index()
+        self.assertEqual(2, mock_index.call_count)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "index")
+    def test_name_index_expires(self, mock_index, mock_bootstrap):
+        mock_index.return_value = [{"name": "Porch", "uuid": "uuid1", "id": "id1"}]
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        client = nvr.UVCRemote("foo", 7080, "key", index_ttl=10)
+        with mock.patch("time.monotonic", return_value=1000):
+            client.name_to_uuid("Porch")
+            client.name_to_uuid("Porch")
+        with mock.patch("time.monotonic", return_value=1010):
+            client.name_to_uuid("Porch")
+        self.assertEqual(2, mock_index.call_count)
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "index")
+    def test_name_ambiguous(self, mock_index, mock_bootstrap):
+        mock_index.return_value = [
+            {"name": "Porch", "uuid": "uuid1", "id": "id1"},
+            {"name": "Porch", "uuid": "uuid2", "id": "id2"},
+        ]
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        client = nvr.UVCRemote("foo", 7080, "key")
+        self.assertRaises(nvr.AmbiguousName, client.name_to_uuid, "Porch")
+        self.assertRaises(nvr.AmbiguousName, client.find_camera, "Porch")
+        self.assertEqual("uuid2", client.find_camera("id2")["uuid"])
+
 
 class TestClient(unittest.TestCase):
     def setUp(self):
@@ -160,6 +301,7 @@ class TestClient(unittest.TestCase):
         )
         bootstrap_mock.start()
         self._patches.append(bootstrap_mock)
+        self.addCleanup(self.cleanUp)
 
     def _bootstrap(self):
         return {"systemInfo": {"version": "3.1.3"}}
@@ -195,7 +337,7 @@ class TestClient(unittest.TestCase):
             if method == "GET":
                 return fake_resp1
             elif method == "PUT":
-                self.assertEqual(json.dumps(fake_resp2["data"][0]), data)
+                self.assertEqual(fake_resp2["data"][0], data)
                 return fake_resp2
 
         client = nvr.UVCRemote("foo", 7080, "key")
@@ -231,7 +373,7 @@ class TestClient(unittest.TestCase):
             mock_r.return_value = fake_resp
             resp = client.set_picture_settings("uuid", newvals)
             mock_r.assert_any_call(
-                "/api/2.0/camera/uuid", "PUT", json.dumps({"ispSettings": newvals})
+                "/api/2.0/camera/uuid", "PUT", {"ispSettings": newvals}
             )
             self.assertEqual(fake_resp["data"][0]["ispSettings"], resp)
 
@@ -256,7 +398,7 @@ class TestClient(unittest.TestCase):
             mock_r.assert_any_call(
                 "/api/2.0/camera/uuid",
                 "PUT",
-                json.dumps({"ispSettings": newvals_expected}),
+                {"ispSettings": newvals_expected},
             )
             self.assertEqual(fake_resp["data"][0]["ispSettings"], resp)
 
@@ -276,7 +418,7 @@ class TestClient(unittest.TestCase):
             mock_r.return_value = fake_resp
             client.prune_zones("uuid")
             mock_r.assert_any_call(
-                "/api/2.0/camera/uuid", "PUT", json.dumps({"zones": ["fake-zone1"]})
+                "/api/2.0/camera/uuid", "PUT", {"zones": ["fake-zone1"]}
             )
 
     def test_get_snapshot(self):
@@ -290,8 +432,311 @@ class TestClient(unittest.TestCase):
             )
             self.assertEqual("image", resp)
 
+    def test_stream_snapshot(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        out = io.BytesIO()
+        with (
+            mock.patch.object(client, "_safe_request") as mock_r,
+            mock.patch("sys.stdout", new_callable=io.StringIO) as stdout,
+        ):
+            mock_r.return_value = io.BytesIO(b"image")
+            mock_r.return_value.status = 200
+            mock_r.return_value.length = None
+            self.assertEqual(5, client.stream_snapshot("foo", out))
+        self.assertEqual(b"image", out.getvalue())
+        self.assertEqual("", stdout.getvalue())
+
     def test_get_snapshot_error(self):
         client = nvr.UVCRemote("foo", 7080, "key")
         with mock.patch.object(client, "_safe_request") as mock_r:
             mock_r.return_value.status = 401
             self.assertRaises(nvr.NvrError, client.get_snapshot, "foo")
+
+    def test_index(self):
+        fake_resp = {
+            "data": [
+                {
+                    "name": "Porch",
+                    "uuid": "uuid1",
+                    "_id": "id1",
+                    "state": "CONNECTED",
+                    "managed": True,
+                    "deleted": False,
+                    "model": "UVC Micro",
+                    "host": "192.168.1.10",
+                    "username": "ubnt",
+                    "recordingSettings": {
+                        "fullTimeRecordEnabled": False,
+                        "motionRecordEnabled": True,
+                    },
+                },
+                {
+                    "name": "Old",
+                    "uuid": "uuid2",
+                    "_id": "id2",
+                    "deleted": True,
+                },
+            ]
+        }
+        client = nvr.UVCRemote("foo", 7080, "key")
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            mock_r.return_value = fake_resp
+            cams = client.index()
+            mock_r.assert_called_once_with("/api/2.0/camera")
+        self.assertEqual(1, len(cams))
+        self.assertEqual("id1", cams[0]["id"])
+        self.assertEqual("motion", cams[0]["recordmode"])
+        self.assertEqual("UVC Micro", cams[0]["model"])
+        self.assertEqual("192.168.1.10", cams[0]["host"])
+
+    def test_camera_cache(self):
+        doc = {
+            "recordingSettings": {
+                "fullTimeRecordEnabled": False,
+                "motionRecordEnabled": False,
+            },
+            "ispSettings": {"settingA": 1},
+            "zones": ["zone1", "zone2"],
+        }
+        client = nvr.UVCRemote("foo", 7080, "key", camera_cache_ttl=60)
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            mock_r.return_value = {"data": [doc]}
+            self.assertEqual("none", client.get_recordmode("uuid"))
+            self.assertEqual({"settingA": 1}, client.get_picture_settings("uuid"))
+            self.assertEqual(["zone1", "zone2"], client.list_zones("uuid"))
+            self.assertEqual(doc, client.get_camera("uuid"))
+            mock_r.assert_called_once_with("/api/2.0/camera/uuid")
+        self.assertEqual(3, client.camera_cache_stats["hits"])
+        self.assertEqual(1, client.camera_cache_stats["misses"])
+
+    def test_camera_cache_refreshed_by_put(self):
+        def fake_req(path, method="GET", data=None):
+            if method == "PUT":
+                return {"data": [data]}
+            return {
+                "data": [
+                    {
+                        "recordingSettings": {
+                            "fullTimeRecordEnabled": False,
+                            "motionRecordEnabled": False,
+                        }
+                    }
+                ]
+            }
+
+        client = nvr.UVCRemote("foo", 7080, "key", camera_cache_ttl=60)
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            mock_r.side_effect = fake_req
+            self.assertEqual("none", client.get_recordmode("uuid"))
+            client.set_recordmode("uuid", "motion")
+            self.assertEqual("motion", client.get_recordmode("uuid"))
+            # One cached read, one fresh read before the write, one PUT
+            self.assertEqual(3, mock_r.call_count)
+        client.invalidate_camera("uuid")
+        self.assertEqual(0, client.camera_cache_stats["size"])
+
+    def test_camera_cache_disabled(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        self.assertIsNone(client.camera_cache_stats)
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            mock_r.return_value = {"data": [{"zones": []}]}
+            client.list_zones("uuid")
+            client.list_zones("uuid")
+            self.assertEqual(2, mock_r.call_count)
+            # Without a cache there is nothing to gain from building a model
+            settings = {"fullTimeRecordEnabled": False, "motionRecordEnabled": True}
+            mock_r.return_value = {"data": [{"recordingSettings": settings}]}
+            with mock.patch("uvcclient.models.Camera.from_doc") as from_doc:
+                self.assertEqual("motion", client.get_recordmode("uuid"))
+            from_doc.assert_not_called()
+
+    def _fleet(self):
+        def cam(ident, name, full, motion, channel=0):
+            return {
+                "_id": ident,
+                "uuid": f"uuid-{ident}",
+                "name": name,
+                "state": "CONNECTED",
+                "managed": True,
+                "deleted": False,
+                "recordingSettings": {
+                    "fullTimeRecordEnabled": full,
+                    "motionRecordEnabled": motion,
+                    "channel": channel,
+                },
+            }
+
+        return {
+            "data": [
+                cam("id1", "Porch", False, False),
+                cam("id2", "Garage", False, True),
+                cam("id3", "Yard", True, False),
+            ]
+        }
+
+    def test_set_recordmode_many(self):
+        fleet = self._fleet()
+        puts = []
+
+        def fake_req(path, method="GET", data=None):
+            if method == "PUT":
+                puts.append(path)
+                if path.endswith("id3"):
+                    raise nvr.NvrError("Request failed: 500")
+                return {"data": [data]}
+            self.assertEqual("/api/2.0/camera", path)
+            return fleet
+
+        client = nvr.UVCRemote("foo", 7080, "key")
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            results = client.set_recordmode_many(None, "motion", workers=2)
+        self.assertEqual(
+            ["/api/2.0/camera/uuid-id1", "/api/2.0/camera/uuid-id3"], sorted(puts)
+        )
+        by_id = {r.id: r for r in results}
+        self.assertEqual("changed", by_id["uuid-id1"].status)
+        self.assertEqual("none", by_id["uuid-id1"].previous)
+        self.assertEqual("unchanged", by_id["uuid-id2"].status)
+        self.assertEqual("failed", by_id["uuid-id3"].status)
+        self.assertIn("500", by_id["uuid-id3"].error)
+
+    def test_set_recordmode_many_selection(self):
+        fleet = self._fleet()
+        client = nvr.UVCRemote("foo", 7080, "key")
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            mock_r.return_value = fleet
+            results = client.set_recordmode_many(["id2", "uuid-id1", "bogus"], "motion")
+            # One list fetch, and a PUT only for the camera that changes
+            self.assertEqual(
+                [
+                    mock.call("/api/2.0/camera"),
+                    mock.call("/api/2.0/camera/uuid-id1", "PUT", mock.ANY),
+                ],
+                mock_r.call_args_list,
+            )
+        self.assertEqual(
+            [("bogus", "failed"), ("uuid-id2", "unchanged"), ("uuid-id1", "changed")],
+            [(r.id, r.status) for r in results],
+        )
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            mock_r.return_value = self._fleet()
+            results = client.set_recordmode_many(
+                lambda cam: cam["recordmode"] == "full", "full"
+            )
+        self.assertEqual(
+            [("uuid-id3", "unchanged")], [(r.id, r.status) for r in results]
+        )
+
+    def test_set_recordmode_many_invalid(self):
+        client = nvr.UVCRemote("foo", 7080, "key")
+        with mock.patch.object(client, "_uvc_request") as mock_r:
+            self.assertRaises(
+                nvr.Invalid, client.set_recordmode_many, None, "sometimes"
+            )
+            self.assertFalse(mock_r.called)
+
+    def _camera_doc(self, brightness=50, zones=("a", "b")):
+        return {
+            "_id": "id1",
+            "name": "Porch",
+            "recordingSettings": {
+                "fullTimeRecordEnabled": False,
+                "motionRecordEnabled": True,
+            },
+            "ispSettings": {"brightness": brightness},
+            "zones": list(zones),
+        }
+
+    def _fake_nvr(self, docs):
+        # Serve GETs from docs in turn, and echo PUTs merged into the last
+        puts = []
+
+        def fake_req(path, method="GET", data=None):
+            if method == "PUT":
+                puts.append(data)
+                return {"data": [{**docs[-1], **data}]}
+            return {"data": [docs.pop(0) if len(docs) > 1 else docs[0]]}
+
+        return fake_req, puts
+
+    def test_patch_camera_unchanged(self):
+        fake_req, puts = self._fake_nvr([self._camera_doc()])
+        client = nvr.UVCRemote("foo", 7080, "key")
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            self.assertTrue(client.set_recordmode("id1", "motion"))
+            client.set_picture_settings("id1", {"brightness": "50"})
+        self.assertEqual([], puts)
+
+    def test_patch_camera_partial(self):
+        fake_req, puts = self._fake_nvr([self._camera_doc()])
+        client = nvr.UVCRemote("foo", 7080, "key", partial_updates=True)
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            self.assertTrue(client.set_recordmode("id1", "full"))
+            client.prune_zones("id1")
+        self.assertEqual(
+            [
+                {
+                    "recordingSettings": {
+                        "fullTimeRecordEnabled": True,
+                        "motionRecordEnabled": False,
+                    }
+                },
+                {"zones": ["a"]},
+            ],
+            puts,
+        )
+
+    def test_patch_camera_rebases_cached(self):
+        # Someone else changed the zones after the camera was cached
+        docs = [self._camera_doc(), self._camera_doc(zones=["c"])]
+        fake_req, puts = self._fake_nvr(docs)
+        client = nvr.UVCRemote("foo", 7080, "key", camera_cache_ttl=60)
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            self.assertEqual("motion", client.get_recordmode("id1"))
+            client.set_picture_settings("id1", {"brightness": 80})
+        self.assertEqual(["c"], puts[0]["zones"])
+        self.assertEqual({"brightness": 80}, puts[0]["ispSettings"])
+
+    def test_patch_camera_conflict(self):
+        docs = [self._camera_doc(), self._camera_doc(brightness=20)]
+        fake_req, puts = self._fake_nvr(docs)
+        client = nvr.UVCRemote("foo", 7080, "key", camera_cache_ttl=60)
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            client.get_picture_settings("id1")
+            with self.assertRaises(nvr.UpdateConflict) as ctx:
+                client.set_picture_settings("id1", {"brightness": 80})
+        self.assertIn("ispSettings", str(ctx.exception))
+        self.assertEqual([], puts)
+        self.assertEqual(0, client.camera_cache_stats["size"])
+
+    def test_update_camera(self):
+        fake_req, puts = self._fake_nvr([self._camera_doc()])
+        client = nvr.UVCRemote("foo", 7080, "key")
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req) as mock_r:
+            with client.update_camera("id1") as update:
+                update.set_recordmode("full", "low").set_picture_settings(
+                    {"brightness": "70"}
+                )
+                update.prune_zones()
+            self.assertEqual(2, mock_r.call_count)
+        self.assertEqual(1, len(puts))
+        self.assertEqual(
+            {"fullTimeRecordEnabled": True, "motionRecordEnabled": False, "channel": 2},
+            puts[0]["recordingSettings"],
+        )
+        self.assertEqual({"brightness": 70}, puts[0]["ispSettings"])
+        self.assertEqual(["a"], puts[0]["zones"])
+        self.assertEqual(["a"], update.result["zones"])
+
+    def test_update_camera_invalid(self):
+        fake_req, puts = self._fake_nvr([self._camera_doc()])
+        client = nvr.UVCRemote("foo", 7080, "key")
+        update = client.update_camera("id1")
+        self.assertRaises(nvr.Invalid, update.set_recordmode, "sometimes")
+        update.set_recordmode("full").set_picture_settings({"brightness": "bright"})
+        with mock.patch.object(client, "_uvc_request", side_effect=fake_req):
+            self.assertRaises(nvr.Invalid, update.commit)
+            with self.assertRaises(RuntimeError), client.update_camera("id1") as update:
+                update.prune_zones()
+                raise RuntimeError
+        self.assertEqual([], puts)
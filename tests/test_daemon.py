@@ -0,0 +1,194 @@
+import io
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from uvcclient import daemon, main, nvr, store
+
+CAMERAS = {
+    "data": [
+        {
+            "name": "Porch",
+            "uuid": "uuid1",
+            "_id": "id1",
+            "state": "CONNECTED",
+            "managed": True,
+            "deleted": False,
+            "recordingSettings": {
+                "fullTimeRecordEnabled": True,
+                "motionRecordEnabled": False,
+            },
+        }
+    ]
+}
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "sock")
+        info_store = store.InfoStore(os.path.join(tmpdir.name, "store"))
+        for patch in (
+            mock.patch.object(main, "INFO_STORE", info_store),
+            mock.patch.object(main, "_SESSIONS", None),
+            mock.patch.dict(os.environ, {"UVC_HOST": "nvr", "UVC_APIKEY": "key"}),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _start(self, **kwargs):
+        server = daemon.Daemon(self.path, **kwargs)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown)
+        deadline = time.monotonic() + 5
+        while True:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(self.path)
+                    return server
+                except OSError:
+                    self.assertLess(time.monotonic(), deadline)
+                    time.sleep(0.01)
+
+    def _forward(self, *argv):
+        out = io.BytesIO()
+        status = daemon.forward(list(argv), self.path, out)
+        return status, out.getvalue().decode()
+
+    def test_no_daemon(self):
+        self.assertIsNone(daemon.forward(["--list"], self.path))
+
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "_uvc_request")
+    def test_forward_reuses_client(self, mock_r, mock_bootstrap):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_r.return_value = CAMERAS
+        server = self._start()
+        self.assertEqual(
+            (0, "uuid1: Porch                    [    online] full\n"),
+            self._forward("--list"),
+        )
+        self.assertEqual(
+            (0, "full\n"), self._forward("--name", "Porch", "--get-recordmode")
+        )
+        self.assertEqual(1, len(server._clients))
+        # One camera list for the index; --get-recordmode reads the camera
+        paths = [call[0][0] for call in mock_r.call_args_list]
+        self.assertEqual(1, paths.count("/api/2.0/camera"))
+
+    @mock.patch.object(main, "_stream_snapshot")
+    @mock.patch.object(nvr.UVCRemote, "_get_bootstrap")
+    @mock.patch.object(nvr.UVCRemote, "_uvc_request")
+    def test_snapshots_cached(self, mock_r, mock_bootstrap, mock_stream):
+        mock_bootstrap.return_value = {"systemInfo": {"version": "3.2.0"}}
+        mock_r.return_value = CAMERAS
+        mock_stream.side_effect = lambda client, info, out: out.extend(b"jpeg")
+        self.addCleanup(setattr, main, "SNAPSHOT_CACHE", None)
+        server = self._start(snapshot_max_age=60)
+        for _ in range(3):
+            self.assertEqual(
+                (0, "jpeg"), self._forward("--uuid", "id1", "--get-snapshot")
+            )
+        self.assertEqual(1, mock_stream.call_count)
+        self.assertEqual(2, server.snapshots.stats["hits"])
+
+    def test_forward_status_and_stderr(self):
+        self._start()
+        with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            status, _out = self._forward("--bogus-option")
+        self.assertEqual(2, status)
+        self.assertIn("no such option", stderr.getvalue())
+
+    def test_output_streamed(self):
+        received = threading.Event()
+        waited = []
+
+        def command(argv, env, get_client):
+            print("first", flush=True)
+            waited.append(received.wait(5))
+            print("second")
+            return 0
+
+        class Out(io.BytesIO):
+            def write(self, data):
+                received.set()
+                return super().write(data)
+
+        self._start()
+        out = Out()
+        with mock.patch.object(main, "main", side_effect=command):
+            self.assertEqual(0, daemon.forward(["--status-all"], self.path, out))
+        # The first line arrived while the command was still running
+        self.assertEqual([True], waited)
+        self.assertEqual(b"first\nsecond\n", out.getvalue())
+
+    def test_local_only_not_forwarded(self):
+        self._start()
+        self.assertIsNone(daemon.forward(["--set-password"], self.path))
+        self.assertIsNone(daemon.forward(["--list", "--no-daemon"], self.path))
+        for argv in (["--record", "cam.ring"], ["--record=cam.ring"]):
+            self.assertIsNone(daemon.forward(["--uuid", "id1", *argv], self.path))
+
+    def test_already_running(self):
+        self._start()
+        self.assertRaises(daemon.DaemonError, daemon.Daemon(self.path).serve_forever)
+
+    def test_stale_socket_replaced(self):
+        with open(self.path, "w"):
+            pass
+        self._start()
+        self.assertEqual(0, self._forward("--help")[0])
+
+    def test_socket_owned_by_other_user_not_used(self):
+        self._start()
+        with mock.patch("os.getuid", return_value=os.getuid() + 1):
+            self.assertIsNone(daemon.forward(["--list"], self.path))
+
+    def test_peer_of_other_user_not_used(self):
+        self._start()
+        with mock.patch.object(daemon, "_peer_uid", return_value=os.getuid() + 1):
+            self.assertIsNone(daemon.forward(["--list"], self.path))
+
+
+class TestSocketPath(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmp = tmpdir.name
+        for patch in (
+            mock.patch.dict(os.environ),
+            mock.patch("tempfile.gettempdir", return_value=self.tmp),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        os.environ.pop("UVC_SOCKET", None)
+        os.environ.pop("XDG_RUNTIME_DIR", None)
+
+    def test_private_directory(self):
+        path = daemon.socket_path(create=True)
+        directory = os.path.dirname(path)
+        self.assertEqual(self.tmp, os.path.dirname(directory))
+        st = os.stat(directory)
+        self.assertEqual(0o700, stat.S_IMODE(st.st_mode))
+        self.assertEqual(os.getuid(), st.st_uid)
+        self.assertEqual(path, daemon.socket_path())
+
+    def test_shared_directory_refused(self):
+        directory = os.path.dirname(daemon.socket_path(create=True))
+        os.chmod(directory, 0o777)  # noqa: S103
+        self.assertRaises(daemon.DaemonError, daemon.socket_path)
+        self.assertIsNone(daemon.forward(["--list"]))
+
+    def test_runtime_dir(self):
+        os.environ["XDG_RUNTIME_DIR"] = "/run/user/1000"
+        self.assertEqual(
+            f"/run/user/1000/uvcclient-{os.getuid()}.sock", daemon.socket_path()
+        )
@@ -0,0 +1,149 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fake_nvr import API_KEY, PASSWORD, FakeCamera, FakeNVR
+
+from uvcclient import camera, main, metrics, nvr, store
+
+
+class TestAgainstFakeNVR(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeNVR(cameras=5, payload_size=4096).start()
+        self.addCleanup(self.server.stop)
+        self.client = nvr.UVCRemote(self.server.host, self.server.port, API_KEY)
+        self.addCleanup(self.client.close)
+
+    def test_index_over_http(self):
+        cams = self.client.index()
+        self.assertEqual(["id0", "id1", "id2", "id3", "id4"], [c["id"] for c in cams])
+        self.assertEqual(cams, self.client.index(stream=True))
+        self.assertEqual(1, self.client.pool_stats["created"])
+        self.assertEqual(1, self.client.pool_stats["reused"])
+        self.assertEqual((3, 10, 13), self.client.server_version)
+
+    def test_iter_index(self):
+        entries = list(self.client.iter_index())
+        self.assertEqual(self.client.index(), entries)
+        self.assertEqual("id3", self.client.name_to_uuid("Camera 3"))
+        self.assertEqual(2, self.server.requests[("GET", "/api/2.0/camera")])
+
+    def test_camera_models(self):
+        cams = self.client.cameras()
+        self.assertEqual(["id0", "id1", "id2", "id3", "id4"], [c.id for c in cams])
+        self.assertEqual("Camera 3", cams[3].name)
+        self.assertEqual("motion", cams[3].recordmode)
+        cam = self.client.camera("id2")
+        self.assertEqual(cams[2], cam)
+        self.assertEqual(self.server.cameras["id2"], cam.to_doc())
+
+    def test_set_recordmode(self):
+        self.assertTrue(self.client.set_recordmode("id2", "full"))
+        self.assertEqual("full", self.client.get_recordmode("id2"))
+        self.assertEqual(1, self.server.requests[("PUT", "/api/2.0/camera/id2")])
+
+    def test_partial_update(self):
+        sent = []
+        inst = metrics.Instrumentation()
+        inst.add_post_hook(lambda info: sent.append((info.method, info.bytes_out)))
+        for partial in (False, True):
+            client = nvr.UVCRemote(
+                self.server.host,
+                self.server.port,
+                API_KEY,
+                instrumentation=inst,
+                partial_updates=partial,
+            )
+            self.addCleanup(client.close)
+            client.prune_zones(f"id{int(partial)}")
+        puts = [size for method, size in sent if method == "PUT"]
+        self.assertGreater(puts[0], 4000)
+        self.assertLess(puts[1], 100)
+        self.assertEqual(
+            ["Default"], [z["name"] for z in self.server.cameras["id1"]["zones"]]
+        )
+        self.assertEqual("Camera 1", self.server.cameras["id1"]["name"])
+
+    def test_snapshot(self):
+        buf = bytearray()
+        self.client.stream_snapshot("id0", buf)
+        self.assertEqual(self.server.snapshot, buf)
+
+    def test_snapshot_cache(self):
+        client = nvr.UVCRemote(
+            self.server.host, self.server.port, API_KEY, snapshot_max_age=60
+        )
+        self.addCleanup(client.close)
+        buf = bytearray()
+        self.assertEqual(len(self.server.snapshot), client.stream_snapshot("id0", buf))
+        self.assertEqual(self.server.snapshot, buf)
+        self.assertEqual(self.server.snapshot, client.get_snapshot("id0"))
+        client.get_snapshot("id1")
+        self.assertEqual(
+            1, self.server.requests[("GET", "/api/2.0/snapshot/camera/id0")]
+        )
+        self.assertEqual(1, client.snapshot_cache_stats["hits"])
+        self.assertEqual(2, client.snapshot_cache_stats["misses"])
+        self.assertIsNone(self.client.snapshot_cache_stats)
+
+    def test_bad_apikey(self):
+        client = nvr.UVCRemote(self.server.host, self.server.port, "wrong")
+        self.addCleanup(client.close)
+        self.assertRaises(nvr.NotAuthorized, client.index)
+
+    def test_cli_list(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        info_store = store.InfoStore(os.path.join(tmpdir.name, "store"))
+        env = {
+            "UVC_HOST": self.server.host,
+            "UVC_PORT": str(self.server.port),
+            "UVC_APIKEY": API_KEY,
+        }
+        out = io.StringIO()
+        with (
+            mock.patch.object(main, "INFO_STORE", info_store),
+            contextlib.redirect_stdout(out),
+        ):
+            self.assertEqual(0, main.main(["--list", "--no-daemon"], env=env))
+        self.assertEqual(5, len(out.getvalue().splitlines()))
+
+
+class TestAgainstFakeCamera(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeCamera().start()
+        self.addCleanup(self.server.stop)
+
+    def _client(self, cls, password=PASSWORD, sessions=None):
+        return cls(
+            self.server.host, "ubnt", password, self.server.port, sessions=sessions
+        )
+
+    def test_legacy_login_and_led(self):
+        cam = self._client(camera.UVCCameraClient)
+        cam.login()
+        self.assertTrue(cam.set_led(False))
+        self.assertEqual({"led.front.status": "0"}, self.server.settings)
+
+    def test_v320_login_and_snapshot(self):
+        cam = self._client(camera.UVCCameraClientV320)
+        cam.login()
+        self.assertEqual(self.server.snapshot, cam.get_snapshot())
+
+    def test_bad_password(self):
+        for cls in (camera.UVCCameraClient, camera.UVCCameraClientV320):
+            cam = self._client(cls, password="wrong")  # noqa: S106
+            self.assertRaises(camera.CameraAuthError, cam.login)
+
+    def test_expired_session_relogin(self):
+        sessions = camera.SessionCache()
+        cam = self._client(camera.UVCCameraClientV320, sessions=sessions)
+        cam.ensure_login()
+        self.server.sessions.clear()
+        cam = self._client(camera.UVCCameraClientV320, sessions=sessions)
+        cam.ensure_login()
+        self.assertEqual(self.server.snapshot, cam.get_snapshot())
+        self.assertEqual(2, self.server.requests[("POST", "/api/1.1/login")])
@@ -0,0 +1,170 @@
+import unittest
+from unittest import mock
+
+from fake_nvr import PASSWORD, FakeCamera
+
+from uvcclient import camera, fleet, nvr
+
+
+class TestFetchSnapshots(unittest.TestCase):
+    CAMERAS = [
+        {"uuid": "direct", "name": "Direct", "host": "cam1", "username": "ubnt"},
+        {"uuid": "proxied", "name": "Proxied", "host": "cam2", "username": "ubnt"},
+        {"uuid": "nohost", "name": "No Host", "host": None, "username": "ubnt"},
+        {"uuid": "broken", "name": "Broken", "host": "cam4", "username": "ubnt"},
+    ]
+
+    def _camera_client(
+        self,
+        version,
+        host,
+        username,
+        password,
+        timeout=None,
+        sessions=None,
+        deadline=None,
+        breakers=None,
+    ):
+        client = mock.MagicMock()
+        self.camera_args.append((host, password, timeout))
+        self.assertLessEqual(deadline.remaining(), 5)
+        if host == "cam1":
+            client.stream_snapshot.side_effect = lambda out: out.extend(b"cam")
+        else:
+            client.ensure_login.side_effect = camera.CameraConnectError("nope")
+        return client
+
+    def _nvr_snapshot(self, uuid, out, deadline=None):
+        self.assertLessEqual(deadline.remaining(), 5)
+        if uuid == "broken":
+            raise nvr.NvrError("Snapshot returned 500")
+        out.extend(b"nvr")
+        return 3
+
+    def test_fetch_snapshots(self):
+        self.camera_args = []
+        client = mock.MagicMock()
+        client.server_version = (3, 2, 0)
+        client.stream_snapshot.side_effect = self._nvr_snapshot
+        passwords = {"direct": "secret"}.get
+        with mock.patch.object(
+            camera, "get_camera_client", side_effect=self._camera_client
+        ):
+            results = {
+                r.uuid: r
+                for r in fleet.fetch_snapshots(
+                    client, self.CAMERAS, passwords, workers=2, timeout=3, deadline=5
+                )
+            }
+        self.assertEqual(4, len(results))
+        self.assertEqual("camera", results["direct"].source)
+        self.assertEqual(b"cam", results["direct"].image)
+        self.assertEqual("nvr", results["proxied"].source)
+        self.assertEqual(b"nvr", results["proxied"].image)
+        self.assertEqual("nvr", results["nohost"].source)
+        self.assertFalse(results["broken"].ok)
+        self.assertIsNone(results["broken"].source)
+        self.assertIn("500", results["broken"].error)
+        self.assertIn(("cam1", "secret", 3), self.camera_args)
+        self.assertIn(("cam2", "ubnt", 3), self.camera_args)
+        for result in results.values():
+            self.assertGreaterEqual(result.latency, 0)
+
+    def test_no_fallback_past_deadline(self):
+        self.camera_args = []
+        client = mock.MagicMock()
+        client.server_version = (3, 2, 0)
+        with mock.patch.object(
+            camera, "get_camera_client", side_effect=self._camera_client
+        ):
+            results = {
+                r.uuid: r
+                for r in fleet.fetch_snapshots(client, self.CAMERAS, deadline=0)
+            }
+        self.assertEqual("camera", results["direct"].source)
+        self.assertIn("Deadline", results["proxied"].error)
+        client.stream_snapshot.assert_not_called()
+
+
+class TestStatusAll(unittest.TestCase):
+    def test_cameras_taken_lazily(self):
+        taken = []
+
+        def cameras():
+            for i in range(10):
+                taken.append(i)
+                yield {"uuid": str(i), "name": "", "host": None, "username": "ubnt"}
+
+        client = mock.MagicMock()
+        client.server_version = (3, 2, 0)
+        results = fleet.status_all(client, cameras(), workers=1)
+        next(results)
+        # Only a window of twice the workers is submitted ahead
+        self.assertLessEqual(len(taken), 3)
+        self.assertEqual(9, len(list(results)))
+
+    def test_status_all(self):
+        server = FakeCamera().start()
+        self.addCleanup(server.stop)
+        cameras = [
+            {"uuid": "up", "name": "Up", "host": server.host, "username": "ubnt"},
+            {"uuid": "nohost", "name": "No Host", "host": None, "username": "ubnt"},
+            {"uuid": "locked", "name": "Locked", "host": "cam3", "username": "admin"},
+        ]
+        client = mock.MagicMock()
+        client.server_version = (3, 2, 0)
+        real_client = camera.get_camera_client
+
+        def get_camera_client(version, host, username, password, **kwargs):
+            self.assertLessEqual(kwargs["deadline"].remaining(), 2)
+            if host == "cam3":
+                host, password = server.host, "wrong"
+            return real_client(version, host, username, password, server.port, **kwargs)
+
+        passwords = {"up": PASSWORD}.get
+        info_store = mock.MagicMock()
+        info_store.get_camera_session.return_value = None
+        sessions = camera.SessionCache(store=info_store)
+        with mock.patch.object(
+            camera, "get_camera_client", side_effect=get_camera_client
+        ):
+            results = {
+                r.uuid: r
+                for r in fleet.status_all(
+                    client,
+                    cameras,
+                    passwords,
+                    workers=2,
+                    timeout=1,
+                    deadline=2,
+                    sessions=sessions,
+                )
+            }
+        self.assertEqual({"uptime": 1234}, results["up"].status)
+        self.assertTrue(results["up"].ok)
+        self.assertIn("no address", results["nohost"].error)
+        # Sessions are written to the store once, after the sweep
+        info_store.update_camera_sessions.assert_called_once()
+        self.assertIsNone(results["locked"].status)
+        self.assertIn("login", results["locked"].error)
+        self.assertEqual(
+            {"uuid", "name", "ok", "latency", "status", "error"},
+            set(results["up"].as_dict()),
+        )
+
+    @mock.patch("time.monotonic")
+    def test_login_uses_up_deadline(self, mock_time):
+        mock_time.side_effect = [0.0, 0.0, 5.0, 5.0]
+        cam_client = mock.MagicMock()
+        with mock.patch.object(camera, "get_camera_client", return_value=cam_client):
+            result = fleet._fetch_status(
+                (3, 2, 0),
+                {"uuid": "slow", "name": "Slow", "host": "cam", "username": "ubnt"},
+                "ubnt",
+                1,
+                2,
+                None,
+                None,
+            )
+        self.assertEqual("Deadline exceeded", result.error)
+        cam_client.get_status.assert_not_called()
@@ -0,0 +1,24 @@
+import json
+import unittest
+from unittest import mock
+
+from uvcclient import jsonutil
+
+
+class TestJsonUtil(unittest.TestCase):
+    DOC = {"name": "Porch", "zones": [{"id": 1}], "enabled": True, "x": None}
+
+    def test_roundtrip(self):
+        data = jsonutil.dumps(self.DOC)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(self.DOC, json.loads(data))
+        self.assertEqual(self.DOC, jsonutil.loads(data))
+        self.assertEqual(self.DOC, jsonutil.loads(memoryview(data)))
+
+    def test_stdlib_fallback(self):
+        with mock.patch.object(jsonutil, "HAVE_ORJSON", False):
+            data = jsonutil.dumps(self.DOC)
+            self.assertEqual(b'{"name":"Porch"', data[:15])
+            self.assertEqual(self.DOC, jsonutil.loads(data))
+            self.assertEqual(self.DOC, jsonutil.loads(memoryview(data)))
+            self.assertEqual(self.DOC, jsonutil.loads(data.decode()))
@@ -0,0 +1,116 @@
+import unittest
+
+from fake_nvr import API_KEY, PASSWORD, FakeCamera, FakeNVR
+
+from uvcclient import camera, metrics, nvr
+
+
+class TestHelpers(unittest.TestCase):
+    def test_redact(self):
+        self.assertEqual(
+            "/api/2.0/camera?apiKey=REDACTED&x=1",
+            metrics.redact("/api/2.0/camera?apiKey=secret&x=1"),
+        )
+
+    def test_endpoint_of(self):
+        for url, endpoint in (
+            ("/api/2.0/camera?apiKey=secret", "/api/2.0/camera"),
+            (
+                "/api/2.0/camera/5f3c0d0ee4b0a1b2c3d4e5f6?apiKey=k",
+                "/api/2.0/camera/{id}",
+            ),
+            (
+                "/api/2.0/snapshot/camera/id1?force=true",
+                "/api/2.0/snapshot/camera/{id}",
+            ),
+            ("/cfgwrite.cgi?led.front.status=1", "/cfgwrite.cgi"),
+        ):
+            self.assertEqual(endpoint, metrics.endpoint_of(url))
+
+
+class TestMetrics(unittest.TestCase):
+    def _info(self, duration, status=200, **kwargs):
+        info = metrics.RequestInfo("nvr", "GET", "/api/2.0/camera", "", **kwargs)
+        info.duration = duration
+        info.status = status
+        return info
+
+    def test_histogram(self):
+        m = metrics.Metrics()
+        m.record(self._info(0.003, bytes_in=10))
+        m.record(self._info(0.2, bytes_in=5, reused=True))
+        m.record(self._info(20, status=500, retries=1, error="boom"))
+        data = m.as_dict()["nvr GET /api/2.0/camera"]
+        self.assertEqual(3, data["count"])
+        self.assertEqual(15, data["bytes_in"])
+        self.assertEqual({200: 2, 500: 1}, data["statuses"])
+        self.assertEqual((1, 1, 1), (data["retries"], data["reused"], data["errors"]))
+        self.assertEqual(1, data["buckets"]["0.005"])
+        self.assertEqual(2, data["buckets"]["0.25"])
+        self.assertEqual(2, data["buckets"]["10.0"])
+        self.assertEqual(3, data["buckets"]["+Inf"])
+        m.reset()
+        self.assertEqual({}, m.as_dict())
+
+    def test_prometheus(self):
+        m = metrics.Metrics()
+        m.record(self._info(0.01))
+        text = m.prometheus()
+        labels = 'target="nvr",method="GET",endpoint="/api/2.0/camera"'
+        self.assertIn(
+            f'uvcclient_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', text
+        )
+        self.assertIn(f'uvcclient_requests_total{{{labels},status="200"}} 1', text)
+        self.assertIn("# TYPE uvcclient_request_errors_total counter", text)
+
+    def test_failing_hook_is_ignored(self):
+        inst = metrics.Instrumentation()
+        inst.add_pre_hook(lambda info: 1 / 0)
+        with self.assertLogs("uvcclient", "ERROR"), inst.track("nvr", "GET", "/"):
+            pass
+
+
+class TestInstrumentedClients(unittest.TestCase):
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        self.seen = []
+        self.inst = metrics.Instrumentation()
+        self.inst.add_pre_hook(lambda info: self.seen.append(info.url))
+        self.inst.add_post_hook(self.metrics.record)
+
+    def test_nvr(self):
+        server = FakeNVR(cameras=3).start()
+        self.addCleanup(server.stop)
+        client = nvr.UVCRemote(
+            server.host, server.port, API_KEY, instrumentation=self.inst
+        )
+        self.addCleanup(client.close)
+        self.assertEqual(3, len(list(client.iter_cameras())))
+        client.index()
+        client.set_recordmode("id1", "full")
+        self.assertRaises(nvr.NvrError, client.get_snapshot, "missing")
+        data = self.metrics.as_dict()
+
+        cams = data["nvr GET /api/2.0/camera"]
+        self.assertEqual(2, cams["count"])
+        self.assertEqual(1, cams["reused"])
+        self.assertGreater(cams["bytes_in"], 0)
+        put = data["nvr PUT /api/2.0/camera/{id}"]
+        self.assertGreater(put["bytes_out"], 0)
+        snap = data["nvr GET /api/2.0/snapshot/camera/{id}"]
+        self.assertEqual(({404: 1}, 1), (snap["statuses"], snap["errors"]))
+        self.assertTrue(self.seen)
+        for url in self.seen:
+            self.assertNotIn(API_KEY, url)
+
+    def test_camera(self):
+        server = FakeCamera(snapshot_size=1000).start()
+        self.addCleanup(server.stop)
+        cam = camera.UVCCameraClientV320(
+            server.host, "ubnt", PASSWORD, server.port, instrumentation=self.inst
+        )
+        cam.login()
+        cam.get_snapshot()
+        data = self.metrics.as_dict()
+        self.assertGreater(data["camera POST /api/1.1/login"]["bytes_out"], 0)
+        self.assertEqual(1000, data["camera GET /snap.jpeg"]["bytes_in"])
@@ -0,0 +1,94 @@
+import tracemalloc
+import unittest
+from unittest import mock
+
+from fake_nvr import camera_doc
+
+from uvcclient import jsonutil, models
+
+
+class TestCamera(unittest.TestCase):
+    def test_from_doc(self):
+        cam = models.Camera.from_doc(camera_doc(1))
+        self.assertEqual("id1", cam.id)
+        self.assertEqual("uuid1", cam.uuid)
+        self.assertEqual("Camera 1", cam.name)
+        self.assertEqual("UVC G3", cam.model)
+        self.assertTrue(cam.managed)
+        self.assertEqual("motion", cam.recordmode)
+        self.assertEqual(0, cam.recording_settings.channel)
+        self.assertEqual(50, cam.isp_settings.brightness)
+        self.assertEqual("auto", cam.isp_settings.ir_led_mode)
+        self.assertIsNone(cam.isp_settings.hue)
+        self.assertEqual(["Default", "Door"], [z.name for z in cam.zones])
+
+    def test_round_trip(self):
+        doc = camera_doc(2, payload_size=1024)
+        doc["ispSettings"]["vendorSpecific"] = [1, 2]
+        cam = models.Camera.from_doc(doc)
+        self.assertEqual(doc, cam.to_doc())
+        cam.isp_settings  # noqa: B018 - decode without changing anything
+        cam.zones  # noqa: B018
+        self.assertEqual(doc, cam.to_doc())
+
+    def test_changes_written_back(self):
+        cam = models.Camera.from_doc(camera_doc(0))
+        cam.name = "Porch"
+        cam.recording_settings.full_time_record_enabled = True
+        cam.isp_settings.brightness = 70
+        cam.zones[1].name = "Gate"
+        doc = cam.to_doc()
+        self.assertEqual("Porch", doc["name"])
+        self.assertTrue(doc["recordingSettings"]["fullTimeRecordEnabled"])
+        self.assertEqual(70, doc["ispSettings"]["brightness"])
+        self.assertEqual("auto", doc["ispSettings"]["irLedMode"])
+        self.assertEqual("Gate", doc["zones"][1]["name"])
+        # The original is untouched until the changes are applied
+        self.assertEqual("Camera 0", models.Camera.from_json(cam.raw).name)
+
+    def test_section(self):
+        doc = camera_doc(0)
+        cam = models.Camera.from_doc(doc)
+        self.assertEqual(doc["ispSettings"], cam.section("ispSettings"))
+        # Each call returns a copy
+        cam.section("ispSettings")["brightness"] = 1
+        self.assertEqual(50, cam.section("ispSettings")["brightness"])
+        # Once a section has been decoded it is rebuilt from the model
+        cam.isp_settings.brightness = 60
+        with mock.patch.object(jsonutil, "loads") as loads:
+            self.assertEqual(60, cam.section("ispSettings")["brightness"])
+        loads.assert_not_called()
+        self.assertIsNone(cam.section("missing"))
+        cam.zones[0].name = "Yard"
+        self.assertEqual("Yard", cam.section("zones")[0]["name"])
+
+    def test_partial_doc(self):
+        doc = {"recordingSettings": {"fullTimeRecordEnabled": True}}
+        cam = models.Camera.from_doc(doc)
+        self.assertEqual("", cam.id)
+        self.assertEqual(doc, cam.to_doc())
+        self.assertEqual("full", cam.recordmode)
+        self.assertNotIn("_id", cam.to_doc())
+
+    def test_slots(self):
+        cam = models.Camera.from_doc(camera_doc(0))
+        self.assertFalse(hasattr(cam, "__dict__"))
+        with self.assertRaises(AttributeError):
+            cam.unknown = 1
+
+    def test_smaller_than_documents(self):
+        raw = [jsonutil.dumps(camera_doc(i)) for i in range(200)]
+
+        def measure(build):
+            tracemalloc.start()
+            try:
+                kept = [build(r) for r in raw]
+                size = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(200, len(kept))
+            return size
+
+        docs = measure(jsonutil.loads)
+        cams = measure(models.Camera.from_json)
+        self.assertLess(cams, docs / 2)
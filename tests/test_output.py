@@ -0,0 +1,72 @@
+import io
+import json
+import unittest
+
+from uvcclient import output
+
+
+class TestRowWriter(unittest.TestCase):
+    ROWS = [
+        {"uuid": "uuid1", "name": "Porch", "managed": True, "host": None},
+        {"uuid": "uuid2", "name": 'Say "hi", Garage', "managed": False, "x": [1]},
+    ]
+
+    def _write(self, fmt, rows, fields=None):
+        out = io.StringIO()
+        self.assertEqual(len(rows), output.write_rows(out, fmt, rows, fields))
+        return out.getvalue()
+
+    def test_json(self):
+        self.assertEqual(self.ROWS, json.loads(self._write("json", self.ROWS)))
+        self.assertEqual([], json.loads(self._write("json", [])))
+
+    def test_ndjson(self):
+        text = self._write("ndjson", self.ROWS)
+        self.assertEqual(self.ROWS, [json.loads(line) for line in text.splitlines()])
+        self.assertEqual("", self._write("ndjson", []))
+
+    def test_csv(self):
+        self.assertEqual(
+            'uuid,name,managed,host\nuuid1,Porch,True,\nuuid2,"Say ""hi"", Garage",False,\n',
+            self._write("csv", self.ROWS),
+        )
+        self.assertEqual(
+            'name,x\nPorch,\n"Say ""hi"", Garage",[1]\n',
+            self._write("csv", self.ROWS, ("name", "x")),
+        )
+        self.assertEqual("uuid,name\n", self._write("csv", [], ("uuid", "name")))
+
+    def test_rows_written_as_they_come(self):
+        out = io.StringIO()
+        seen = []
+
+        def rows():
+            for row in self.ROWS:
+                yield row
+                seen.append(out.getvalue())
+
+        output.write_rows(out, "ndjson", rows())
+        self.assertEqual(1, seen[0].count("\n"))
+
+    def test_failure_not_terminated(self):
+        def rows():
+            yield self.ROWS[0]
+            raise OSError("connection reset")
+
+        for fmt in output.FORMATS:
+            out = io.StringIO()
+            self.assertRaises(OSError, output.write_rows, out, fmt, rows())
+            lines = out.getvalue().splitlines()
+            self.assertNotIn("]", lines)
+            self.assertIn("uuid1", lines[-1])
+        out = io.StringIO()
+        self.assertRaises(OSError, output.write_rows, out, "json", rows())
+        self.assertRaises(json.JSONDecodeError, json.loads, out.getvalue())
+
+    def test_write_record(self):
+        out = io.StringIO()
+        output.write_record(out, "json", {"brightness": 50})
+        self.assertEqual({"brightness": 50}, json.loads(out.getvalue()))
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, output.RowWriter, io.StringIO(), "xml")
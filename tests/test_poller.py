@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from uvcclient import nvr, poller
+
+
+def _cam(ident, state="CONNECTED", recordmode="motion", managed=True):
+    return {
+        "id": ident,
+        "name": f"Cam {ident}",
+        "state": state,
+        "recordmode": recordmode,
+        "managed": managed,
+    }
+
+
+def _client(*polls):
+    client = mock.MagicMock()
+    client.refresh_index.side_effect = list(polls)
+    return client
+
+
+class TestDiffCameras(unittest.TestCase):
+    def test_changes(self):
+        before = {
+            "a": _cam("a"),
+            "b": _cam("b"),
+            "c": _cam("c", state="DISCONNECTED"),
+            "gone": _cam("gone"),
+        }
+        after = {
+            "a": _cam("a", state="DISCONNECTED"),
+            "b": _cam("b", recordmode="full", managed=False),
+            "c": _cam("c", state="FIRMWARE_OUTDATED"),
+            "new": _cam("new"),
+        }
+        events = poller.diff_cameras(before, after)
+        self.assertEqual(
+            [
+                ("offline", "a", "CONNECTED", "DISCONNECTED"),
+                ("recordmode_changed", "b", "motion", "full"),
+                ("managed_changed", "b", True, False),
+                ("firmware_outdated", "c", "DISCONNECTED", "FIRMWARE_OUTDATED"),
+                ("added", "new", None, "CONNECTED"),
+                ("removed", "gone", "CONNECTED", None),
+            ],
+            [(e.kind, e.id, e.previous, e.current) for e in events],
+        )
+
+    def test_no_changes(self):
+        cams = {"a": _cam("a")}
+        self.assertEqual([], poller.diff_cameras(cams, dict(cams)))
+
+
+class TestCameraPoller(unittest.TestCase):
+    def test_baseline_then_events(self):
+        client = _client([_cam("a")], [_cam("a", state="DISCONNECTED")])
+        p = poller.CameraPoller(client)
+        self.assertEqual([], p.poll())
+        events = p.poll()
+        self.assertEqual(["offline"], [e.kind for e in events])
+        self.assertEqual("DISCONNECTED", p.cameras["a"]["state"])
+
+    def test_adaptive_backoff(self):
+        client = _client(
+            [_cam("a")], [_cam("a")], [_cam("a")], [_cam("a")], [_cam("a", "UPGRADING")]
+        )
+        p = poller.CameraPoller(client, interval=5, max_interval=15, backoff=2)
+        intervals = []
+        for _ in range(5):
+            p.poll()
+            intervals.append(p.interval)
+        self.assertEqual([10, 15, 15, 15, 5], intervals)
+
+    def test_error_backs_off(self):
+        client = _client(nvr.NvrError("down"))
+        p = poller.CameraPoller(client, interval=5)
+        self.assertRaises(nvr.NvrError, p.poll)
+        self.assertEqual(10, p.interval)
+
+    def test_run_callback(self):
+        events = []
+
+        def on_event(event):
+            events.append(event)
+            p.stop()
+
+        p = poller.CameraPoller(
+            _client([_cam("a")], nvr.NvrError("down"), [], [], []),
+            interval=0,
+            callback=on_event,
+        )
+        thread = threading.Thread(target=p.run)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([("removed", "a")], [(e.kind, e.id) for e in events])
+
+
+class TestCameraPollerAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_async_iteration(self):
+        client = _client(
+            [_cam("a")], [_cam("a", recordmode="none")], [_cam("a"), _cam("b")]
+        )
+        p = poller.CameraPoller(client, interval=0)
+        events = []
+        async for event in p:
+            events.append((event.kind, event.id))
+            if len(events) == 3:
+                break
+        self.assertEqual(
+            [("recordmode_changed", "a"), ("recordmode_changed", "a"), ("added", "b")],
+            events,
+        )
+
+    async def test_stop_while_waiting(self):
+        client = _client([_cam("a")])
+        p = poller.CameraPoller(client, interval=60)
+
+        async def consume():
+            return [event async for event in p]
+
+        task = asyncio.create_task(consume())
+        while not client.refresh_index.called:
+            await asyncio.sleep(0.01)
+        threading.Timer(0.05, p.stop).start()
+        self.assertEqual([], await asyncio.wait_for(task, 5))
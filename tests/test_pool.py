@@ -0,0 +1,148 @@
+import unittest
+from http import client as httplib
+from unittest import mock
+
+from uvcclient import pool
+
+
+class FakeResponse:
+    def __init__(self, will_close=False):
+        self.will_close = will_close
+        self.closed = False
+
+    def isclosed(self):
+        return self.closed
+
+    def read(self):
+        self.closed = True
+        return b""
+
+
+class FakeConnection:
+    def __init__(self, fail_with=None, will_close=False):
+        self.fail_with = fail_with
+        self.will_close = will_close
+        self.requests = []
+        self.closed = False
+
+    def request(self, method, url, body, headers):
+        self.requests.append((method, url, body, headers))
+        if self.fail_with:
+            raise self.fail_with
+
+    def getresponse(self):
+        return FakeResponse(self.will_close)
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_reuses_released_connection(self):
+        factory = mock.MagicMock(side_effect=FakeConnection)
+        p = pool.ConnectionPool(factory)
+        resp, reused = p.request("GET", "/a")
+        self.assertFalse(reused)
+        resp.read()
+        p.release(resp)
+        resp, reused = p.request("GET", "/b")
+        self.assertTrue(reused)
+        self.assertEqual(1, factory.call_count)
+        self.assertEqual(1, p.stats["created"])
+        self.assertEqual(1, p.stats["reused"])
+
+    def test_lazily_reclaims_read_response(self):
+        factory = mock.MagicMock(side_effect=FakeConnection)
+        p = pool.ConnectionPool(factory)
+        resp, _ = p.request("GET", "/a")
+        resp.read()
+        _, reused = p.request("GET", "/b")
+        self.assertTrue(reused)
+        self.assertEqual(1, factory.call_count)
+
+    def test_unread_response_not_reused(self):
+        factory = mock.MagicMock(side_effect=FakeConnection)
+        p = pool.ConnectionPool(factory)
+        resp, _ = p.request("GET", "/a")
+        p.release(resp)
+        _, reused = p.request("GET", "/b")
+        self.assertFalse(reused)
+        self.assertEqual(2, factory.call_count)
+        self.assertEqual(1, p.stats["discarded"])
+
+    def test_will_close_not_reused(self):
+        factory = mock.MagicMock(side_effect=lambda: FakeConnection(will_close=True))
+        p = pool.ConnectionPool(factory)
+        resp, _ = p.request("GET", "/a")
+        resp.read()
+        p.release(resp)
+        self.assertEqual(0, p.stats["idle"])
+
+    def test_idle_timeout_expires(self):
+        factory = mock.MagicMock(side_effect=FakeConnection)
+        p = pool.ConnectionPool(factory, idle_timeout=10)
+        with mock.patch("time.monotonic", return_value=100):
+            resp, _ = p.request("GET", "/a")
+            resp.read()
+            p.release(resp)
+        with mock.patch("time.monotonic", return_value=111):
+            _, reused = p.request("GET", "/b")
+        self.assertFalse(reused)
+        self.assertEqual(1, p.stats["expired"])
+
+    def test_size_zero_disables_reuse(self):
+        factory = mock.MagicMock(side_effect=FakeConnection)
+        p = pool.ConnectionPool(factory, size=0)
+        resp, _ = p.request("GET", "/a")
+        resp.read()
+        p.release(resp)
+        _, reused = p.request("GET", "/b")
+        self.assertFalse(reused)
+
+    def test_stale_connection_reconnects(self):
+        stale = FakeConnection()
+        fresh = FakeConnection()
+        factory = mock.MagicMock(side_effect=[stale, fresh])
+        p = pool.ConnectionPool(factory)
+        resp, _ = p.request("GET", "/a")
+        resp.read()
+        p.release(resp)
+        stale.fail_with = httplib.RemoteDisconnected("gone")
+        resp, reused = p.request("GET", "/b")
+        self.assertFalse(reused)
+        self.assertTrue(stale.closed)
+        self.assertEqual([("GET", "/b", None, {})], fresh.requests)
+        self.assertEqual(1, p.stats["reconnected"])
+
+    def test_stale_connection_post_not_resent(self):
+        stale = FakeConnection()
+        factory = mock.MagicMock(side_effect=[stale, FakeConnection()])
+        p = pool.ConnectionPool(factory)
+        resp, _ = p.request("GET", "/a")
+        resp.read()
+        p.release(resp)
+        stale.fail_with = httplib.RemoteDisconnected("gone")
+        self.assertRaises(httplib.RemoteDisconnected, p.request, "POST", "/b", b"x")
+        self.assertEqual(1, factory.call_count)
+        self.assertEqual(0, p.stats["reconnected"])
+
+    def test_unreleased_responses_closed_when_evicted(self):
+        conns = []
+
+        def factory():
+            conns.append(FakeConnection())
+            return conns[-1]
+
+        p = pool.ConnectionPool(factory)
+        for _ in range(pool.MAX_LENT + 1):
+            p.request("GET", "/a")
+        self.assertTrue(conns[0].closed)
+        self.assertFalse(any(conn.closed for conn in conns[1:]))
+        self.assertEqual(pool.MAX_LENT, p.stats["in_use"])
+
+    def test_fresh_connection_error_raises(self):
+        conn = FakeConnection(fail_with=ConnectionResetError())
+        p = pool.ConnectionPool(lambda: conn)
+        self.assertRaises(ConnectionResetError, p.request, "GET", "/a")
+        self.assertTrue(conn.closed)
+        self.assertEqual(0, p.stats["reconnected"])
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fake_nvr import PASSWORD, FakeCamera
+
+from uvcclient import camera, recorder
+
+
+class TestRing(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "cam.ring")
+
+    def _writer(self, size=100, slots=4, overwrite=False):
+        writer = recorder.RingWriter(self.path, size, slots, overwrite)
+        self.addCleanup(writer.close)
+        return writer
+
+    def _reader(self):
+        reader = recorder.RingReader(self.path)
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_latest(self):
+        writer = self._writer()
+        reader = self._reader()
+        self.assertEqual([], reader.latest(3))
+        for i in range(3):
+            self.assertEqual(i, writer.append(bytes([i]) * 10, 1000.0 + i))
+        frames = reader.latest(2)
+        self.assertEqual([1, 2], [f.seq for f in frames])
+        self.assertEqual([1001.0, 1002.0], [f.timestamp for f in frames])
+        self.assertEqual(b"\x02" * 10, frames[1].data)
+        self.assertIsInstance(frames[1].data, memoryview)
+        self.assertEqual(3, len(reader))
+
+    def test_wraps_and_overwrites(self):
+        writer = self._writer(size=100, slots=8)
+        reader = self._reader()
+        for i in range(3):
+            writer.append(bytes([i]) * 40, i)
+        # The third frame did not fit at the end, so replaced the first
+        self.assertEqual([1, 2], [f.seq for f in reader.latest(5)])
+        kept = reader.latest(2)
+        self.assertEqual(b"\x02" * 40, kept[1].data)
+        writer.append(b"\x03" * 40, 3)
+        self.assertFalse(reader.intact(kept[0]))
+        self.assertTrue(reader.intact(kept[1]))
+        self.assertEqual([2, 3], [f.seq for f in reader.latest(5)])
+
+    def test_index_limits_frames(self):
+        writer = self._writer(size=100, slots=4)
+        for i in range(10):
+            writer.append(bytes([i]), i)
+        self.assertEqual([6, 7, 8, 9], [f.seq for f in writer.latest(10)])
+
+    def test_frame_too_large(self):
+        writer = self._writer(size=10)
+        self.assertRaises(ValueError, writer.append, bytes(11), 0)
+
+    def test_reopen(self):
+        with recorder.RingWriter(self.path, 100, 4) as writer:
+            writer.append(b"one", 1)
+        with recorder.RingWriter(self.path, 100, 4) as writer:
+            self.assertEqual(1, writer.append(b"two", 2))
+        # A ring of another geometry is kept unless replacing it is asked for
+        self.assertRaises(recorder.RingError, recorder.RingWriter, self.path, 200, 4)
+        self.assertRaises(recorder.RingError, recorder.RingWriter, self.path, 100, 8)
+        with recorder.RingReader(self.path) as reader:
+            self.assertEqual(2, len(reader))
+        with recorder.RingWriter(self.path, 200, 4, overwrite=True) as writer:
+            self.assertEqual([], writer.latest())
+        self.assertEqual(200 + 4 * 32 + 64, os.path.getsize(self.path))
+
+    def test_not_a_ring(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\xff\xd8 a jpeg")
+        self.assertRaises(recorder.RingError, recorder.RingReader, self.path)
+        self.assertRaises(recorder.RingError, self._writer)
+        with open(self.path, "rb") as f:
+            self.assertEqual(b"\xff\xd8 a jpeg", f.read())
+        self._writer(overwrite=True)
+        self.assertEqual(0, len(self._reader()))
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.ring = recorder.RingWriter(os.path.join(tmpdir.name, "cam.ring"), 1 << 20)
+        self.addCleanup(self.ring.close)
+
+    def test_records_with_one_login(self):
+        server = FakeCamera(snapshot_size=1000).start()
+        self.addCleanup(server.stop)
+        cam = camera.UVCCameraClientV320(server.host, "ubnt", PASSWORD, server.port)
+        rec = recorder.Recorder(cam, self.ring, fps=100)
+        self.assertEqual(3, rec.run(frames=3))
+        self.assertEqual(1, server.requests[("POST", "/api/1.1/login")])
+        self.assertEqual(3, server.requests[("GET", "/snap.jpeg")])
+        frames = self.ring.latest(3)
+        self.assertEqual([0, 1, 2], [f.seq for f in frames])
+        self.assertEqual(server.snapshot, frames[-1].data)
+
+    @mock.patch("time.monotonic")
+    def test_skips_missed_frames(self, mock_time):
+        cam = mock.MagicMock()
+        cam.get_snapshot.side_effect = [
+            camera.CameraConnectError("down"),
+            b"jpeg",
+        ]
+        # The failed snapshot takes 2.5 intervals
+        mock_time.side_effect = [0.0, 2.5, 3.0]
+        rec = recorder.Recorder(cam, self.ring, fps=1)
+        with mock.patch.object(rec._stop, "wait") as mock_wait:
+            self.assertEqual(1, rec.run(frames=2))
+        mock_wait.assert_called_once_with(0.5)
+        self.assertEqual((1, 1, 2), (rec.frames, rec.errors, rec.skipped))
+
+    def test_stop(self):
+        cam = mock.MagicMock()
+        cam.get_snapshot.return_value = b"jpeg"
+        rec = recorder.Recorder(cam, self.ring, fps=1)
+        cam.get_snapshot.side_effect = lambda: rec.stop() or b"jpeg"
+        self.assertEqual(1, rec.run())
@@ -0,0 +1,213 @@
+import socket
+import time
+import unittest
+from unittest import mock
+
+from fake_nvr import API_KEY, PASSWORD, FakeCamera, FakeNVR
+
+from uvcclient import camera, nvr, retry
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestDeadline(unittest.TestCase):
+    def test_no_deadline(self):
+        deadline = retry.Deadline(None)
+        self.assertIsNone(deadline.remaining())
+        self.assertEqual(5, deadline.cap(5))
+        self.assertIsNone(deadline.cap(None))
+
+    def test_cap(self):
+        with mock.patch("time.monotonic", return_value=100.0):
+            deadline = retry.Deadline(2)
+            self.assertEqual(1, deadline.cap(1))
+            self.assertEqual(2, deadline.cap(10))
+            self.assertEqual(2, deadline.cap(None))
+        with mock.patch("time.monotonic", return_value=103.0):
+            self.assertRaises(retry.DeadlineExceeded, deadline.cap, 1)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delays(self):
+        policy = retry.RetryPolicy(attempts=5, base_delay=1, max_delay=3)
+        delays = list(policy.delays())
+        self.assertEqual(4, len(delays))
+        for delay, bound in zip(delays, [1, 2, 3, 3], strict=True):
+            self.assertTrue(0 <= delay <= bound)
+        self.assertEqual([], list(retry.NO_RETRY.delays()))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    @mock.patch("time.monotonic")
+    def test_open_and_recover(self, mock_time):
+        mock_time.return_value = 0
+        breaker = retry.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.failure()
+        breaker.before()
+        breaker.failure()
+        self.assertEqual("open", breaker.state)
+        self.assertRaises(retry.CircuitOpen, breaker.before)
+        mock_time.return_value = 10
+        breaker.before()
+        self.assertEqual("half-open", breaker.state)
+        # Only one trial request at a time
+        self.assertRaises(retry.CircuitOpen, breaker.before)
+        breaker.failure()
+        self.assertRaises(retry.CircuitOpen, breaker.before)
+        mock_time.return_value = 20
+        breaker.before()
+        breaker.success()
+        self.assertEqual("closed", breaker.state)
+
+    def test_registry(self):
+        breakers = retry.BreakerRegistry()
+        self.assertIs(breakers.get("a"), breakers.get("a"))
+        self.assertIsNot(breakers.get("a"), breakers.get("b"))
+        self.assertEqual({"a": "closed", "b": "closed"}, breakers.states)
+
+
+@mock.patch("time.sleep")
+class TestCall(unittest.TestCase):
+    def test_retries_transient_errors(self, mock_sleep):
+        func = mock.MagicMock(side_effect=[OSError("reset"), TimeoutError(), "ok"])
+        on_retry = mock.MagicMock()
+        policy = retry.RetryPolicy(attempts=3)
+        self.assertEqual("ok", retry.call(func, policy, on_retry=on_retry))
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertEqual(2, on_retry.call_count)
+
+    def test_gives_up(self, mock_sleep):
+        func = mock.MagicMock(side_effect=OSError("down"))
+        self.assertRaises(OSError, retry.call, func, retry.RetryPolicy(attempts=2))
+        self.assertEqual(2, func.call_count)
+
+    def test_other_errors_not_retried(self, mock_sleep):
+        func = mock.MagicMock(side_effect=ValueError)
+        breaker = retry.CircuitBreaker(failure_threshold=1)
+        self.assertRaises(
+            ValueError, retry.call, func, retry.RetryPolicy(), None, breaker
+        )
+        self.assertEqual(1, func.call_count)
+        self.assertEqual("closed", breaker.state)
+
+    @mock.patch("time.monotonic")
+    def test_trial_gets_error_status(self, mock_time, mock_sleep):
+        mock_time.return_value = 0.0
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.failure()
+        mock_time.return_value = 10.0
+        error = nvr.NvrError("Request failed: 503")
+        func = mock.MagicMock(side_effect=[error, "ok"])
+        self.assertRaises(nvr.NvrError, retry.call, func, breaker=breaker)
+        self.assertEqual("closed", breaker.state)
+        self.assertEqual("ok", retry.call(func, breaker=breaker))
+
+    @mock.patch("time.monotonic")
+    def test_trial_out_of_time(self, mock_time, mock_sleep):
+        mock_time.return_value = 0.0
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.failure()
+        mock_time.return_value = 10.0
+        func = mock.MagicMock(side_effect=[retry.DeadlineExceeded, "ok"])
+        self.assertRaises(retry.DeadlineExceeded, retry.call, func, breaker=breaker)
+        self.assertEqual("half-open", breaker.state)
+        self.assertEqual("ok", retry.call(func, breaker=breaker))
+        self.assertEqual("closed", breaker.state)
+
+    def test_open_breaker_not_called(self, mock_sleep):
+        func = mock.MagicMock(side_effect=OSError)
+        breaker = retry.CircuitBreaker(failure_threshold=2)
+        policy = retry.RetryPolicy(attempts=5)
+        self.assertRaises(retry.CircuitOpen, retry.call, func, policy, None, breaker)
+        self.assertEqual(2, func.call_count)
+
+    def test_no_retry_past_deadline(self, mock_sleep):
+        func = mock.MagicMock(side_effect=OSError)
+        policy = retry.RetryPolicy(attempts=5, base_delay=100, max_delay=100)
+        with mock.patch("random.uniform", return_value=50):
+            self.assertRaises(OSError, retry.call, func, policy, retry.Deadline(10))
+        self.assertEqual(1, func.call_count)
+        mock_sleep.assert_not_called()
+
+
+class TestClientTimeouts(unittest.TestCase):
+    def test_nvr_read_timeout(self):
+        server = FakeNVR(cameras=1, latency=1).start()
+        self.addCleanup(server.stop)
+        client = nvr.UVCRemote(
+            server.host,
+            server.port,
+            API_KEY,
+            timeouts=retry.Timeouts(connect=1, read=0.1),
+            retry=retry.NO_RETRY,
+        )
+        self.addCleanup(client.close)
+        start = time.monotonic()
+        self.assertRaises(nvr.NvrError, client.index)
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_nvr_deadline_covers_retries(self):
+        server = FakeNVR(cameras=1, latency=1).start()
+        self.addCleanup(server.stop)
+        client = nvr.UVCRemote(
+            server.host,
+            server.port,
+            API_KEY,
+            retry=retry.RetryPolicy(attempts=10, base_delay=0.01),
+            deadline=0.3,
+        )
+        self.addCleanup(client.close)
+        start = time.monotonic()
+        self.assertRaises(nvr.NvrError, client.index)
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    @mock.patch("time.sleep")
+    def test_nvr_breaker(self, mock_sleep):
+        breakers = retry.BreakerRegistry(failure_threshold=2)
+        client = nvr.UVCRemote("127.0.0.1", _closed_port(), API_KEY, breakers=breakers)
+        with self.assertRaises(nvr.NvrError) as ctx:
+            client.index()
+        self.assertIsInstance(ctx.exception.__cause__, retry.CircuitOpen)
+        self.assertEqual(["open"], list(breakers.states.values()))
+
+    def test_camera_reboot_not_retried(self):
+        server = FakeCamera().start()
+        self.addCleanup(server.stop)
+        cam = camera.UVCCameraClientV320(
+            server.host, "ubnt", PASSWORD, server.port, timeout=0.2
+        )
+        cam.login()
+        server.latency = 0.5
+        self.assertRaises(camera.CameraConnectError, cam.reboot)
+        self.assertEqual(1, server.requests[("GET", "/api/1.1/reboot")])
+
+    def test_camera_shared_deadline(self):
+        server = FakeCamera().start()
+        self.addCleanup(server.stop)
+        with mock.patch("time.monotonic", return_value=100.0):
+            deadline = retry.Deadline(1)
+        cam = camera.UVCCameraClientV320(
+            server.host, "ubnt", PASSWORD, server.port, deadline=deadline
+        )
+        with mock.patch("time.monotonic", return_value=100.5):
+            cam.login()
+        # The login used the time, so nothing is left for the status
+        with mock.patch("time.monotonic", return_value=101.0):
+            self.assertRaises(camera.CameraConnectError, cam.get_status)
+        self.assertNotIn(("GET", "/api/1.1/status"), server.requests)
+
+    @mock.patch("time.sleep")
+    def test_camera_breaker(self, mock_sleep):
+        breakers = retry.BreakerRegistry(failure_threshold=3)
+        port = _closed_port()
+        for _ in range(2):
+            cam = camera.UVCCameraClient(
+                "127.0.0.1", "ubnt", PASSWORD, port, breakers=breakers
+            )
+            self.assertRaises(camera.CameraConnectError, cam.login)
+        self.assertEqual({f"127.0.0.1:{port}": "open"}, breakers.states)
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import uvcclient
+
+SRC = os.path.dirname(os.path.dirname(uvcclient.__file__))
+
+
+class TestStartup(unittest.TestCase):
+    # About 0.1s on a typical machine; generous so slow CI does not flake
+    BUDGET = 0.5
+    # What a command imports: main, then daemon to try forwarding it, then
+    # nvr to run it here
+    COMMAND = ("uvcclient.main", "uvcclient.daemon", "uvcclient.nvr")
+    DEFERRED = (
+        "uvcclient.camera",
+        "uvcclient.fleet",
+        "uvcclient.metrics",
+        "uvcclient.models",
+        "concurrent.futures",
+        "dataclasses",
+        "getpass",
+        "orjson",
+        "pprint",
+        "socketserver",
+    )
+
+    def _import_main(self, code=""):
+        home = tempfile.TemporaryDirectory()
+        self.addCleanup(home.cleanup)
+        # An unreadable store would raise if anything tried to load it
+        with open(os.path.join(home.name, ".uvcclient"), "w") as f:
+            f.write("not base64")
+        env = dict(os.environ, PYTHONPATH=SRC, HOME=home.name)
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                f"import {', '.join(self.COMMAND)}{code}",
+            ],
+            capture_output=True,
+            env=env,
+            text=True,
+            check=True,
+        )
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            if cumulative_us.strip().isdigit():
+                times[name.strip()] = int(cumulative_us) / 1e6
+        return times
+
+    def test_cold_start_budget(self):
+        times = self._import_main()
+        self.assertLess(sum(times[name] for name in self.COMMAND), self.BUDGET)
+
+    def test_rarely_used_modules_deferred(self):
+        times = self._import_main()
+        for name in self.DEFERRED:
+            self.assertNotIn(name, times)
+
+    def test_store_not_loaded(self):
+        self._import_main("; assert uvcclient.main.INFO_STORE._loaded is None")
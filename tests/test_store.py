@@ -1,22 +1,16 @@
 import builtins
-import contextlib
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
 from unittest import mock
 
 from uvcclient import store
 
 
-class OpenHelper:
-    def __init__(self):
-        self.mock = mock.MagicMock()
-
-    @contextlib.contextmanager
-    def fake_open(self, path, mode):
-        self.path = path
-        self.mode = mode
-        yield self.mock
-
-
 class TestStore(unittest.TestCase):
     @mock.patch.object(builtins, "open")
     @mock.patch("os.path.expanduser")
@@ -34,16 +28,89 @@ class TestStore(unittest.TestCase):
         self.assertFalse(mock_expand.called)
         mock_open.assert_called_once_with("barfoo")
 
-    @mock.patch("os.chmod")
-    def test_writes_correct_file(self, mock_chmod):
-        with mock.patch.object(builtins, "open") as mock_open:
-            mock_open.side_effect = OSError
-            s = store.InfoStore("barfoo")
-        opener = OpenHelper()
-        with mock.patch.object(builtins, "open", new=opener.fake_open):
-            s.save()
-        self.assertTrue(opener.mock.write.called)
-        mock_chmod.assert_called_once_with("barfoo", 0o600)
+    @mock.patch.object(builtins, "open")
+    def test_lazy_load(self, mock_open):
+        mock_open.side_effect = OSError
+        s = store.InfoStore("barfoo", lazy=True)
+        self.assertFalse(mock_open.called)
+        self.assertIsNone(s.get_camera_password("foo"))
+        self.assertIsNone(s.get_camera_session("foo"))
+        mock_open.assert_called_once_with("barfoo")
+
+    def test_writes_correct_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "store")
+            s = store.InfoStore(path)
+            s.set_camera_password("foo", "bar")
+            self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+            # Nothing is left behind but the store and its lock file
+            self.assertEqual(["store", "store.lock"], sorted(os.listdir(tmpdir)))
+            self.assertEqual("bar", store.InfoStore(path).get_camera_password("foo"))
+
+    def test_merges_changes_from_other_processes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "store")
+            first = store.InfoStore(path)
+            second = store.InfoStore(path)
+            first.set_camera_session("a", "cookie-a", 1.0)
+            second.set_camera_session("b", "cookie-b", 2.0)
+            first.set_server_version("nvr:7080", "3.2.0", 3.0)
+            third = store.InfoStore(path)
+            self.assertEqual(("cookie-a", 1.0), third.get_camera_session("a"))
+            self.assertEqual(("cookie-b", 2.0), third.get_camera_session("b"))
+            self.assertEqual(("3.2.0", 3.0), third.get_server_version("nvr:7080"))
+
+    def test_concurrent_processes(self):
+        script = (
+            "import sys\n"
+            "from uvcclient import store\n"
+            "s = store.InfoStore(sys.argv[1])\n"
+            "for i in range(20):\n"
+            "    s.set_camera_password(f'{sys.argv[2]}-{i}', 'pw')\n"
+        )
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.path.dirname(os.path.dirname(store.__file__)),
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "store")
+            procs = [
+                subprocess.Popen(
+                    [sys.executable, "-c", script, path, f"proc{n}"], env=env
+                )
+                for n in range(4)
+            ]
+            for proc in procs:
+                self.assertEqual(0, proc.wait(timeout=60))
+            passwords = store.InfoStore(path).get_camera_passwords()
+            self.assertEqual(80, len(passwords))
+
+    def test_readers_never_see_partial_writes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "store")
+            writer = store.InfoStore(path)
+            writer.set_camera_password("foo", "bar")
+            done = threading.Event()
+
+            def write():
+                for i in range(200):
+                    writer.set_camera_session("key", f"cookie{i}", float(i))
+                done.set()
+
+            thread = threading.Thread(target=write)
+            thread.start()
+            try:
+                while not done.is_set():
+                    reader = store.InfoStore(path)
+                    self.assertEqual("bar", reader.get_camera_password("foo"))
+            finally:
+                thread.join()
+
+    def _path(self):
+        # The store keeps a lock file next to it when written
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        return os.path.join(tmpdir.name, "barfoo")
 
     def test_get_camera_passwords(self):
         with mock.patch.object(builtins, "open") as mock_open:
@@ -57,8 +124,33 @@ class TestStore(unittest.TestCase):
     def test_set_camera_password(self):
         with mock.patch.object(builtins, "open") as mock_open:
             mock_open.side_effect = OSError
-            s = store.InfoStore("barfoo")
+            s = store.InfoStore(self._path())
         with mock.patch.object(s, "save") as mock_save:
             s.set_camera_password("foo", "bar")
             mock_save.assert_called_once_with()
         self.assertEqual({"foo": "bar"}, s.get_camera_passwords())
+
+    def test_camera_sessions(self):
+        with mock.patch.object(builtins, "open") as mock_open:
+            mock_open.side_effect = OSError
+            s = store.InfoStore(self._path())
+        self.assertIsNone(s.get_camera_session("foo"))
+        with mock.patch.object(s, "save") as mock_save:
+            s.set_camera_session("foo", "cookie", 123.0)
+            mock_save.assert_called_once_with()
+        self.assertEqual(("cookie", 123.0), s.get_camera_session("foo"))
+        with mock.patch.object(s, "save") as mock_save:
+            s.delete_camera_session("foo")
+            s.delete_camera_session("foo")
+            mock_save.assert_called_once_with()
+        self.assertIsNone(s.get_camera_session("foo"))
+
+    def test_server_versions(self):
+        with mock.patch.object(builtins, "open") as mock_open:
+            mock_open.side_effect = OSError
+            s = store.InfoStore(self._path())
+        self.assertIsNone(s.get_server_version("nvr:7080"))
+        with mock.patch.object(s, "save") as mock_save:
+            s.set_server_version("nvr:7080", "3.2.0", 123.0)
+            mock_save.assert_called_once_with()
+        self.assertEqual(("3.2.0", 123.0), s.get_server_version("nvr:7080"))
@@ -0,0 +1,136 @@
+import gzip
+import io
+import json
+import unittest
+import zlib
+
+from uvcclient import stream
+
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, data, length=None):
+        super().__init__(data)
+        self.length = length
+
+
+class TestCopyResponse(unittest.TestCase):
+    DATA = bytes(range(256)) * 100
+
+    def test_to_file(self):
+        out = io.BytesIO()
+        count = stream.copy_response(FakeResponse(self.DATA), out, chunk_size=1000)
+        self.assertEqual(len(self.DATA), count)
+        self.assertEqual(self.DATA, out.getvalue())
+
+    def test_to_bytearray_known_length(self):
+        out = bytearray(b"prefix")
+        resp = FakeResponse(self.DATA, length=len(self.DATA))
+        count = stream.copy_response(resp, out)
+        self.assertEqual(len(self.DATA), count)
+        self.assertEqual(b"prefix" + self.DATA, out)
+
+    def test_to_bytearray_short_body(self):
+        out = bytearray()
+        resp = FakeResponse(self.DATA[:10], length=100)
+        self.assertEqual(10, stream.copy_response(resp, out))
+        self.assertEqual(self.DATA[:10], out)
+
+    def test_to_bytearray_unknown_length(self):
+        out = bytearray()
+        count = stream.copy_response(FakeResponse(self.DATA), out, chunk_size=1000)
+        self.assertEqual(len(self.DATA), count)
+        self.assertEqual(self.DATA, out)
+
+    def test_to_memoryview(self):
+        buf = bytearray(len(self.DATA) + 10)
+        resp = FakeResponse(self.DATA, length=len(self.DATA))
+        count = stream.copy_response(resp, memoryview(buf))
+        self.assertEqual(len(self.DATA), count)
+        self.assertEqual(self.DATA, buf[:count])
+
+    def test_to_memoryview_too_small(self):
+        buf = memoryview(bytearray(10))
+        resp = FakeResponse(self.DATA, length=len(self.DATA))
+        self.assertRaises(ValueError, stream.copy_response, resp, buf)
+        self.assertRaises(
+            ValueError, stream.copy_response, FakeResponse(self.DATA), buf
+        )
+
+
+class TestWriteBytes(unittest.TestCase):
+    def test_sinks(self):
+        data = memoryview(b"image").toreadonly()
+        out = io.BytesIO()
+        self.assertEqual(5, stream.write_bytes(out, data))
+        self.assertEqual(b"image", out.getvalue())
+        buf = bytearray(b"x")
+        stream.write_bytes(buf, data)
+        self.assertEqual(b"ximage", buf)
+        view = memoryview(bytearray(8))
+        stream.write_bytes(view, data)
+        self.assertEqual(b"image\0\0\0", view.tobytes())
+        self.assertRaises(ValueError, stream.write_bytes, view[:2], data)
+
+
+def _split(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestIterDecoded(unittest.TestCase):
+    DATA = b'{"data": []}' * 1000
+
+    def _decode(self, body, encoding):
+        return b"".join(stream.iter_decoded(_split(body, 7), encoding))
+
+    def test_identity(self):
+        self.assertEqual(self.DATA, self._decode(self.DATA, None))
+
+    def test_gzip(self):
+        self.assertEqual(self.DATA, self._decode(gzip.compress(self.DATA), "gzip"))
+
+    def test_deflate_zlib(self):
+        self.assertEqual(self.DATA, self._decode(zlib.compress(self.DATA), "deflate"))
+
+    def test_deflate_raw(self):
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        body = compressor.compress(self.DATA) + compressor.flush()
+        self.assertEqual(self.DATA, self._decode(body, "Deflate"))
+
+    def test_unsupported(self):
+        self.assertRaises(ValueError, self._decode, self.DATA, "sdch")
+
+    def test_iter_body(self):
+        resp = FakeResponse(gzip.compress(self.DATA))
+        chunks = list(stream.iter_body(resp, "gzip", chunk_size=10))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(self.DATA, b"".join(chunks))
+
+
+class TestIterJSONArray(unittest.TestCase):
+    DOC = {
+        "meta": {"totalCount": 3, "nested": [1, {"data": "no"}]},
+        "data": [{"name": "caf\u00e9 \u2603"}, 12345, "x]y", None, [], 1.5e3],
+        "after": True,
+    }
+
+    def test_every_split(self):
+        body = json.dumps(self.DOC).encode()
+        for size in (1, 2, 3, 5, 64):
+            items = list(stream.iter_json_array(_split(body, size), "data"))
+            self.assertEqual(self.DOC["data"], items, size)
+
+    def test_compact(self):
+        body = json.dumps(self.DOC, separators=(",", ":")).encode()
+        self.assertEqual(
+            self.DOC["data"], list(stream.iter_json_array(_split(body, 4), "data"))
+        )
+
+    def test_empty_and_missing(self):
+        self.assertEqual([], list(stream.iter_json_array([b'{"data": [ ]}'], "data")))
+        self.assertEqual([], list(stream.iter_json_array([b"{}"], "data")))
+        self.assertEqual([], list(stream.iter_json_array([b'{"x": 1}'], "data")))
+
+    def test_invalid(self):
+        for body in (b"[]", b'{"data": [1,', b'{"data": [1 2]}', b""):
+            with self.assertRaises(ValueError):
+                list(stream.iter_json_array([body], "data"))